@@ -44,9 +44,19 @@ def main():
 		"rescene.test.test_osohash",
 		"rescene.test.test_rarstream",
 		"rescene.test.test_main",
+		"rescene.test.test_instrumentation",
+		"rescene.test.test_recovery",
+		"rescene.test.test_scan",
+		"rescene.test.test_index",
+		"rescene.test.test_crc32combine",
 		"resample.test.test_main",
 		"resample.test.test_ebml",
 		"resample.test.test_mp3",
+		"resample.test.test_buffer",
+		"resample.test.test_fpcalc",
+		"resample.test.test_verify",
+		"resample.test.test_batch",
+		"resample.test.test_checkpoint",
 	)))
 
 	sys.path.append(os.path.join(curdir, "usenet"))
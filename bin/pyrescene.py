@@ -67,13 +67,17 @@ except ImportError:
 
 import rescene
 from resample.srs import main as srsmain
+from resample.verify import SampleProfile, match_samples
 from rescene.srr import MessageThread
 from rescene.main import MsgCode, FileNotFound, custom_popen
+from rescene.instrumentation import subscribe_from_environment
 from rescene.rar import RarReader, BlockType
 from rescene.utility import empty_folder, _DEBUG, parse_sfv_file
 from rescene.unrar import locate_unrar
 from resample.fpcalc import ExecutableNotFound, MSG_NOTFOUND
+from resample.fpcalc import fingerprint_many
 from resample.main import file_type_info, sample_class_factory, FileType
+from resample.main import IncompleteSample
 from rescene.utility import raw_input, unicode, fsunicode
 from rescene.utility import decodetext, encodeerrors
 from rescene.utility import create_temp_file_name, replace_result
@@ -170,6 +174,28 @@ def get_files_list(release_dir, extension_list):
 		# TypeError: must be (buffer overflow), not str
 		return matches
 
+def verify_samples(samples, main_files):
+	"""Profiles each sample once and checks the main files in order until
+	one contains it. The samples still looking for their main file are
+	located together, walking each main file only once.
+	Returns a dictionary with a (SampleProfile, MainFileMatch list) tuple
+	for each sample or (None, error) when profiling failed."""
+	verified = {}
+	for sample in samples:
+		try:
+			verified[sample] = (SampleProfile(sample), [])
+		except (ValueError, IncompleteSample) as err:
+			verified[sample] = (None, err)
+	for main_file in main_files:
+		todo = [sample for sample in samples if verified[sample][0] and
+		        not any(r.usable for r in verified[sample][1])]
+		if not todo:
+			break
+		matches = match_samples([verified[s][0] for s in todo], main_file)
+		for (sample, match) in zip(todo, matches):
+			verified[sample][1].append(match)
+	return verified
+
 def get_sample_files(reldir):
 	sample_files = get_files_list(reldir, FileType.VideoExtensions)
 
@@ -882,10 +908,11 @@ def generate_srr(reldir, working_dir, options, mthread):
 	# OR it's a fix release without sfv and main rars (just nfo; proof,... dir)
 	if (len(main_sfvs) or (not len(main_sfvs) and not len(main_rars))):
 		try:
+			# the stored files are added in the right order at the end
 			result = rescene.create_srr(
 			    srr, main_sfvs, reldir, [], True,
 			    options.compressed, options.isdb_hash,
-				tmp_srr_name=tmp_srr_name)
+				tmp_srr_name=tmp_srr_name, store_sfvs=False)
 			# when the user decides not to overwrite an existing SRR
 			if not result:
 				return False
@@ -922,10 +949,6 @@ def generate_srr(reldir, working_dir, options, mthread):
 		print("No SFV files found.")
 		return False
 
-	# remove all stored files so we can add them all in the right order again
-	rescene.remove_stored_files(tmp_srr_name,
-		rescene.info(tmp_srr_name)["stored_files"])
-
 	# copy all files to store to the working dir + their paths
 	copied_files = []
 	is_music = False
@@ -974,6 +997,23 @@ def generate_srr(reldir, working_dir, options, mthread):
 		if len(list(group)) > 1:
 			same_srs_name.append(name)
 
+	# fingerprint all music tracks up front with parallel fpcalc processes
+	music_files = [m for m in media_files
+	               if m.lower().endswith((".mp3", ".flac", ".mp2"))]
+	if len(music_files) > 1:
+		try:
+			fingerprint_many(music_files,
+			                 rescene.utility.temporary_directory)
+		except ExecutableNotFound:
+			pass  # reported when the SRS file is created
+
+	# locate all samples together in each main file
+	verified = {}
+	if options.sample_verify:
+		verified = verify_samples([m for m in media_files
+			if not m.lower().endswith((".mp3", ".flac", ".mp2",
+			                           ".m2ts", ".ts"))], main_rars)
+
 	# Create SRS files
 	for sample in media_files:
 		# avoid copying samples
@@ -1004,14 +1044,25 @@ def generate_srr(reldir, working_dir, options, mthread):
 			print("Checking against the following main files:")
 			for mrar in main_rars:
 				print("\t%s" % mrar)
-			for main in main_rars:
-				try:
-					srsmain([sample, "-y", "-o", srs_result, "-c", main], True)
+			(profile, results) = verified[sample]
+			if profile is None:
+				print(results)
+				results = []
+			for result in results:
+				if result.usable:
+					print(result.message)
+					try:
+						profile.create_srs(srs_result, result)
+					except (EnvironmentError, ValueError) as err:
+						print("SRS creation failed: %s" % err)
+						break
+					print("Successfully created SRS file: %s" %
+					      os.path.basename(srs_result))
 					copied_files.append(srs_result)
 					found = True
-					break
-				except ValueError:
-					print("Sample not found in %s." % main)
+				else:
+					print(result.message)
+					print("Sample not found in %s." % result.main_file)
 			if not found:
 				logging.info("%s: Sample failed to verify against main files: "
 				             "%s" % (reldir, os.path.basename(sample)))
@@ -1550,6 +1601,7 @@ def main(argv=None):
 		return 0
 
 	(options, indirs) = parser.parse_args(args=argv)
+	subscribe_from_environment()
 
 	if options.best_settings:
 		options.compressed = True
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+from __future__ import print_function
+
+import optparse
+import sys
+
+try:
+	import _preamble
+except ImportError:
+	pass
+
+from rescene.index import SrrIndex
+
+def main(options, args):
+	with SrrIndex(args[0]) as index:
+		if options.update:
+			(indexed, removed) = index.update(args[1:],
+				processes=options.processes, prune=not options.keep)
+			print("%d SRR files indexed, %d removed, %d in total." %
+			      (indexed, removed, len(index)), file=sys.stderr)
+		elif len(args) > 1:
+			print("SRR files and directories are only used with -u.",
+			      file=sys.stderr)
+			return 1
+
+		for crc in options.crcs:
+			for (srr_file, name) in index.with_crc(crc):
+				print("%s\t%s" % (srr_file, name))
+		for oso_hash in options.oso_hashes:
+			for (srr_file, name) in index.with_oso_hash(oso_hash):
+				print("%s\t%s" % (srr_file, name))
+		if options.list_crcs:
+			for (srr_file, name, crc) in index.archived_files():
+				print("%s\t%s" % (name, crc))
+		if options.compressed:
+			for srr_file in index.compressed():
+				print(srr_file)
+		if options.nonfo:
+			for srr_file in index.missing(".nfo"):
+				print(srr_file)
+		if options.nosfv:
+			for srr_file in index.missing(".sfv"):
+				print(srr_file)
+		if options.duplicates:
+			for group in index.duplicates():
+				print("\t".join(group))
+		if options.errors:
+			for (srr_file, error) in index.errors():
+				print("%s\t%s" % (srr_file, error))
+	return 0
+
+if __name__ == '__main__':
+	parser = optparse.OptionParser(
+		usage="Usage: %prog database [srr files] [directories] [options]\n"
+		"This tool keeps an index of the metadata of SRR files and "
+		"queries it.",
+		version="%prog 1.0 (2026-10-19)")  # --help, --version
+
+	parser.add_option("-u", "--update", action="store_true", dest="update",
+					default=False, help="index the new and changed SRR "
+					"files of the given files and directories first")
+	parser.add_option("-k", "--keep", action="store_true", dest="keep",
+					default=False, help="keep indexed SRR files that "
+					"do not exist anymore when updating")
+	parser.add_option("-j", dest="processes", type="int", metavar="N",
+					help="read the SRR files with N processes "
+					"(default: the amount of CPUs)")
+
+	parser.add_option("--crc", dest="crcs", action="append", default=[],
+					metavar="CRC", help="SRRs with an archived file with CRC")
+	parser.add_option("--oso", dest="oso_hashes", action="append",
+					default=[], metavar="HASH",
+					help="SRRs with a file with this OSO hash")
+	parser.add_option("-l", "--list-crcs", action="store_true",
+					dest="list_crcs", default=False,
+					help="list the CRCs of all archived files")
+	parser.add_option("-c", "--compressed", action="store_true",
+					dest="compressed", default=False,
+					help="list SRRs of compressed RARs")
+	parser.add_option("-d", "--duplicates", action="store_true",
+					dest="duplicates", default=False,
+					help="list SRRs with the same content hash on one line")
+	parser.add_option("-n", "--nonfo", action="store_true", dest="nonfo",
+					default=False, help="list SRRs without NFO")
+	parser.add_option("-s", "--nosfv", action="store_true", dest="nosfv",
+					default=False, help="list SRRs without SFV")
+	parser.add_option("-e", "--errors", action="store_true", dest="errors",
+					default=False, help="list SRRs that could not be read")
+
+	# no arguments given
+	if len(sys.argv) < 2:
+		print(parser.format_help())
+	else:
+		(options, args) = parser.parse_args()
+		if not args:
+			parser.error("no database given")
+		sys.exit(main(options, args))
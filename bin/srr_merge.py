@@ -24,6 +24,8 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 # OTHER DEALINGS IN THE SOFTWARE.
 
+from __future__ import print_function
+
 import optparse
 import sys
 
@@ -34,7 +36,29 @@ except ImportError:
 
 import rescene
 
+def read_batch(batch_file):
+	"""Yields a (srr_files, output_file) tuple for each line."""
+	with open(batch_file) as batch:
+		for line in batch:
+			line = line.rstrip("\r\n")
+			if not line.strip() or line.startswith("#"):
+				continue
+			fields = line.split("\t")
+			yield (fields[1:], fields[0])
+
 def main(options, args):
+	if options.batch:
+		failed = 0
+		jobs = read_batch(options.batch)
+		for (destination, err) in rescene.merge_srrs_many(
+				jobs, options.processes):
+			if err is None:
+				print(destination)
+			else:
+				failed += 1
+				print("%s: %s" % (destination, err), file=sys.stderr)
+		return 1 if failed else 0
+
 	srr_list = args
 
 	if not options.output_name:
@@ -43,6 +67,7 @@ def main(options, args):
 		destination = options.output_name
 
 	rescene.merge_srrs(srr_list, destination)
+	return 0
 
 if __name__ == '__main__':
 	parser = optparse.OptionParser(
@@ -52,10 +77,17 @@ if __name__ == '__main__':
 
 	parser.add_option("-o", dest="output_name",
 					help="name (and path) of the new SRR file")
+	parser.add_option("-b", "--batch", dest="batch", metavar="FILE",
+					help="merge many sets of SRR files: each line of FILE "
+					"has the new SRR file followed by the SRR files to "
+					"join, separated by tabs")
+	parser.add_option("-j", dest="processes", type="int", metavar="N",
+					help="amount of merges running at the same time in "
+					"batch mode (default: the amount of CPUs)")
 
 	# no arguments given
 	if len(sys.argv) < 2:
 		print(parser.format_help())
 	else:
 		(options, args) = parser.parse_args()
-		main(options, args)
+		sys.exit(main(options, args))
@@ -24,12 +24,12 @@
 # FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 # OTHER DEALINGS IN THE SOFTWARE.
 
-from __future__ import division
+from __future__ import division, print_function
 
+import functools
 import optparse
 import sys
 import os
-import glob
 import re
 
 try:
@@ -37,161 +37,152 @@ try:
 except ImportError:
 	pass
 
-import rescene
-from rescene.rar import RarReader, BlockType, COMPR_STORING
+from rescene.rar import BlockType, COMPR_STORING
+from rescene.scan import find_srrs, scan
 
-def check_compression(srr_file):
-	for block in RarReader(srr_file):
-		if block.rawtype == BlockType.RarPackedFile:
-			if block.compression_method != COMPR_STORING:
-				return True
+def check_compression(parsed):
+	for block in parsed.of_type(BlockType.RarPackedFile):
+		if block.compression_method != COMPR_STORING:
+			return True
 	return False
 
-def check_empty(srr_file):
-	for block in RarReader(srr_file):
-		if block.rawtype == BlockType.RarPackedFile:
-			return False
-	return True
+def check_empty(parsed):
+	return not parsed.of_type(BlockType.RarPackedFile)
 
-def check_image(srr_file, noproof):
+def check_image(parsed, noproof):
 	images = (".jpg", ".png", ".bmp", ".gif", "jpeg")
-	for block in RarReader(srr_file):
-		if (block.rawtype == BlockType.SrrStoredFile and
-			os.path.splitext(block.file_name)[1] in images):
+	for block in parsed.of_type(BlockType.SrrStoredFile):
+		if os.path.splitext(block.file_name)[1] in images:
 			if noproof and "proof" in block.file_name.lower():
 				return False
 			return True
 	return False
 
-def check_repack(srr_file):
+def check_repack(parsed):
 	tmatch = ("rpk", "repack", "-r.part01.rar", "-r.rar")
-	for block in RarReader(srr_file):
-		if block.rawtype == BlockType.SrrRarFile:
-			matchf = lambda keyword: keyword in block.file_name
-			if any(map(matchf, tmatch)):
-				return True
+	for block in parsed.of_type(BlockType.SrrRarFile):
+		matchf = lambda keyword: keyword in block.file_name
+		if any(map(matchf, tmatch)):
+			return True
 	return False
 
-def check_nfos(srr_file):
-	for block in RarReader(srr_file):
-		nfo_count = 0
-		if (block.rawtype == BlockType.SrrStoredFile and
-			block.file_name[-4:].lower() == ".nfo"):
+def check_nfos(parsed):
+	"""Two or more NFO files are stored in the SRR file."""
+	nfo_count = 0
+	for block in parsed.of_type(BlockType.SrrStoredFile):
+		if block.file_name[-4:].lower() == ".nfo":
 			nfo_count += 1
 	return False if nfo_count <= 1 else True
 
-def check_duplicates(srr_file):
+def check_duplicates(parsed):
 	found = []
-	for block in RarReader(srr_file):
-		if (block.rawtype == BlockType.SrrStoredFile):
-			if found.count(block.file_name):
-				return True
-			found.append(block.file_name)
+	for block in parsed.of_type(BlockType.SrrStoredFile):
+		if found.count(block.file_name):
+			return True
+		found.append(block.file_name)
 	return False
 
-def check_for_possible_nonscene(srr_file):
-	for block in RarReader(srr_file):
-		if (block.rawtype == BlockType.SrrRarFile and
-			block.file_name != block.file_name.lower()):
+def check_for_possible_nonscene(parsed):
+	for block in parsed.of_type(BlockType.SrrRarFile):
+		if block.file_name != block.file_name.lower():
 			return True
 	return False
 
-def check_availability_stored_files(srr_file):
-	for block in RarReader(srr_file):
-		if block.rawtype == BlockType.SrrStoredFile:
-			return False
-	return True
+def check_availability_stored_files(parsed):
+	return not parsed.of_type(BlockType.SrrStoredFile)
 
-def check_for_no_ext(srr_file, extension):
-	for block in RarReader(srr_file):
-		if (block.rawtype == BlockType.SrrStoredFile and
-			block.file_name.lower().endswith(extension)):
-			return False
-	return True
+def check_for_no_ext(parsed, extension):
+	return not check_for_ext(parsed, extension)
 
-def check_for_ext(srr_file, extension):
-	for block in RarReader(srr_file):
-		if (block.rawtype == BlockType.SrrStoredFile and
-			block.file_name.lower().endswith(extension)):
+def check_for_ext(parsed, extension):
+	for block in parsed.of_type(BlockType.SrrStoredFile):
+		if block.file_name.lower().endswith(extension):
 			return True
 	return False
 
-rar_sizes = 0  # bytes
+def evaluate(options, parsed):
+	"""Runs all requested checks on the parsed SRR file.
+	Returns (matched, RAR size, is dirfix/nfofix)."""
+	srr_file = parsed.srr_file
+	result = False
+	rar_size = 0
+	if options.verify or options.multiple:
+		info = parsed.info()
+		rar_size = sum([info['rar_files'][f].file_size
+		                for f in info['rar_files']])
+		if options.multiple:
+			sets = []
+			for f in info["rar_files"]:
+				ms = "^(.*?)(.part\d+.rar|(.[rstuv]\d\d|.rar))$"
+				base = re.match(ms, f, re.IGNORECASE).group(1)
+				if not base in sets:
+					sets.append(base)
+			result |= len(info["archived_files"]) > len(sets)
+			# print(sets) # useful to check ordering
 
-def check(srr_file):
-	try:
-		result = False
-		if options.verify or options.multiple:
-			info = rescene.info(srr_file)
-			global rar_sizes
-			rar_sizes += sum([info['rar_files'][f].file_size
-			                  for f in info['rar_files']])
-			if options.multiple:
-				sets = []
-				for f in info["rar_files"]:
-					ms = "^(.*?)(.part\d+.rar|(.[rstuv]\d\d|.rar))$"
-					base = re.match(ms, f, re.IGNORECASE).group(1)
-					if not base in sets:
-						sets.append(base)
-				result |= len(info["archived_files"]) > len(sets)
-				# print(sets) # useful to check ordering
+	dirfix = options.dirfix and (
+		"dirfix" in srr_file.lower() or "nfofix" in srr_file.lower())
+	if options.lowercase:
+		group = srr_file[:-4].rsplit("-")[-1]
+		if group == group.lower():
+			result |= True
+		if "." in group:  # does not have a group name
+			result |= True
+		fn = os.path.split(srr_file)[1]
+		if fn == fn.lower():
+			result |= True
 
-		if options.dirfix:
-			if "dirfix" in srr_file.lower() or "nfofix" in srr_file.lower():
-				print(srr_file)
-		if options.lowercase:
-			group = srr_file[:-4].rsplit("-")[-1]
-			if group == group.lower():
-				result |= True
-			if "." in group:  # does not have a group name
-				result |= True
-			fn = os.path.split(srr_file)[1]
-			if fn == fn.lower():
-				result |= True
+	if options.compressed:
+		result |= check_compression(parsed)
+	if options.empty:
+		result |= check_empty(parsed)
+	if options.image or options.noproof:
+		result |= check_image(parsed, options.noproof)
+	if options.repack:
+		result |= check_repack(parsed)
+	if options.nfos:
+		result |= check_nfos(parsed)
+	if options.duplicates:
+		result |= check_duplicates(parsed)
+	if options.peer2peer:
+		result |= check_for_possible_nonscene(parsed)
+	if options.nofiles:
+		result |= check_availability_stored_files(parsed)
+	if options.nosfv:
+		result |= check_for_no_ext(parsed, ".sfv")
+	if options.nonfo:
+		result |= check_for_no_ext(parsed, ".nfo")
+	if options.txt:
+		result |= check_for_ext(parsed, ".txt")
+	return (result, rar_size, dirfix)
 
-		if options.compressed:
-			result |= check_compression(srr_file)
-		if options.empty:
-			result |= check_empty(srr_file)
-		if options.image or options.noproof:
-			result |= check_image(srr_file, options.noproof)
-		if options.repack:
-			result |= check_repack(srr_file)
-		if options.nfos:
-			result |= check_nfos(srr_file)
-		if options.duplicates:
-			result |= check_duplicates(srr_file)
-		if options.peer2peer:
-			result |= check_for_possible_nonscene(srr_file)
-		if options.nofiles:
-			result |= check_availability_stored_files(srr_file)
-		if options.nosfv:
-			result |= check_for_no_ext(srr_file, ".sfv")
-		if options.nonfo:
-			result |= check_for_no_ext(srr_file, ".nfo")
-		if options.txt:
-			result |= check_for_ext(srr_file, ".txt")
-		if result and options.output_dir:
-			print("Moving %s." % srr_file)
-			srr_name = os.path.basename(srr_file)
-			# move the SRR to the given directory
-			os.renames(srr_file, os.path.join(options.output_dir, srr_name))
+def main(options, args):
+	rar_sizes = 0  # bytes
+	srr_files = find_srrs(args,
+		unknown=lambda path: print("WTF are you supplying me?"))
+	for (srr_file, evaluated, err) in scan(srr_files,
+			functools.partial(evaluate, options), options.processes):
+		if err:
+			# the storing of a srr_file failed -> corrupt SRR
+			print("Something wrong with reading %s" % srr_file)
+			print(err)
+			continue
+		(result, rar_size, dirfix) = evaluated
+		rar_sizes += rar_size
+		if dirfix:
+			print(srr_file)
+		try:
+			if result and options.output_dir:
+				print("Moving %s." % srr_file)
+				srr_name = os.path.basename(srr_file)
+				# move the SRR to the given directory
+				os.renames(srr_file, os.path.join(options.output_dir, srr_name))
+		except EnvironmentError as err:
+			print("Something wrong with moving %s" % srr_file)
+			print(err)
+			continue
 		if result:
 			print(os.path.basename(srr_file))
-	except (EnvironmentError, Exception) as err:
-		# the storing of a srr_file failed -> corrupt SRR
-		print("Something wrong with reading %s" % srr_file)
-		print(err)
-
-def main(options, args):
-	for element in args:
-		if os.path.isdir(element):
-			for srr_file in glob.iglob(element + "/*.srr"):
-				check(srr_file)
-		elif os.path.isfile(element) and element.endswith(".srr"):
-			check(element)
-		else:
-			print("WTF are you supplying me?")
 
 	if rar_sizes:
 		print("%d bytes" % rar_sizes)
@@ -250,6 +241,9 @@ if __name__ == '__main__':
 
 	parser.add_option("-o", dest="output_dir", metavar="DIRECTORY",
 					help="moves the matched SRR files to the given DIRECTORY")
+	parser.add_option("-j", dest="processes", metavar="N", type="int",
+					help="check the SRR files with N processes "
+					"(default: the amount of CPUs)")
 
 	# no arguments given
 	if len(sys.argv) < 2:
@@ -26,61 +26,49 @@
 
 import optparse
 import sys
-import tempfile
 import os
-from os.path import join, dirname, basename
+from os.path import dirname, basename
 
 try:
 	import _preamble
 except ImportError:
 	pass
 
-from rescene.main import info, extract_files
+from rescene.rar import RarReader, BlockType
+from rescene.rarstream import SrrStream
 from resample.main import file_type_info, sample_class_factory, FileType
-from rescene.utility import empty_folder
 
 def main(options, args):
 	if not options.txt and not options.verify:
 		print("Add the parameter -t or -s.")
 
-	tempdir = tempfile.mkdtemp(prefix="pyReScene-srs_bad-")
 	for dirpath, dirnames, filenames in os.walk(args[0]):
 		dirnames.sort()
 		for sfile in filenames:
 			if sfile[-4:].lower() == ".srr":
 				srrf = os.path.join(dirpath, sfile)
-				handle_srr(srrf, options, tempdir)
-	os.rmdir(tempdir)
+				handle_srr(srrf, options)
 
-def handle_srr(srr_file, options, temporary_directory):
-	srrinfo = info(srr_file)
-	extracting_needed = False
+def handle_srr(srr_file, options):
 	printout = set()
 
-	# check txt files/check if extraction is needed
-	for stored_file in srrinfo["stored_files"].keys():
+	for block in RarReader(srr_file):
+		if block.rawtype != BlockType.SrrStoredFile:
+			continue
+		stored_file = block.file_name
 		if stored_file.endswith(".srs") and options.verify:
-			extracting_needed = True
-		elif (stored_file.endswith(".txt") and stored_file[:-4].endswith((
-			".mp3", ".flac", ".mkv", ".mp4", ".avi", ".wmv"))) and options.txt:
-			printout.add(stored_file)
-
-	if extracting_needed:
-		extract_files(srr_file, temporary_directory, extract_paths=False)
-		for value in srrinfo["stored_files"].values():
-			fn = basename(value.file_name)
-			if fn.endswith(".srs"):
-				srsf = join(temporary_directory, fn)
+			# the SRS file is read from the SRR without extracting it
+			with SrrStream(srr_file, block=block) as srsf:
 				ft = file_type_info(srsf).file_type
 				if ft not in [FileType.MP3, FileType.FLAC]:
 					sample = sample_class_factory(ft)
 					_srs_data, tracks = sample.load_srs(srsf)
 					for track in tracks.values():
 						if track.match_offset == 0:
-							printout.add(fn)
-
-		# clean out temp dir
-		empty_folder(temporary_directory)
+							printout.add(basename(stored_file))
+		elif (stored_file.endswith(".txt") and stored_file[:-4].endswith((
+			".mp3", ".flac", ".mkv", ".mp4", ".avi", ".wmv"))) and options.txt:
+			printout.add(stored_file)
 
 	if len(printout):
 		if options.simple:
@@ -96,7 +84,7 @@ if __name__ == '__main__':
 	parser = optparse.OptionParser(
 		usage="Usage: %prog directory options'\n"
 		"This tool will list SRR files with 'sample' issues.\n"
-		"It works recursively and will write many temporary files on disk.",
+		"It works recursively.",
 		version="%prog 0.1 (2013-12-02)")  # --help, --version
 	# 0.1 (2013-12-02)
 
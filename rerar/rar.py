@@ -26,8 +26,6 @@
 
 """Rar archive access, extended from "rarfile" module"""
 
-USE_NUMPY = True
-
 # Optimum values possibly depend on speed of Python and cache sizes and
 # characteristics
 buf_size = 0x10000
@@ -54,20 +52,16 @@ from rarfile import (
 import struct
 import io
 
-if USE_NUMPY:
-    try:
-        import numpy
-    except ImportError:
-        USE_NUMPY = False
-if not USE_NUMPY:
-    import array
+# The recovery record calculation is shared with rescene
+from rescene.recovery import RecoveryRecord
+from rescene.crc32combine import crc32_combine_function
 
 RAR_MAIN_EXTRA = 2 + 4
 MAIN_HDR_SIZE = S_BLK_HDR.size + RAR_MAIN_EXTRA
 
 def write_main(volume, version, is_rr, is_first_vol, naming, is_lock):
     write_block(volume,
-        type=RAR_BLOCK_MAIN,
+        btype=RAR_BLOCK_MAIN,
         flags=RAR_MAIN_VOLUME ^
             is_rr * RAR_MAIN_RECOVERY ^
             (version >= 3 and is_first_vol) * RAR_MAIN_FIRSTVOLUME ^
@@ -82,14 +76,14 @@ dictsize, host_os, attr, accum_crc, dostime, xtime=None, size=None,
 pack_size=None):
     size_64 = size_64_encode(pack_size, size)
     header_size = file_hdr_size(name, xtime, size_64)
-    volume.seek(+header_size, io.SEEK_CUR)
+    volume.skip(header_size)
 
     left = pack_size
     crc = 0 if split_after else accum_crc
     while left > 0:
         chunk = file.read(min(FILE_COPY_CRC_BUF, left))
         left -= len(chunk)
-        volume.write(chunk)
+        volume.write_data(chunk)
         crc = crc32(chunk, crc)
         if split_after:
             accum_crc = crc32(chunk, accum_crc)
@@ -113,9 +107,7 @@ pack_size=None):
         flags ^= RAR_FILE_EXTTIME
         parts.append(xtime)
 
-    volume.seek(-pack_size - header_size, io.SEEK_CUR)
-    write_block(volume, RAR_BLOCK_FILE, flags, parts)
-    volume.seek(+pack_size, io.SEEK_CUR)
+    volume.fill(block_bytes(RAR_BLOCK_FILE, flags, parts))
 
     if split_after: return accum_crc
 
@@ -251,19 +243,18 @@ ATTR_ARCHIVE = 5
 ATTR_NORMAL = 7
 
 def write_rr(version, host_os, volume, rr_count):
-    prot_size = volume.tell()
-    (rr_crcs, rr_sects) = rr_calc(volume, rr_count, prot_size)
+    (rr_crcs, rr_sects) = volume.recovery_data()
 
     crc = crc32(rr_crcs, RR_CRC_INIT)
     for s in rr_sects:
-        crc = crc32(s.buffer(), crc)
+        crc = crc32(s, crc)
 
     prot_sect_count = len(rr_crcs) // S_SHORT.size
     size = prot_sect_count * RR_CRC_SIZE + rr_count * RR_SECT_SIZE
 
     if version < 3:
         write_block(volume,
-            type=RAR_BLOCK_OLD_RECOVERY,
+            btype=RAR_BLOCK_OLD_RECOVERY,
             flags=RAR_LONG_BLOCK ^ RAR_SKIP_IF_UNKNOWN,
             data=(
                 S_LONG.pack(size),
@@ -274,7 +265,7 @@ def write_rr(version, host_os, volume, rr_count):
             ))
     else:
         write_block(volume,
-            type=RAR_BLOCK_SUB,
+            btype=RAR_BLOCK_SUB,
             flags=RAR_LONG_BLOCK ^ RAR_SKIP_IF_UNKNOWN,
             data=(
                 S_FILE_HDR.pack(size, size, host_os, crc, 0, 29, ord("0"),
@@ -285,30 +276,15 @@ def write_rr(version, host_os, volume, rr_count):
                 struct.pack("<Q", prot_sect_count),
             ))
 
-    volume.write(rr_crcs)
+    volume.write_data(rr_crcs)
     for s in rr_sects:
-        volume.write(s.buffer())
+        volume.write_data(s)
 
 def rr_calc(volume, rr_count, size):
     volume.seek(0)
-
-    rr_crcs = bytearray()
-    rr_sects = tuple(BitVector(RR_SECT_SIZE) for _ in range(rr_count))
-
-    aslice = 0
-    while size > 0:
-        if size < RR_SECT_SIZE:
-            chunk = volume.read(size).ljust(RR_SECT_SIZE, bytes((0,)))
-            size = 0
-        else:
-            chunk = volume.read(RR_SECT_SIZE)
-            size -= RR_SECT_SIZE
-
-        rr_crcs.extend(S_SHORT.pack(~crc32(chunk) & bitmask(16)))
-        rr_sects[aslice].xor(chunk)
-        aslice = (aslice + 1) % rr_count
-
-    return (rr_crcs, rr_sects)
+    rr = RecoveryRecord(rr_count)
+    rr.read_from(volume, size)
+    return (rr.crcs(), rr.parity())
 
 def calc_rr_count(version, total, vol_max):
     if version < 3:
@@ -373,31 +349,142 @@ RR_QUANTUM = RR_SECT_SIZE + RR_CRC_SIZE
 #         than bytearray
 #     array-wise numpy.array(dtype=int) xor operation was about 3.5 times
 #         faster than for element-wise array.array("L")
-if USE_NUMPY:
-    class BitVector:
-        def __init__(self, size):
-            self.array = numpy.frombuffer(bytearray(size),
-                dtype=numpy.int)
-        def buffer(self):
-            return self.array
-        def xor(self, buffer):
-            return self.array.__ixor__(
-                numpy.frombuffer(buffer, dtype=numpy.int))
-else:
-    class BitVector:
-        def __init__(self, size):
-            self.array = array.array("L", bytes(size))
-        def buffer(self):
-            return self.array
-        def xor(self, buffer):
-            for (i, v) in enumerate(array.array("L", buffer)):
-                self.array[i] ^= v
-            return self
+class VolumeFile:
+    """Writes a volume in a single pass
+
+    The volume CRC, the recovery record sector CRCs and the XOR parity
+    sectors are kept up to date with the data written, so nothing is read
+    back from the volume. The file header is written after the data it
+    describes: skip() leaves room for it and fill() writes it. The data
+    sharing a sector with the header is held back until then.
+
+    With headers_only, the file data and recovery data are left out of
+    the file, as in an SRR file. They are still included in the CRC and
+    recovery data calculations."""
+
+    def __init__(self, file, rr_count=0, headers_only=False):
+        self.file = file
+        self.headers_only = headers_only
+        self.rr_count = rr_count
+        self.recovery = RecoveryRecord(rr_count) if rr_count else None
+        self.protect = bool(rr_count)
+        self.size = 0
+        # Contiguous runs of bytes: [offset, crc, length, partial sector]
+        self.runs = [[0, 0, 0, bytearray()]]
+        self.hole = None
+        self.held = bytearray()
+
+    def __enter__(self):
+        self.file.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.file.__exit__(*exc)
+
+    def tell(self):
+        return self.size
+
+    def write(self, data):
+        self.file.write(data)
+        self._add(data)
+
+    def write_data(self, data):
+        """Writes file or recovery record data; block headers use write()"""
+        if not self.headers_only:
+            self.file.write(data)
+        self._add(data)
+
+    def _add(self, data):
+        self.size += len(data)
+        if self.hole is None:
+            self._update(self.runs[-1], data)
+            return
+
+        # Hold back the data up to the next sector after the hole
+        (_, end) = self.hole
+        resume = quanta(end, RR_SECT_SIZE) * RR_SECT_SIZE
+        held = max(0, min(len(data), resume - end - len(self.held)))
+        self.held.extend(data[:held])
+        if held < len(data):
+            if len(self.runs) < 2:
+                self.runs.append([resume, 0, 0, bytearray()])
+            self._update(self.runs[-1], memoryview(data)[held:])
+
+    def skip(self, size):
+        """Leaves room for size bytes to be written later by fill()"""
+        if self.hole is not None:
+            raise ValueError("Only one header can be pending")
+        self.hole = (self.size, self.size + size)
+        if not self.headers_only:
+            self.file.seek(+size, io.SEEK_CUR)
+        self.size += size
+
+    def fill(self, data):
+        (start, end) = self.hole
+        if len(data) != end - start:
+            raise ValueError("Header size differs from the reserved size")
+        if self.headers_only:
+            self.file.write(data)
+        else:
+            self.file.seek(start)
+            self.file.write(data)
+            self.file.seek(self.size)
+
+        run = self.runs[0]
+        self._update(run, data)
+        self._update(run, self.held)
+        self.hole = None
+        self.held = bytearray()
+        if len(self.runs) > 1:
+            (offset, crc, length, partial) = self.runs.pop()
+            run[1] = crc32_combine(run[1], crc, length)
+            run[2] += length
+            run[3] = partial
+
+    @property
+    def crc(self):
+        """CRC32 of all the bytes written so far"""
+        if self.hole is not None:
+            raise ValueError("Header not written yet")
+        return self.runs[0][1]
+
+    def recovery_data(self):
+        """Sector CRCs and XOR parity sectors of all bytes written so far.
+        Stops the recovery sector calculations."""
+        if self.hole is not None:
+            raise ValueError("Header not written yet")
+        partial = self.runs[0][3]
+        if partial:
+            self.recovery.add(bytes(partial), self.size // RR_SECT_SIZE)
+            del partial[:]
+        self.protect = False
+        return (self.recovery.crcs(), self.recovery.parity())
+
+    def _update(self, run, data):
+        run[1] = crc32(data, run[1])
+        if self.protect:
+            offset = run[0] + run[2] - len(run[3])
+            partial = run[3]
+            partial.extend(data)
+            whole = len(partial) - len(partial) % RR_SECT_SIZE
+            if whole:
+                self.recovery.add(bytes(partial[:whole]),
+                    offset // RR_SECT_SIZE)
+                del partial[:whole]
+        run[2] += len(data)
+
+_crc32_combine = None
+
+# CRC32 of the concatenation of two blocks, given the CRCs of the blocks
+# and the length of the second block; as crc32_combine() from zlib
+def crc32_combine(crc1, crc2, len2):
+    global _crc32_combine
+    if _crc32_combine is None:
+        _crc32_combine = crc32_combine_function()
+    return _crc32_combine(crc1, crc2, len2)
 
 def write_end(volume, version, flags, volnum, is_last_vol):
-    size = volume.tell()
-    volume.seek(0)
-    crc = file_crc32(volume, size)
+    crc = volume.crc
 
     if version >= 3:
         flags |= (RAR_SKIP_IF_UNKNOWN ^
@@ -434,6 +521,9 @@ END_EXTRA = 7
 
 # The "rar_decompress" function creates a Rar file but not in a reusable way
 def write_block(file, btype, flags, data):
+    file.write(block_bytes(btype, flags, data))
+
+def block_bytes(btype, flags, data):
     block = bytearray()
     for part in data: block.extend(part)
 
@@ -441,10 +531,7 @@ def write_block(file, btype, flags, data):
 
     crc = crc32(header)
     crc = crc32(block, crc)
-    file.write(S_SHORT.pack(crc & bitmask(16)))
-
-    file.write(header)
-    file.write(block)
+    return S_SHORT.pack(crc & bitmask(16)) + header + block
 
 HDR_CRC_POS = 0
 HDR_DATA_POS = 2
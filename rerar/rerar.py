@@ -28,6 +28,16 @@
 # characteristics
 FILE_CRC_BUF = 0x10000
 
+import sys
+import os
+
+try:
+    import rescene
+except ImportError:
+    # running from a source checkout: rescene is next to this folder
+    sys.path.insert(0, os.path.dirname(os.path.dirname(
+        os.path.realpath(__file__))))
+
 from binascii import crc32
 from rar import (
     S_BLK_HDR, S_FILE_HDR, S_SHORT, S_LONG, S_HIGH_SIZE,
@@ -57,19 +67,18 @@ from rar import (
     write_rr, rr_calc, calc_rr_count, calc_prot_size,
     RR_SECT_SIZE, RR_CRC_SIZE, RR_SUB_NAME, RR_PROTECT_2, RR_PROTECT_3,
     RR_HEADER_SIZE, RR_CRC_INIT,
-    write_end, end_size, END_EXTRA,
+    write_end, end_size, END_EXTRA, VolumeFile, crc32_combine,
     HDR_CRC_POS, HDR_DATA_POS, HDR_TYPE_POS, HDR_FLAGS_POS, HDR_SIZE_POS,
 )
-import sys
-import os
 import time
 import re
 import struct
 import io
 import math
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 
 def main():
-    # srr => Produce rescene file rather than Rar files
     # srr-rr-full => Do not strip Rar recovery records (older SRR file format). Requires srr and one of the rr options.
     # volume => Explicitly specify first, second, etc full volume name. Default is ".partN.rar" for "new" Rar 3 naming scheme, where the number of digits is automatically determined by the total number of volumes; and ".rar", ".r00", ".r01", etc, ".r99", ".s00", etc, ".s99" or ".001", ".002", etc, for the "old" naming scheme.
     # Option to only do the first volume, the first few volumes, or any given set of volumes?
@@ -80,6 +89,7 @@ def main():
     vol_max = 15 * 10 ** 6
     timestamp = None
     is_dryrun = False
+    is_srr = False
     is_rr = False
     is_unicode = False
     newline = "\r\n"
@@ -96,6 +106,7 @@ def main():
     lenient = False
     overwrite = False
     base = None
+    jobs = 1
     
     i = 1
     while i < len(sys.argv):
@@ -112,6 +123,9 @@ def main():
         elif "dryrun" == arg:
             is_dryrun = True
             i += 1
+        elif "srr" == arg:
+            is_srr = True
+            i += 1
         elif "rr" == arg:
             is_rr = True
             i += 1
@@ -191,6 +205,11 @@ def main():
         elif "base" == arg:
             base = sys.argv[i + 1]
             i += 2
+        elif "jobs" == arg:
+            jobs = int(sys.argv[i + 1])
+            if jobs < 1:
+                raise SystemExit("Number of jobs must be at least 1")
+            i += 2
         else:
             raise SystemExit('''Bad command line argument: {}
 Try "{} help"'''.format(arg, sys.argv[0]))
@@ -209,6 +228,7 @@ internal <grp-name.avi>
 time "<yyyy>-<mm>-<dd> <hh>:<mm>:<ss>[.<sssssss>]"
 \tOverride data file timestamp (Full resolution: +5 bytes per volume)
 dryrun\tDisplay file names and sizes but do not create them
+srr\tProduce a rescene (SRR) file rather than the Rar and SFV files
 rr\tProduce Rar 3 recovery records (~1% of total size)
 unicode\tStore data file name in Unicode (~4 bytes per volume)
 lf\tUse only LFs at end of text lines in SFV file
@@ -237,7 +257,9 @@ overwrite
 base <grp-name>
 \tBase output name, appended with ".sfv", ".partN" and ".rar" as
 \tappropriate. Default is the base name of the internal data file name
-\twith extension removed.""")
+\twith extension removed.
+jobs <n>
+\tWrite up to n volumes at the same time (default is 1)""")
 #~ time +/-s.sssssss\tAdjust data file timestamp
 #~ M specifies units of 10^6. (TODO: Use scene rules for default.)
         return
@@ -325,61 +347,151 @@ Try "{} help".""".format(sys.argv[0]))
         if not (overwrite and os.path.isdir(rls_name)):
             os.mkdir(rls_name)
     
-    Writer = DryRlsWriter if is_dryrun else RlsWriter
-    with Writer(file, version, host_os, is_rr, naming_version, newline) as (
-    rls):
+    if is_dryrun:
+        Writer = DryRlsWriter
+    elif is_srr:
+        Writer = SrrRlsWriter
+    else:
+        Writer = RlsWriter
+    writer_args = (file, version, host_os, is_rr, naming_version, newline)
+    props = RlsProps(is_lock, name_field, is_unicode, rdict, attr, dostime,
+        xtime_field, file_size, is_rr, end_flags)
+    with Writer(*writer_args) as rls:
         start_ellipsis = True
-        left = file_size
-        while left > 0:
-            volname = "{}.{}".format(base, next(volnum))
-            
-            is_first_vol = volnum.is_first()
-            is_last_vol = left <= data_max
-            data_size = left if is_last_vol else data_max
-            is_interesting = (not is_dryrun or volnum.is_interesting() or
-                volnum.num >= vol_count - 2)
+        pending = list()
+        executor = None
+        if jobs > 1 and not is_dryrun:
+            executor = ProcessPoolExecutor(jobs)
+        
+        try:
+            left = file_size
+            while left > 0:
+                volname = "{}.{}".format(base, next(volnum))
             
-            if is_interesting:
-                print(volname, end=": ", file=sys.stderr)
-                sys.stderr.flush()
-            elif start_ellipsis:
-                print(". . .", file=sys.stderr)
+                is_last_vol = left <= data_max
+                data_size = left if is_last_vol else data_max
+                is_interesting = (not is_dryrun or volnum.is_interesting() or
+                    volnum.num >= vol_count - 2)
+                plan = VolPlan(os.path.join(rls_name, volname), volnum.num,
+                    volnum.is_first(), is_last_vol, file_size - left, data_size,
+                    props)
             
-            with rls.new_vol(os.path.join(rls_name, volname)) as vol:
-                vol.write_id()
-                vol.write_main(is_first_vol, is_lock)
-                vol.write_file(not is_first_vol, not is_last_vol, name_field,
-                    is_unicode, rdict, attr, dostime, xtime_field, file_size,
-                    data_size)
-                
+                # The recovery sectors are calculated while writing the volume
                 if is_rr:
                     if is_last_vol or version < 3:
-                        rr_count = calc_rr_count(version, vol.size, vol_max)
+                        with DryVolWriter(rls) as dry:
+                            plan.write_data(dry)
+                        plan.rr_count = calc_rr_count(version, dry.size, vol_max)
                     else:
-                        rr_count = rr_max
-                    vol.write_rr(rr_count)
-                
-                vol.write_end(end_flags, volnum.num, is_last_vol)
+                        plan.rr_count = rr_max
+                left -= data_size
+            
+                if executor is not None and not is_last_vol:
+                    pending.append((volname, executor.submit(write_vol_job,
+                        Writer, writer_args, plan)))
+                    continue
+            
+                # The last volume needs the CRC of the whole file, so the
+                # other volumes are finished first
+                for (name, job) in pending:
+                    result = job.result()
+                    print(name, end=": ", file=sys.stderr)
+                    print_vol(result, is_dryrun)
+                    rls.vol_done(name, result)
+                    rls_size += result.size
+                pending = list()
+                if executor is not None:
+                    executor.shutdown()
+            
+                if is_interesting:
+                    print(volname, end=": ", file=sys.stderr)
+                    sys.stderr.flush()
+                elif start_ellipsis:
+                    print(". . .", file=sys.stderr)
             
-            rls.sfv_add(vol, volname)
-            rls_size += vol.size
+                vol = write_vol(rls, plan)
             
-            if is_interesting:
-                sys.stderr.write("Size: {}".format(fmt_size(vol.size)))
-                if not is_dryrun:
-                    sys.stderr.write(" CRC: {:08X}".format(vol.crc))
-                print(file=sys.stderr)
+                rls.sfv_add(vol, volname)
+                rls_size += vol.size
             
-            left -= data_size
-            start_ellipsis = is_interesting
+                if is_interesting:
+                    print_vol(vol, is_dryrun)
+            
+                start_ellipsis = is_interesting
+        finally:
+            # workers must not write volumes after the writer failed
+            if executor is not None:
+                for (_name, job) in pending:
+                    job.cancel()
+                executor.shutdown()
         
         rls.sfv_write(os.path.join(rls_name, sfv_name), sfvhead)
         print("{}: Size: {}".format(sfv_name, fmt_size(rls.sfv_size)),
             file=sys.stderr)
         rls_size += rls.sfv_size
+        
+        if is_srr and not is_dryrun:
+            srr_name = "{}.srr".format(base)
+            srr_size = rls.srr_write(os.path.join(rls_name, srr_name),
+                sfv_name)
+            print("{}: Size: {}".format(srr_name, fmt_size(srr_size)),
+                file=sys.stderr)
     
     print("Total release size: {}".format(fmt_size(rls_size)))
 
+RlsProps = namedtuple("RlsProps", """is_lock name_field is_unicode rdict attr
+    dostime xtime_field file_size is_rr end_flags""")
+
+class VolPlan:
+    """Everything needed to write a volume independently of the others"""
+    def __init__(self, path, num, is_first, is_last, data_pos, data_size,
+    props, rr_count=0):
+        self.path = path
+        self.num = num
+        self.is_first = is_first
+        self.is_last = is_last
+        self.data_pos = data_pos
+        self.data_size = data_size
+        self.props = props
+        self.rr_count = rr_count
+    
+    def write_data(self, vol):
+        props = self.props
+        vol.write_id()
+        vol.write_main(self.is_first, props.is_lock)
+        vol.write_file(not self.is_first, not self.is_last, props.name_field,
+            props.is_unicode, props.rdict, props.attr, props.dostime,
+            props.xtime_field, props.file_size, self.data_size)
+    
+    def write(self, vol):
+        self.write_data(vol)
+        if self.props.is_rr:
+            vol.write_rr(self.rr_count)
+        vol.write_end(self.props.end_flags, self.num, self.is_last)
+
+def write_vol(rls, plan):
+    if rls.data is not None:
+        rls.data.seek(plan.data_pos)
+    with rls.new_vol(plan.path, plan.rr_count) as vol:
+        plan.write(vol)
+    return vol
+
+VolResult = namedtuple("VolResult", "size crc file_crc data_size headers")
+
+def write_vol_job(Writer, writer_args, plan):
+    """Writes a volume in a worker process. The file_crc of the result only
+    covers the data of this volume."""
+    with Writer(*writer_args) as rls:
+        vol = write_vol(rls, plan)
+        return VolResult(vol.size, vol.crc, rls.file_crc, plan.data_size,
+            getattr(rls, "vol_headers", None))
+
+def print_vol(vol, is_dryrun):
+    sys.stderr.write("Size: {}".format(fmt_size(vol.size)))
+    if not is_dryrun:
+        sys.stderr.write(" CRC: {:08X}".format(vol.crc))
+    print(file=sys.stderr)
+
 def get_timestamp(s):
     frac = re.search(r"(\.\d*)?$", s)
     tm = time.strptime(s[:frac.start()], "%Y-%m-%d %H:%M:%S")
@@ -795,7 +907,7 @@ class Parser:
         
         for (i, sect) in enumerate(rr_sects):
             pos = self.file.tell()
-            calc_sect = bytes(sect.buffer())
+            calc_sect = sect
             read_sect = self.read(len(calc_sect))
             if read_sect != calc_sect:
                 self.error(pos, "Recovery sector {}/{} mismatch".
@@ -867,6 +979,7 @@ def fmt_size(size):
 class DryRlsWriter:
     def __init__(self, _name, version, _host_os, _is_rr, _naming, newline):
         self.version = version
+        self.data = None
         self.sfv_size = 0
         self.sfv_newline = newline
     
@@ -875,7 +988,7 @@ class DryRlsWriter:
     def __exit__(self, *exc):
         pass
     
-    def new_vol(self, _name):
+    def new_vol(self, _name, _rr_count=0):
         return DryVolWriter(self)
     
     def sfv_add(self, _vol, name):
@@ -905,19 +1018,65 @@ class RlsWriter(DryRlsWriter):
     def __exit__(self, *_exc):
         self.data.__exit__()
     
-    def new_vol(self, name):
-        return VolWriter(self, name)
+    def new_vol(self, name, rr_count=0):
+        return VolWriter(self, name, rr_count)
     
     def sfv_add(self, vol, name):
         self.sfv_entries[name] = vol.crc
         DryRlsWriter.sfv_add(self, vol, name)
     
+    def vol_done(self, name, result):
+        """Takes over a volume written by write_vol_job"""
+        self.file_crc = crc32_combine(self.file_crc, result.file_crc,
+            result.data_size)
+        self.sfv_add(result, name)
+    
     def sfv_write(self, name, head):
-        with open(name, "wt", encoding="latin-1", newline="") as sfv:
-            sfv.write(head.replace("\n", self.sfv_newline))
-            for entry in sorted(self.sfv_entries):
-                sfv.write("{} {:08x}{}".format(entry,
-                    self.sfv_entries[entry], self.sfv_newline))
+        with open(name, "wb") as sfv:
+            sfv.write(self.sfv_bytes(head))
+    
+    def sfv_bytes(self, head):
+        lines = [head.replace("\n", self.sfv_newline)]
+        for entry in sorted(self.sfv_entries):
+            lines.append("{} {:08x}{}".format(entry,
+                self.sfv_entries[entry], self.sfv_newline))
+        return "".join(lines).encode("latin-1")
+
+class SrrRlsWriter(RlsWriter):
+    """Produces a rescene file instead of the Rar volumes. The volumes are
+    calculated as usual, but only their block headers are kept."""
+    
+    def __init__(self, *pos, **kw):
+        RlsWriter.__init__(self, *pos, **kw)
+        self.vol_headers = list()
+        self.sfv = None
+    
+    def new_vol(self, name, rr_count=0):
+        return SrrVolWriter(self, name, rr_count)
+    
+    def vol_done(self, name, result):
+        self.vol_headers.extend(result.headers)
+        RlsWriter.vol_done(self, name, result)
+    
+    def sfv_write(self, name, head):
+        self.sfv = self.sfv_bytes(head)
+    
+    def srr_write(self, name, sfv_name):
+        """Writes the SRR file with the SFV file stored in it and returns
+        its size"""
+        import rescene
+        from rescene.rar import (SrrHeaderBlock, SrrStoredFileBlock,
+            SrrRarFileBlock)
+        
+        with open(name, "wb") as srr:
+            srr.write(SrrHeaderBlock(appname=rescene.APPNAME).block_bytes())
+            srr.write(SrrStoredFileBlock(file_name=sfv_name,
+                file_size=len(self.sfv)).block_bytes())
+            srr.write(self.sfv)
+            for (volname, headers) in self.vol_headers:
+                srr.write(SrrRarFileBlock(file_name=volname).block_bytes())
+                srr.write(headers)
+            return srr.tell()
 
 class DryVolWriter:
     def __init__(self, rls):
@@ -948,8 +1107,8 @@ class DryVolWriter:
         self.size += end_size(self.rls.version, flags)
 
 class VolWriter(DryVolWriter):
-    def __init__(self, rls, name):
-        self.file = open(name, "w+b")
+    def __init__(self, rls, name, rr_count=0):
+        self.file = VolumeFile(open(name, "wb"), rr_count)
         DryVolWriter.__init__(self, rls)
     
     def __enter__(self):
@@ -981,14 +1140,19 @@ class VolWriter(DryVolWriter):
         DryVolWriter.write_rr(self, count)
     
     def write_end(self, flags, volnum, is_last):
-        size = self.file.tell()
-        self.crc = write_end(self.file, self.rls.version, flags, volnum,
-            is_last)
+        write_end(self.file, self.rls.version, flags, volnum, is_last)
         DryVolWriter.write_end(self, flags, volnum, is_last)
-        size = self.file.tell() - size
-        
-        self.file.seek(-size, io.SEEK_CUR)
-        self.crc = crc32(self.file.read(size), self.crc)
+        self.crc = self.file.crc
+
+class SrrVolWriter(VolWriter):
+    def __init__(self, rls, name, rr_count=0):
+        self.name = os.path.basename(name)
+        self.file = VolumeFile(io.BytesIO(), rr_count, headers_only=True)
+        DryVolWriter.__init__(self, rls)
+    
+    def __exit__(self, *exc):
+        self.rls.vol_headers.append((self.name, self.file.file.getvalue()))
+        VolWriter.__exit__(self, *exc)
 
 class VolNumbering:
     def __init__(self):
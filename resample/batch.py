@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+"""Rebuilding of many samples from the same main file.
+
+Episode packs and multi-CD releases have several samples cut from the
+same main file. For AVI and MKV main files, rebuild_samples() walks the
+main file once to locate the tracks of all samples and once to extract
+them, instead of twice for every sample."""
+
+import collections
+import os
+
+from resample.main import file_type_info, sample_class_factory
+from resample.main import find_sample_streams_many
+from resample.main import extract_sample_streams_many
+from resample.verify import NOT_FOUND, check_located
+from rescene.utility import create_temp_file_name, replace_result
+
+REBUILT = "rebuilt"
+FAILED = "failed"
+
+class SampleRebuild(collections.namedtuple("SampleRebuild",
+		"srs_file status sample_file message")):
+	"""The result of rebuilding the sample of a single SRS file."""
+	__slots__ = ()
+
+class _Job(object):
+	def __init__(self, srs_file, main_file_info):
+		self.srs_file = srs_file
+		self.sample = sample_class_factory(file_type_info(srs_file).file_type)
+		(self.srs_data, self.tracks) = self.sample.load_srs(srs_file)
+		self.attachments = {}
+		if self.sample.file_type != main_file_info.file_type:
+			raise ValueError("SRS file and main file not the same format.")
+		# the ReSample object for the main file
+		self.movi = sample_class_factory(main_file_info.file_type)
+		self.movi.archived_file_name = main_file_info.archived_file
+		self.movi.cut_data = self.sample.cut_data
+
+	def needs_location(self):
+		return (any(t.match_offset == 0 for t in self.tracks.values()) or
+		        len(self.sample.cut_data))
+
+	def close(self):
+		for track in self.tracks.values():
+			if track.track_file:
+				track.track_file.close()
+		for attachment in self.attachments.values():
+			if attachment.attachment_file:
+				attachment.attachment_file.close()
+
+def rebuild_samples(srs_files, main_file, output_dir, can_overwrite=None):
+	"""Rebuilds the samples of srs_files from main_file in output_dir.
+	can_overwrite: called with the path of an existing sample; the sample
+	               is not rebuilt when it returns False
+	Returns a SampleRebuild result for each SRS file."""
+	main_file_info = file_type_info(main_file)
+	results = dict()
+	jobs = []
+	for srs_file in srs_files:
+		try:
+			jobs.append(_Job(srs_file, main_file_info))
+		except Exception as err:
+			results[srs_file] = SampleRebuild(srs_file, FAILED, None, str(err))
+
+	# 1) Find the sample streams in the main movie file
+	locate = [job for job in jobs if job.needs_location()]
+	if locate:
+		located = find_sample_streams_many(
+			[(job.movi, job.tracks) for job in locate], main_file)
+		for (job, tracks) in zip(locate, located):
+			(status, job.tracks, message) = check_located(job.sample, tracks)
+			if status == NOT_FOUND:
+				results[job.srs_file] = SampleRebuild(
+					job.srs_file, FAILED, None, message)
+		jobs = [job for job in jobs if job.srs_file not in results]
+
+	# 2) Extract those sample streams to memory
+	if jobs:
+		extracted = extract_sample_streams_many(
+			[(job.movi, job.tracks) for job in jobs], main_file)
+		for (job, (tracks, attachments)) in zip(jobs, extracted):
+			(job.tracks, job.attachments) = (tracks, attachments)
+
+	# 3) Recreate the samples
+	for job in jobs:
+		try:
+			results[job.srs_file] = _rebuild(job, output_dir, can_overwrite)
+		finally:
+			job.close()
+	return [results[srs_file] for srs_file in srs_files]
+
+def _rebuild(job, output_dir, can_overwrite):
+	for track in job.tracks.values():
+		if track.signature_bytes and (track.track_file == None or
+				track.track_file.tell() < track.data_length):
+			return SampleRebuild(job.srs_file, FAILED, None,
+				"Unable to extract correct amount of data for "
+				"track %s. Aborting." % track.track_number)
+
+	result_file = os.path.abspath(
+		os.path.join(output_dir, job.srs_data.name))
+	if (can_overwrite and os.path.exists(result_file) and
+		not can_overwrite(result_file)):
+		return SampleRebuild(job.srs_file, FAILED, None,
+			"Not overwriting %s." % job.srs_data.name)
+	out_file = create_temp_file_name(result_file)
+	sfile = job.sample.rebuild_sample(job.srs_data, job.tracks,
+		job.attachments, job.srs_file, out_file)
+	if sfile and sfile.crc32 == job.srs_data.crc32:
+		replace_result(out_file, result_file)
+		return SampleRebuild(job.srs_file, REBUILT, result_file,
+			"Successfully rebuilt sample: %s" % job.srs_data.name)
+	if os.path.exists(out_file):
+		os.unlink(out_file)
+	return SampleRebuild(job.srs_file, FAILED, None,
+		"Rebuild failed for sample: %s" % job.srs_data.name)
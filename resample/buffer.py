@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+"""Buffers for the track and attachment data extracted from a main file.
+
+All buffers share one memory budget. A buffer stays in memory as long as
+its data fits in the budget. Otherwise it is spilled to a temporary file
+in the pyReScene temporary directory."""
+
+import io
+import os
+import tempfile
+import threading
+
+from rescene import utility
+
+# maximum amount of MiB all in-memory track buffers together may use
+_MEMORY_BUDGET = int(os.environ.get("RESCENE_TRACK_MEMORY", 256))
+
+class MemoryBudget(object):
+	"""Bookkeeping of the bytes the in-memory buffers have reserved."""
+	def __init__(self, limit):
+		self.limit = limit
+		self.used = 0
+		self._lock = threading.Lock()
+
+	def reserve(self, amount):
+		"""Returns False when the amount doesn't fit in the budget."""
+		with self._lock:
+			if self.used + amount > self.limit:
+				return False
+			self.used += amount
+			return True
+
+	def release(self, amount):
+		with self._lock:
+			self.used = max(0, self.used - amount)
+
+budget = MemoryBudget(_MEMORY_BUDGET * 1024 * 1024)
+
+def set_memory_budget(limit):
+	"""limit: the amount of bytes all track buffers may keep in memory"""
+	budget.limit = limit
+
+def spill_directory():
+	"""The directory spilled buffers are written to."""
+	tmp = utility.temporary_directory
+	if tmp and os.path.isdir(tmp):
+		return tmp
+	return None
+
+class TrackBuffer(object):
+	"""File-like object holding the data of a single track or attachment.
+	expected_size: the amount of bytes that will likely be written
+	memory_budget: MemoryBudget object to use instead of the global one"""
+	def __init__(self, expected_size=0, memory_budget=None):
+		self._budget = memory_budget if memory_budget else budget
+		self._reserved = 0
+		self._view = None
+		self._file = io.BytesIO()
+		self.in_memory = True
+		if expected_size and not self._reserve(expected_size):
+			self._spill()
+
+	def _reserve(self, amount):
+		if self._budget.reserve(amount):
+			self._reserved += amount
+			return True
+		return False
+
+	def _release_view(self):
+		if self._view is not None:
+			self._view.release()
+			self._view = None
+
+	def _spill(self):
+		"""Moves the data written so far to a temporary file."""
+		self._release_view()
+		spilled = tempfile.TemporaryFile(dir=spill_directory())
+		position = self._file.tell()
+		spilled.write(self._file.getvalue())
+		spilled.seek(position)
+		self._file = spilled
+		self.in_memory = False
+		self._budget.release(self._reserved)
+		self._reserved = 0
+
+	def write(self, data):
+		if self.in_memory:
+			needed = self._file.tell() + len(data) - self._reserved
+			if needed > 0 and not self._reserve(needed):
+				self._spill()
+		self._release_view()
+		try:
+			return self._file.write(data)
+		except BufferError:
+			# a slice from read_view() is still in use: leave it alone
+			position = self._file.tell()
+			self._file = io.BytesIO(self._file.getvalue())
+			self._file.seek(position)
+			return self._file.write(data)
+
+	def read(self, amount=-1):
+		return self._file.read(amount)
+
+	def read_view(self, amount=-1):
+		"""Same as read(), but in memory data is returned as a memoryview
+		slice of the buffer instead of a copy."""
+		if not self.in_memory:
+			return self._file.read(amount)
+		if self._view is None:
+			try:
+				self._view = self._file.getbuffer()
+			except AttributeError:  # Python 2
+				self._view = memoryview(self._file.getvalue())
+		start = self._file.tell()
+		end = len(self._view)
+		if amount is not None and amount >= 0:
+			end = min(start + amount, end)
+		self._file.seek(max(start, end))
+		return self._view[start:end]
+
+	def seek(self, offset, whence=os.SEEK_SET):
+		return self._file.seek(offset, whence)
+
+	def tell(self):
+		return self._file.tell()
+
+	@property
+	def closed(self):
+		return self._file is None
+
+	def close(self):
+		if self._file is None:
+			return
+		self._release_view()
+		try:
+			self._file.close()
+		except BufferError:
+			pass  # the memory is freed with the last memoryview slice
+		self._file = None
+		self._budget.release(self._reserved)
+		self._reserved = 0
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def __del__(self):
+		try:
+			self.close()
+		except:
+			pass
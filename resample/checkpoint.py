@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Checkpoints of sample rebuilds.
+
+Locating and extracting the tracks of a sample reads through the main
+file, which can be many gigabytes. A checkpoint keeps the located match
+offsets and the extracted track data until the sample is rebuilt, so an
+interrupted rebuild does not need to read the main file again."""
+
+import binascii
+import os
+import shutil
+
+from resample.buffer import TrackBuffer
+from resample.main import AttachmentData
+from rescene.journal import Journal, file_crc32
+from rescene.utility import copy_stream
+
+class SampleCheckpoint(object):
+	"""result_file: the sample that will be rebuilt
+	srs_file, main_file: the inputs of the rebuild
+	The checkpoint is kept in the result_file.checkpoint directory."""
+	def __init__(self, result_file, srs_file, main_file):
+		self.directory = result_file + ".checkpoint"
+		if not os.path.isdir(self.directory):
+			os.makedirs(self.directory)
+		self.journal = Journal(os.path.join(self.directory, "journal"),
+		                       [srs_file, main_file])
+
+	def _path(self, name):
+		return os.path.join(self.directory, name)
+
+	def located(self, tracks):
+		"""Restores the match offsets of a previous run.
+		Returns False when they were not recorded."""
+		offsets = self.journal.get("located", "match_offsets")
+		if offsets is None or len(offsets) != len(tracks):
+			return False
+		for track in tracks.values():
+			track.match_offset = offsets[str(track.track_number)]
+		return True
+
+	def record_located(self, tracks):
+		self.journal.record("located", "match_offsets", dict(
+			(str(track.track_number), track.match_offset)
+			for track in tracks.values()))
+
+	def extracted(self, tracks):
+		"""Restores the extracted tracks and attachments of a previous run.
+		Returns None when they were not recorded or are no longer intact,
+		the attachments otherwise."""
+		entries = self.journal.get("extracted", "attachments")
+		if entries is None:
+			return None
+		attachments = {}
+		for entry in entries:
+			data_file = self._path(entry["file"])
+			if not self.journal.verified("attachments", entry["file"],
+			                             data_file):
+				return None
+			name = binascii.unhexlify(entry["name"].encode("ascii"))
+			attachment = AttachmentData(name, entry["size"],
+			                            self._load(data_file, entry["size"]))
+			attachment.attachment_file.seek(0)
+			attachments[name] = attachment
+
+		for track in tracks.values():
+			key = str(track.track_number)
+			if self.journal.get("tracks", key) == {}:
+				continue  # nothing was extracted for this track
+			data_file = self._path("track-" + key)
+			entry = self.journal.verified("tracks", key, data_file)
+			if entry is None:
+				return None
+			if track.track_file:
+				track.track_file.close()
+			track.track_file = self._load(data_file, entry["size"])
+		return attachments
+
+	def record_extracted(self, tracks, attachments):
+		for track in tracks.values():
+			key = str(track.track_number)
+			if track.track_file is None:
+				self.journal.record("tracks", key, {})
+			else:
+				self.journal.record("tracks", key,
+				                    self._save(track.track_file, "track-" + key))
+		entries = []
+		for (i, key) in enumerate(sorted(attachments)):
+			attachment = attachments[key]
+			if attachment.attachment_file is None:
+				continue
+			name = "attachment-%d" % i
+			self.journal.record("attachments", name,
+			                    self._save(attachment.attachment_file, name))
+			entries.append({"file": name, "size": attachment.size,
+				"name": binascii.hexlify(key).decode("ascii")})
+		self.journal.record("extracted", "attachments", entries)
+
+	def _save(self, buffer, name):
+		position = buffer.tell()
+		buffer.seek(0)
+		with open(self._path(name), "wb") as data_file:
+			copy_stream(buffer, data_file)
+		buffer.seek(position)
+		return {"size": os.path.getsize(self._path(name)),
+		        "crc": file_crc32(self._path(name))}
+
+	def _load(self, data_file, size):
+		buffer = TrackBuffer(size)
+		with open(data_file, "rb") as data:
+			copy_stream(data, buffer)
+		return buffer
+
+	def remove(self):
+		"""Deletes the checkpoint after a successful rebuild."""
+		shutil.rmtree(self.directory, ignore_errors=True)
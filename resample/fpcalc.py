@@ -28,7 +28,10 @@ import subprocess
 import inspect
 import os
 import sys
+import shutil
 import tempfile
+import threading
+import zlib
 if sys.version_info.major == 2:
     from distutils.spawn import find_executable as which
 else:
@@ -40,13 +43,128 @@ MSG_NOTFOUND = "The fpcalc executable isn't found."
 
 fpcalc_executable = ""
 
+# directory with fingerprints of earlier runs, keyed by CRC and file size
+cache_directory = os.environ.get("RESCENE_FPCALC_CACHE")
+
+# fingerprints calculated in this process: {(path, size, mtime): result}
+_results = {}
+_results_lock = threading.Lock()
+
 class ExecutableNotFound(Exception):
 	"""The fpcalc.exe executable isn't found."""
 
 def fingerprint(file_name, temp_dir=None, recursive=0):
 	"""Calculates the fingerprint of the given file.
+	A fingerprint calculated before in this process or found in the
+	cache directory is returned without running fpcalc again.
 	temp_dir: optional temporary directory to use
 	recursive: local parameter to prevent endless loop after stripping tags"""
+	if recursive:
+		return _fingerprint(file_name, temp_dir, recursive)
+
+	process_key = _process_key(file_name)
+	with _results_lock:
+		result = _results.get(process_key)
+	if result:
+		return result
+
+	cache_file = None
+	if cache_directory:
+		cache_file = _cache_file(file_name)
+		result = _read_cache(cache_file)
+	if not result:
+		result = _fingerprint(file_name, temp_dir, recursive)
+		if cache_file:
+			_write_cache(cache_file, result)
+
+	with _results_lock:
+		_results[process_key] = result
+	return result
+
+def fingerprint_many(file_names, temp_dir=None, jobs=None):
+	"""Calculates the fingerprints of many files with at most jobs
+	fpcalc processes running at the same time. The results are kept
+	for later fingerprint() calls on the same files.
+	Returns {file_name: (duration, fingerprint) or the raised exception}"""
+	find_fpcalc_executable()  # raises ExecutableNotFound early
+
+	def work(file_name):
+		try:
+			return fingerprint(file_name, temp_dir)
+		except Exception as err:
+			return err
+
+	if not jobs:
+		jobs = _cpu_count()
+	try:
+		from concurrent.futures import ThreadPoolExecutor
+	except ImportError:  # Python 2
+		return dict((name, work(name)) for name in file_names)
+	with ThreadPoolExecutor(max_workers=jobs) as executor:
+		return dict(zip(file_names, executor.map(work, file_names)))
+
+def _cpu_count():
+	try:
+		import multiprocessing
+		return multiprocessing.cpu_count()
+	except (ImportError, NotImplementedError):
+		return 1
+
+def _process_key(file_name):
+	stat = os.stat(file_name)
+	return (os.path.abspath(file_name), stat.st_size, stat.st_mtime)
+
+def _cache_file(file_name):
+	"""The cache file name is based on the CRC and the size of the file."""
+	crc = 0
+	size = 0
+	with open(file_name, "rb") as music_file:
+		data = music_file.read(0x100000)
+		while data:
+			crc = zlib.crc32(data, crc)
+			size += len(data)
+			data = music_file.read(0x100000)
+	name = "%08X-%d.fpcalc" % (crc & 0xFFFFFFFF, size)
+	return os.path.join(cache_directory, name)
+
+def _read_cache(cache_file):
+	try:
+		with open(cache_file, "rb") as cache:
+			duration, fp = cache.read().split(b"\n")[:2]
+	except (IOError, OSError, ValueError):
+		return None
+	if not duration or not fp:
+		return None
+	return duration, fp
+
+def _write_cache(cache_file, result):
+	if not os.path.isdir(cache_directory):
+		os.makedirs(cache_directory)
+	(fd, tmpname) = tempfile.mkstemp(".tmp", dir=cache_directory)
+	with os.fdopen(fd, "wb") as cache:
+		cache.write(b"\n".join(result) + b"\n")
+	try:
+		os.rename(tmpname, cache_file)
+	except OSError:
+		# an other process stored the same file already (Windows)
+		os.remove(tmpname)
+
+def link_or_copy(source, destination):
+	"""Makes the source file available under the destination name.
+	A hard link or a symbolic link is preferred over copying the data."""
+	for make_link in (getattr(os, "link", None), getattr(os, "symlink", None)):
+		if make_link is None:
+			continue
+		try:
+			make_link(os.path.abspath(source), destination)
+			return
+		except (OSError, NotImplementedError):
+			pass
+	with open(source, "rb") as music_file:
+		with open(destination, "wb") as tmpf:
+			shutil.copyfileobj(music_file, tmpf, 0x100000)
+
+def _fingerprint(file_name, temp_dir=None, recursive=0):
 	duration = fp = b""
 	bad = False
 	fpcalc = find_fpcalc_executable()
@@ -59,15 +177,17 @@ def fingerprint(file_name, temp_dir=None, recursive=0):
 		# I don't know how to pass those to fpcalc
 		# => create a temporary file for these rare cases
 		# test release: VA-Tony_Hawks_Pro_Skater_4-Soundtrack-2003-RARNeT
-		# copy the file with a default name and create the fp for that file
+		# link the file with a default name and create the fp for that file
 		print("Non-ASCII characters detected: creating temporary file.")
 		temp_cleanup = True
-		name_suffix = make_temp_suffix(file_name)
-		(fd, tmpname) = tempfile.mkstemp(name_suffix, dir=temp_dir)
-		os.close(fd)  # we won't use it
-		with open(file_name, "rb") as music_file:
-			with open(tmpname, "wb") as tmpf:
-				tmpf.write(music_file.read())
+		# a private directory: nobody else can take the name of the link
+		tmpdir = tempfile.mkdtemp(prefix="pyReScene-", dir=temp_dir)
+		tmpname = os.path.join(tmpdir, "music" + make_temp_suffix(file_name))
+		try:
+			link_or_copy(file_name, tmpname)
+		except:
+			shutil.rmtree(tmpdir)
+			raise
 		file_name = tmpname
 
 	# Set fingerprint length to 120 seconds
@@ -106,9 +226,9 @@ def fingerprint(file_name, temp_dir=None, recursive=0):
 			recursive += 1
 
 		print("Stripping recognized tags for better fpcalc detection.")
-		name_suffix = make_temp_suffix(file_name)
-		(fd, stripped) = tempfile.mkstemp(name_suffix, dir=temp_dir)
-		os.close(fd)  # we won't use it
+		strippeddir = tempfile.mkdtemp(prefix="pyReScene-", dir=temp_dir)
+		stripped = os.path.join(strippeddir,
+		                        "stripped" + make_temp_suffix(file_name))
 
 		try:
 			if recursive < 2:
@@ -167,9 +287,9 @@ def fingerprint(file_name, temp_dir=None, recursive=0):
 					with open(stripped, "wb") as tmpf:
 						sync_start = string_index - (0x100 + sync_index)
 						orig.seek(sync_start, os.SEEK_SET)
-						tmpf.write(orig.read())
+						shutil.copyfileobj(orig, tmpf, 0x100000)
 
-			duration, fp = fingerprint(stripped, temp_dir, recursive)
+			duration, fp = _fingerprint(stripped, temp_dir, recursive)
 			bad = False  # it succeeded (exception otherwise)
 		except:
 			if recursive == 2:
@@ -184,11 +304,11 @@ def fingerprint(file_name, temp_dir=None, recursive=0):
 		finally:
 			# cleanup temporary stripped file
 			print("Removing %s" % stripped)
-			os.remove(stripped)
+			shutil.rmtree(strippeddir)
 
 	if temp_cleanup:
 		print("Removing %s" % tmpname)
-		os.remove(tmpname)
+		shutil.rmtree(tmpdir)
 
 	if bad:
 		raise ValueError("Fingerprinting failed.")
@@ -29,11 +29,17 @@ from __future__ import print_function, absolute_import
 import struct
 import io
 import os
+import array
+import bisect
+import itertools
+import functools
 import sys
 import logging
 import unittest
-import tempfile
 import collections
+import contextlib
+import threading
+import time
 
 from os.path import basename
 from struct import Struct
@@ -41,7 +47,8 @@ from zlib import crc32
 
 import resample
 
-from rescene import rarstream, RarReader
+from rescene import rarstream
+from rescene.main import Stage
 from rescene import utility
 from rescene.utility import sep, show_spinner, remove_spinner, fsunicode
 from rescene.utility import calculate_crc32 as calc_crc32
@@ -65,6 +72,7 @@ from resample.mp3 import Mp3Reader
 from resample.mp3 import decode_id3_size
 from resample.stream import StreamReader
 from resample.m2ts import M2tsReader, M2tsReadMode
+from resample.buffer import TrackBuffer
 
 logger = logging.getLogger(__name__)
 if not _DEBUG:
@@ -97,6 +105,14 @@ BE_LONGLONG = Struct('>Q')
 SIG_SIZE = 256
 STREAM_VS_SUBTITLE = 1000000
 
+# array module type codes for unsigned integers of 4 and 8 bytes
+ARRAY_TYPECODES = {}
+for _code in "ILQ":
+	try:
+		ARRAY_TYPECODES.setdefault(array.array(_code).itemsize, _code)
+	except ValueError:  # no "Q" before Python 3.3
+		pass
+
 MARKER_STREAM_SRS = b"STRM\x08\x00\x00\x00"  # VOB, MPEG, M2TS, ... SRS
 MARKER_M2TS_SRS = b"M2TS\x08\x00\x00\x00"  # M2TS SRS (not in use)
 
@@ -109,11 +125,41 @@ class InvalidMatchOffset(ValueError):
 class InvalidPathValue(ValueError):
 	pass
 
+def _is_stream(ifile):
+	return hasattr(ifile, "read")
+
+def _input_name(ifile):
+	if _is_stream(ifile):
+		return getattr(ifile, "name", "")
+	return ifile
+
+def _source(infile):
+	"""The reader arguments for a file name or an open stream,
+	e.g. a rescene.rarstream.SrrStream of an SRS file inside an SRR."""
+	if _is_stream(infile):
+		return {"stream": infile}
+	return {"path": infile}
+
+def _read_from(ifile, offset, amount, whence=os.SEEK_SET):
+	"""Reads from a file name or an open stream.
+	The position of a stream doesn't change."""
+	if _is_stream(ifile):
+		position = ifile.tell()
+		try:
+			ifile.seek(offset, whence)
+			return ifile.read(amount)
+		finally:
+			ifile.seek(position)
+	with open(ifile, 'rb') as ofile:
+		ofile.seek(offset, whence)
+		return ofile.read(amount)
+
 # srs.cs ----------------------------------------------------------------------
 def file_type_info(ifile):
 	"""Decide the type of file based on the magic marker.
 	If the file is a sample (based on extension),
-	it will not be detected as a RAR file. (this can happen for DVDR vobs)"""
+	it will not be detected as a RAR file. (this can happen for DVDR vobs)
+	ifile: a file name or an open stream, e.g. an SrrStream"""
 	MARKER_MKV = b"\x1a\x45\xdf\xa3"  # .Eß£
 	MARKER_AVI = b"\x52\x49\x46\x46"  # RIFF
 	MARKER_RAR = b"\x52\x61\x72\x21\x1A\x07\x00"  # Rar!...
@@ -129,10 +175,9 @@ def file_type_info(ifile):
 	archived_file_name = ""
 
 	try:
-		with open(ifile, 'rb') as ofile:
-			marker = ofile.read(14)
+		marker = _read_from(ifile, 0, 14)
 	except IOError:
-		if os.path.isdir(ifile):
+		if not _is_stream(ifile) and os.path.isdir(ifile):
 			msg = "The input path does not point to a file"
 			raise InvalidPathValue(msg)
 		else:
@@ -143,12 +188,14 @@ def file_type_info(ifile):
 	if len(marker) < 14:
 		return FileType(FileType.Unknown, archived_file_name)
 
-	if marker.startswith(MARKER_RAR) and utility.is_rar(ifile):
+	name = _input_name(ifile)
+	if (marker.startswith(MARKER_RAR) and not _is_stream(ifile) and
+		utility.is_rar(ifile)):
 		try:
 			# Read first file from the RAR archives
-			rr = RarReader(ifile)
+			# (the parsed set is reused by the RarStream objects)
 			first_file = True
-			for archf in rr.list_files():
+			for archf in rarstream.rar_set(ifile).first_volume_files:
 				# use the first file with a supported file extension
 				# (skipping .srt and other encountered files)
 				extension = FileType.VideoExtensions + FileType.AudioExtensions
@@ -156,7 +203,6 @@ def file_type_info(ifile):
 					archived_file_name = archf  # first useful file
 					break
 				first_file = False
-			rr.close()
 
 			# first file from RAR is the default behavior: no message
 			if not first_file and archived_file_name:
@@ -177,7 +223,7 @@ def file_type_info(ifile):
 	elif marker.startswith(MARKER_AVI):
 		# Some old .mp3 files use the RIFF container too
 		# e.g. (dj_tiesto_presents_allure)-we_ran_at_dawn_vinyl_djnl-bmi
-		if ifile.endswith(".mp3"):
+		if name.endswith(".mp3"):
 			return FileType(FileType.MP3, archived_file_name)
 		return FileType(FileType.AVI, archived_file_name)
 	if marker[4:].startswith(MARKER_MP4) or marker.startswith(MARKER_MP4_3GP):
@@ -195,10 +241,8 @@ def file_type_info(ifile):
 	elif marker.startswith(MARKER_ID3):
 		# can be MP3 or FLAC
 		size = decode_id3_size(marker[6:10])
-		with open(ifile, 'rb') as ofile:
-			ofile.seek(10 + size)
-			if ofile.read(4) == b"fLaC":
-				return FileType(FileType.FLAC, archived_file_name)
+		if _read_from(ifile, 10 + size, 4) == b"fLaC":
+			return FileType(FileType.FLAC, archived_file_name)
 		return FileType(FileType.MP3, archived_file_name)
 	elif marker.startswith(b"SRSF"):
 		return FileType(FileType.MP3, archived_file_name)
@@ -209,17 +253,15 @@ def file_type_info(ifile):
 
 		# last attempt to detect an MP3 file by using the ID3v1 tag
 		# (last 128 bytes of mp3 file)
-		with open(ifile, 'rb') as ofile:
-			try:
-				ofile.seek(-128, os.SEEK_END)
-				if ofile.read(3) == b"TAG":
-					return FileType(FileType.MP3, archived_file_name)
-			except EnvironmentError:
-				# IOError possible when RAR file is broken
-				pass
+		try:
+			if _read_from(ifile, -128, 3, os.SEEK_END) == b"TAG":
+				return FileType(FileType.MP3, archived_file_name)
+		except (EnvironmentError, IndexError):
+			# IOError possible when RAR file is broken
+			pass
 
 		# check for stream types based on extension and sync for M2TS
-		name = ifile.lower()
+		name = name.lower()
 		if name.endswith(FileType.StreamExtensions):
 			# M2TS disabled since it's not working nor completed
 			# still differences in each track
@@ -566,6 +608,84 @@ class ReSample(object):
 		print("WARNING: " + msg)
 		logger.warn(msg)
 
+PROGRESS_INTERVAL = 1.0  # seconds between PROGRESS events of a running loop
+_running = threading.local()
+
+@contextlib.contextmanager
+def _running_stage(name, **info):
+	"""Stage that the find, extract and rebuild loops below report their
+	position to through _loop_progress."""
+	previous = getattr(_running, "state", None)
+	with Stage(name, **info) as stage:
+		_running.state = [stage, time.time()]
+		try:
+			yield stage
+		finally:
+			_running.state = previous
+
+def _loop_progress(position):
+	"""Fires a PROGRESS event with the position of the loop at most once
+	every PROGRESS_INTERVAL seconds. The position is the offset in the
+	main file or the number of sample bytes written."""
+	state = getattr(_running, "state", None)
+	if state is None:
+		return
+	now = time.time()
+	if now - state[1] >= PROGRESS_INTERVAL:
+		state[1] = now
+		state[0].progress(position=position)
+
+def _report_tracks(stage, name, tracks):
+	for track in tracks.values():
+		if name.startswith("find_sample_streams"):
+			stage.amount = max(stage.amount, track.match_offset)
+			stage.progress(track=track.track_number,
+			               match_offset=track.match_offset)
+		else:
+			track_file = track.track_file
+			stage.progress(track_file.tell() if track_file else 0,
+			               track=track.track_number)
+
+def instrumented(method):
+	"""Reports a find_sample_streams, extract_sample_streams or
+	rebuild_sample call as a rescene Stage. The loops fire a PROGRESS event
+	with their position while they run. Find and extract fire one more for
+	each track when done. The bytes are the offset of the last track match,
+	the extracted track data or the size of the rebuilt sample
+	respectively."""
+	name = method.__name__
+
+	@functools.wraps(method)
+	def wrapper(self, *args, **kwargs):
+		with _running_stage(name, file_type=self.file_type) as stage:
+			result = method(self, *args, **kwargs)
+			if name == "rebuild_sample":
+				if result:
+					stage.add(result.size)
+				return result
+			tracks = result[0] if isinstance(result, tuple) else result
+			_report_tracks(stage, name, tracks)
+			return result
+	return wrapper
+
+def instrumented_many(function):
+	"""Reports a find_sample_streams_many or extract_sample_streams_many
+	call as a rescene Stage, the same way instrumented does for a single
+	sample. The tracks of all samples are reported when done."""
+	name = function.__name__
+
+	@functools.wraps(function)
+	def wrapper(samples, main_file):
+		file_type = samples[0][0].file_type if samples else None
+		with _running_stage(name, file_type=file_type,
+		                    samples=len(samples)) as stage:
+			results = function(samples, main_file)
+			for result in results:
+				tracks = result[0] if isinstance(result, tuple) else result
+				_report_tracks(stage, name, tracks)
+			return results
+	return wrapper
+
 def sample_class_factory(file_type):
 	"""Choose the right class based on the sample's file type."""
 	if file_type == FileType.AVI:
@@ -595,10 +715,13 @@ class AviReSample(ReSample):
 		return avi_create_srs(self, *args, **kwargs)
 	def load_srs(self, *args, **kwargs):
 		return avi_load_srs(self, *args, **kwargs)
+	@instrumented
 	def find_sample_streams(self, *args, **kwargs):
 		return avi_find_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def extract_sample_streams(self, *args, **kwargs):
 		return avi_extract_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def rebuild_sample(self, *args, **kwargs):
 		return avi_rebuild_sample(self, *args, **kwargs)
 
@@ -612,10 +735,13 @@ class MkvReSample(ReSample):
 		return mkv_create_srs(self, *args, **kwargs)
 	def load_srs(self, *args, **kwargs):
 		return mkv_load_srs(self, *args, **kwargs)
+	@instrumented
 	def find_sample_streams(self, *args, **kwargs):
 		return mkv_find_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def extract_sample_streams(self, *args, **kwargs):
 		return mkv_extract_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def rebuild_sample(self, *args, **kwargs):
 		return mkv_rebuild_sample(self, *args, **kwargs)
 
@@ -628,10 +754,13 @@ class Mp4ReSample(ReSample):
 		return mp4_create_srs(self, *args, **kwargs)
 	def load_srs(self, *args, **kwargs):
 		return mp4_load_srs(self, *args, **kwargs)
+	@instrumented
 	def find_sample_streams(self, *args, **kwargs):
 		return mp4_find_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def extract_sample_streams(self, *args, **kwargs):
 		return mp4_extract_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def rebuild_sample(self, *args, **kwargs):
 		return mp4_rebuild_sample(self, *args, **kwargs)
 
@@ -644,10 +773,13 @@ class WmvReSample(ReSample):
 		return wmv_create_srs(self, *args, **kwargs)
 	def load_srs(self, *args, **kwargs):
 		return wmv_load_srs(self, *args, **kwargs)
+	@instrumented
 	def find_sample_streams(self, *args, **kwargs):
 		return wmv_find_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def extract_sample_streams(self, *args, **kwargs):
 		return wmv_extract_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def rebuild_sample(self, *args, **kwargs):
 		return wmv_rebuild_sample(self, *args, **kwargs)
 
@@ -660,10 +792,13 @@ class FlacReSample(ReSample):
 		return flac_create_srs(self, *args, **kwargs)
 	def load_srs(self, *args, **kwargs):
 		return flac_load_srs(self, *args, **kwargs)
+	@instrumented
 	def find_sample_streams(self, *args, **kwargs):
 		return flac_find_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def extract_sample_streams(self, *args, **kwargs):
 		return flac_extract_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def rebuild_sample(self, *args, **kwargs):
 		return flac_rebuild_sample(self, *args, **kwargs)
 
@@ -676,10 +811,13 @@ class Mp3ReSample(ReSample):
 		return mp3_create_srs(self, *args, **kwargs)
 	def load_srs(self, *args, **kwargs):
 		return mp3_load_srs(self, *args, **kwargs)
+	@instrumented
 	def find_sample_streams(self, *args, **kwargs):
 		return mp3_find_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def extract_sample_streams(self, *args, **kwargs):
 		return mp3_extract_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def rebuild_sample(self, *args, **kwargs):
 		return mp3_rebuild_sample(self, *args, **kwargs)
 
@@ -692,10 +830,13 @@ class StreamSample(ReSample):
 		return stream_create_srs(self, *args, **kwargs)
 	def load_srs(self, *args, **kwargs):
 		return stream_load_srs(self, *args, **kwargs)
+	@instrumented
 	def find_sample_streams(self, *args, **kwargs):
 		return stream_find_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def extract_sample_streams(self, *args, **kwargs):
 		return stream_extract_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def rebuild_sample(self, *args, **kwargs):
 		return stream_rebuild_sample(self, *args, **kwargs)
 
@@ -709,16 +850,19 @@ class M2tsReSample(ReSample):
 		return m2ts_create_srs(self, *args, **kwargs)
 	def load_srs(self, *args, **kwargs):
 		return m2ts_load_srs(self, *args, **kwargs)
+	@instrumented
 	def find_sample_streams(self, *args, **kwargs):
 		return m2ts_find_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def extract_sample_streams(self, *args, **kwargs):
 		return m2ts_extract_sample_streams(self, *args, **kwargs)
+	@instrumented
 	def rebuild_sample(self, *args, **kwargs):
 		return m2ts_rebuild_sample(self, *args, **kwargs)
 
 def avi_load_srs(self, infile):
 	tracks = {}
-	rr = RiffReader(RiffReadMode.SRS, infile)
+	rr = RiffReader(RiffReadMode.SRS, **_source(infile))
 	done = False
 	while not done and rr.read():
 		if rr.chunk_type == RiffChunkType.List:
@@ -744,7 +888,7 @@ def avi_load_srs(self, infile):
 def mkv_load_srs(self, infile):
 	tracks = {}
 	srs_data = None
-	er = EbmlReader(EbmlReadMode.SRS, infile)
+	er = EbmlReader(EbmlReadMode.SRS, **_source(infile))
 	header_stripping = False
 	current_track_nb = 0
 	done = False
@@ -804,7 +948,7 @@ def mkv_load_srs(self, infile):
 
 def mp4_load_srs(self, infile):
 	tracks = {}
-	mr = MovReader(MovReadMode.SRS, infile)
+	mr = MovReader(MovReadMode.SRS, **_source(infile))
 	while mr.read():
 		if mr.atom_type == b"SRSF":
 			srs_data = FileData(mr.read_contents())
@@ -820,7 +964,7 @@ def mp4_load_srs(self, infile):
 
 def wmv_load_srs(self, infile):
 	tracks = {}
-	ar = AsfReader(AsfReadMode.SRS, infile)
+	ar = AsfReader(AsfReadMode.SRS, **_source(infile))
 	while ar.read():
 		o = ar.current_object
 
@@ -839,7 +983,7 @@ def wmv_load_srs(self, infile):
 
 def flac_load_srs(self, infile):
 	tracks = {}
-	fr = FlacReader(infile)
+	fr = FlacReader(**_source(infile))
 	while fr.read():
 		if fr.block_type == ord("s"):
 			srs_data = FileData(fr.read_contents())
@@ -859,7 +1003,7 @@ def flac_load_srs(self, infile):
 
 def mp3_load_srs(self, infile):
 	tracks = {}
-	mr = Mp3Reader(infile)
+	mr = Mp3Reader(**_source(infile))
 	for block in mr.read():
 		if block.type == "SRSF":
 			srs_data = FileData(mr.read_contents()[8:])
@@ -873,7 +1017,7 @@ def mp3_load_srs(self, infile):
 
 def stream_load_srs(self, infile):
 	tracks = {}
-	sr = StreamReader(infile)
+	sr = StreamReader(**_source(infile))
 	for block in sr.read():
 		if block.type == "SRSF":
 			srs_data = FileData(sr.read_contents())
@@ -1249,55 +1393,14 @@ def profile_mp4(mp4_data,  # FileData object
 			current_track = tracks[track_id]
 
 			# initialization
-			current_track.chunk_offsets = []
-			current_track.chunk_lengths = []
-			current_track.sample_lengths = []
+			mp4_init_sample_tables(current_track)
 			track_processed = False
 # 			print(track_id)
 
-		elif atype in (b"stco", b"co64"):
-			# exactly one variant must be present
+		elif atype in (b"stco", b"co64", b"stsc", b"stsz", b"stz2"):
+			# exactly one variant of the chunk offsets must be present
 			assert current_track != None
-			(entry_count,) = BE_LONG.unpack_from(data, 4)
-			if atype == b"stco":
-				size = 4
-				structunp = BE_LONG
-			else:  # b"co64"
-				size = 8
-				structunp = BE_LONGLONG
-			for i in range(entry_count):
-				j = 8 + i * size
-				(offset,) = structunp.unpack_from(data, j)
-				current_track.chunk_offsets.append(offset)
-# 			print(current_track.chunk_offsets)
-
-		elif atype == b"stsc":  # Sample To Chunk Box
-			(entry_count,) = BE_LONG.unpack_from(data, 4)
-			for i in range(entry_count):
-				j = 8 + i * 12
-				# first_chunk
-				# samples_per_chunk
-				# sample_description_index
-				result_tuple = struct.unpack_from(">LLL", data, j)
-				current_track.chunk_lengths.append(result_tuple)
-
-			# enlarge compactly coded tables
-			current_track.chunk_lengths = stsc(current_track.chunk_lengths)
-
-# 			print(current_track.chunk_lengths)
-
-		elif atype in (b"stsz", b"stz2"):  # Sample Size Boxes
-			(sample_size,) = BE_LONG.unpack_from(data, 4)
-			(sample_count,) = BE_LONG.unpack_from(data, 8)
-			if sample_size == 0:
-				for i in range(sample_count):
-					j = 12 + i * 4
-					(out,) = BE_LONG.unpack_from(data, j)
-					current_track.sample_lengths.append(out)
-			else:
-				for i in range(sample_count):
-					current_track.sample_lengths.append(sample_size)
-# 			print(current_track.sample_lengths)
+			mp4_read_sample_table(atype, data, current_track)
 
 		if (current_track and (not track_processed) and
 		    len(current_track.chunk_offsets) and
@@ -1310,7 +1413,7 @@ def profile_mp4(mp4_data,  # FileData object
 			current_track.signature_bytes = mp4_signature_bytes(current_track,
 			                                                    mp4_data.name)
 			# the size of the track
-			current_track.data_length = sum(current_track.sample_lengths)
+			current_track.data_length = current_track.sample_offsets[-1]
 	mr.close()
 
 	mp4_data.other_length = meta_length
@@ -1339,6 +1442,90 @@ def stsc(samples_chunk):
 		index += 1
 	return new
 
+def _be_array(data, offset, count, itemsize):
+	"""Decodes a table of big endian unsigned integers."""
+	end = offset + count * itemsize
+	if len(data) < end:
+		raise ValueError("MP4 sample table is truncated")
+	table = array.array(ARRAY_TYPECODES[itemsize])
+	try:
+		table.frombytes(memoryview(data)[offset:end])
+	except AttributeError:  # Python 2
+		table.fromstring(bytes(data[offset:end]))
+	if sys.byteorder == "little":
+		table.byteswap()
+	return table
+
+def _cumulative(values):
+	"""Prefix sums of values: starts with 0 and ends with the total."""
+	sums = array.array(ARRAY_TYPECODES[8], [0])
+	try:
+		sums.extend(itertools.accumulate(values))
+	except AttributeError:  # Python 2
+		total = 0
+		for value in values:
+			total += value
+			sums.append(total)
+	return sums
+
+class SampleToChunk(object):
+	"""Compactly coded Sample To Chunk Box (stsc) table.
+	The table is only expanded when it is not ordered the usual way."""
+	def __init__(self, entries):
+		# (first_chunk, samples_per_chunk, sample_description_index)
+		self.entries = entries
+		self.first_chunks = [entry[0] for entry in entries]
+		ordered = (len(entries) and self.first_chunks[0] == 1 and
+			all(a < b for a, b in zip(self.first_chunks,
+			                          self.first_chunks[1:])))
+		self._expanded = None if ordered else stsc(entries)
+
+	def __len__(self):
+		return len(self.entries)
+
+	def samples_in_chunk(self, chunk_index):
+		"""chunk_index: zero based index in the chunk offsets table"""
+		if self._expanded is None:
+			i = bisect.bisect_right(self.first_chunks, chunk_index + 1)
+			return self.entries[i - 1][1]
+		try:
+			return self._expanded[chunk_index][1]
+		except IndexError:
+			# House.of.Cards.2013.S01E01.REPACK.HDTV.x264-ASAP
+			# last element will contain right amount of samples
+			return self._expanded[-1][1]
+
+def mp4_init_sample_tables(track):
+	track.chunk_offsets = ()
+	track.chunk_lengths = SampleToChunk(())
+	track.sample_lengths = ()
+	track.sample_offsets = _cumulative(())
+
+def mp4_read_sample_table(atype, data, track):
+	"""Decodes the chunk offsets (stco/co64), the sample to chunk (stsc)
+	or the sample sizes (stsz) box of a track."""
+	(entry_count,) = BE_LONG.unpack_from(data, 4)
+	if atype in (b"stco", b"co64"):
+		size = 4 if atype == b"stco" else 8
+		track.chunk_offsets = _be_array(data, 8, entry_count, size)
+	elif atype == b"stsc":  # Sample To Chunk Box
+		# first_chunk
+		# samples_per_chunk
+		# sample_description_index
+		flat = _be_array(data, 8, entry_count * 3, 4)
+		entries = [tuple(flat[i:i + 3]) for i in range(0, len(flat), 3)]
+		track.chunk_lengths = SampleToChunk(entries)
+	else:  # b"stsz", b"stz2": Sample Size Boxes
+		sample_size = entry_count
+		(sample_count,) = BE_LONG.unpack_from(data, 8)
+		if sample_size == 0:
+			track.sample_lengths = _be_array(data, 12, sample_count, 4)
+		else:
+			track.sample_lengths = array.array(
+				ARRAY_TYPECODES[4], [sample_size]) * sample_count
+		# sample_offsets[i]: track data before sample i
+		track.sample_offsets = _cumulative(track.sample_lengths)
+
 def mp4_profile_sample(self, mp4_data):
 	tracks = profile_mp4(mp4_data, calculate_crc32=True,
 		archived_file_name=self.archived_file_name)
@@ -1394,32 +1581,27 @@ def mp4_signature_bytes(track, mp4_file):
 	the 256 first bytes in the track."""
 	previous_samples = 0
 	signature_bytes = b""
-	# iterate different offsets in the file where data of current track
-	# can be found
-	for chnb, chunk_offset in enumerate(track.chunk_offsets):
-		# each offset is a chunk
-		# a chunk exists of a number of samples
-		try:
-			samples_in_chunk = track.chunk_lengths[chnb][1]
-		except IndexError:
-			# House.of.Cards.2013.S01E01.REPACK.HDTV.x264-ASAP
-			# last element will contain right amount of samples
-			samples_in_chunk = track.chunk_lengths[-1][1]
-		# the sizes of the different samples of the chunk
-		chunk_size = sum(track.sample_lengths[previous_samples:
-		                 previous_samples + samples_in_chunk])
-
-		chunk_content = b""
-		with open(mp4_file, "rb") as mov:
+	offsets = track.sample_offsets
+	last_sample = len(offsets) - 1
+	with open(mp4_file, "rb") as mov:
+		# iterate different offsets in the file where data of current track
+		# can be found
+		for chnb, chunk_offset in enumerate(track.chunk_offsets):
+			# each offset is a chunk
+			# a chunk exists of a number of samples
+			samples_in_chunk = track.chunk_lengths.samples_in_chunk(chnb)
+			# the sizes of the different samples of the chunk
+			end_sample = min(previous_samples + samples_in_chunk, last_sample)
+			chunk_size = (offsets[end_sample] -
+			              offsets[min(previous_samples, last_sample)])
+
+			lsig = min(SIG_SIZE, len(signature_bytes) + chunk_size)
 			mov.seek(chunk_offset)
-			chunk_content = mov.read(chunk_size)
+			signature_bytes += mov.read(lsig - len(signature_bytes))
 
-		lsig = min(SIG_SIZE, len(signature_bytes) + chunk_size)
-		signature_bytes += chunk_content[:lsig - len(signature_bytes)]
-
-		previous_samples += samples_in_chunk
-		if len(signature_bytes) == SIG_SIZE:
-			return signature_bytes
+			previous_samples += samples_in_chunk
+			if len(signature_bytes) == SIG_SIZE:
+				return signature_bytes
 	return signature_bytes
 
 def profile_wmv(wmv_data):  # FileData object
@@ -2158,6 +2340,7 @@ def _avi_normal_chunk_find(tracks, rr, block_count, done):
 		block_count += 1
 		if block_count % 15 == 0:
 			show_spinner(block_count)
+			_loop_progress(rr.current_chunk.chunk_start_pos)
 
 		# grab track or create new track
 		track_number = rr.current_chunk.stream_number
@@ -2262,6 +2445,7 @@ def mkv_find_sample_streams(self, tracks, main_mkv_file):
 			# (cluster is good because they're about 1mb each)
 			cluster_count += 1
 			show_spinner(cluster_count)
+			_loop_progress(er.current_element.element_start_pos)
 			er.move_to_child()
 		elif er.element_type == EbmlElementType.Block:
 			# tracks and tracks_main get modified
@@ -2460,24 +2644,19 @@ def mp4_add_track_stream(track):
 	ts = TrackStream()
 
 	samples_amount = 0
+	samples_total = len(track.sample_offsets) - 1
 	prev_chunk = None
 	for chnb, chunk_offset in enumerate(track.chunk_offsets):
-		try:
-			samples_in_chunk = track.chunk_lengths[chnb][1]
-		except IndexError:
-			# House.of.Cards.2013.S01E01.REPACK.HDTV.x264-ASAP
-			# ASAP again, why aren't we surprised?
-			samples_in_chunk = track.chunk_lengths[-1][1]
-		chunk = TrackChunk(chunk_offset, samples_in_chunk, prev_chunk)
+		samples_in_chunk = track.chunk_lengths.samples_in_chunk(chnb)
+		# the last chunk can claim more samples than there are left
+		available = max(0, min(samples_in_chunk,
+		                       samples_total - samples_amount))
+		chunk = TrackChunk(chunk_offset, available, prev_chunk,
+		                   samples_amount, track.sample_offsets)
 		# bidirectional links
 		if prev_chunk:
 			prev_chunk.next_chunk = chunk
-
-		chunk.samples = track.sample_lengths[samples_amount:
-		                                     samples_amount + samples_in_chunk]
 		samples_amount += samples_in_chunk
-		chunk.samples_in_chunk = len(chunk.samples)
-		assert chunk.samples_in_chunk == len(chunk.samples)
 
 		ts.add_chunk(chunk)
 		prev_chunk = chunk
@@ -2493,9 +2672,15 @@ class TrackStream(object):
 		self._current_offset = 0  # chunk + sample offset
 		self._current_chunk = None
 		self._current_sample = 0  # of the current chunk
+		self._chunk_offsets = array.array(ARRAY_TYPECODES[8])
+		self._ascending = True  # bisect can be used to find chunks
 
 	def add_chunk(self, chunk):
+		if (len(self._chunk_offsets) and
+		    chunk.chunk_offset < self._chunk_offsets[-1]):
+			self._ascending = False
 		self.chunks.append(chunk)
+		self._chunk_offsets.append(chunk.chunk_offset)
 
 	def current_offset(self):
 		return self._current_offset
@@ -2503,9 +2688,14 @@ class TrackStream(object):
 	def seek(self, offset):
 		"""The offset must be the beginning of a sample."""
 		self._current_offset = offset
-		for chunk in self.chunks:
-			if chunk.chunk_offset <= offset:
-				self._current_chunk = chunk
+		if self._ascending:
+			i = bisect.bisect_right(self._chunk_offsets, offset)
+			if i:
+				self._current_chunk = self.chunks[i - 1]
+		else:
+			for chunk in self.chunks:
+				if chunk.chunk_offset <= offset:
+					self._current_chunk = chunk
 		assert self._current_chunk
 		# Will raise InvalidMatchOffset when not on start of a sample
 		self._current_sample = self._current_chunk.get_sample_nb(offset)
@@ -2527,19 +2717,22 @@ class TrackStream(object):
 			# we need to grab extra data from the next chunk(s)
 			self.stream.seek(self._current_offset, os.SEEK_SET)
 			firstb = self.stream.read(lb)
+			parts = [firstb]
+			read = len(firstb)
 
 			next_chunk = self._current_chunk
-			while len(firstb) < amount:
+			while read < amount:
 				next_chunk = next_chunk.next_chunk
 				if not next_chunk:
 					# at the end of the stream, so return what we have
-					return firstb
+					break
 
 				bl = next_chunk.bytes_left_in_chunk(0)
 				self.stream.seek(next_chunk.chunk_offset)
-				bytes_read = self.stream.read(min(amount - len(firstb), bl))
-				firstb += bytes_read
-			return firstb
+				bytes_read = self.stream.read(min(amount - read, bl))
+				parts.append(bytes_read)
+				read += len(bytes_read)
+			return b"".join(parts)
 
 	def __next__(self):
 		# are there still samples left in the chunk?
@@ -2559,8 +2752,11 @@ class TrackStream(object):
 	next = __next__  # Python < 3 compatibility
 
 class TrackChunk(object):
-	"""MP4 data block that consists of samples."""
-	def __init__(self, chunk_offset, samples_in_chunk, prev_chunk):
+	"""MP4 data block that consists of samples.
+	first_sample: index of the first sample of the chunk in the track
+	sample_offsets: prefix sums of all sample sizes of the track"""
+	def __init__(self, chunk_offset, samples_in_chunk, prev_chunk,
+	             first_sample=0, sample_offsets=(0,)):
 		# absolute location in the main movie file
 		self.chunk_offset = chunk_offset
 		# chunk consists of samples
@@ -2568,29 +2764,33 @@ class TrackChunk(object):
 		# point to previous chunk
 		self.prev_chunk = prev_chunk
 		self.next_chunk = None
-		self.samples = []
+		self.first_sample = first_sample
+		self._offsets = sample_offsets
+
+	@property
+	def size(self):
+		"""Sum of the sizes of all samples in the chunk."""
+		return self.bytes_left_in_chunk(0)
 
 	def bytes_left_in_chunk(self, sample_number):
-		return sum(self.samples[sample_number:self.samples_in_chunk])
+		sample_number = min(sample_number, self.samples_in_chunk)
+		end = self.first_sample + self.samples_in_chunk
+		return (self._offsets[end] -
+		        self._offsets[self.first_sample + sample_number])
 
 	def bytes_consumed(self, sample_number):
-		amount = 0
-		for i in range(sample_number):
-			amount += self.samples[i]
-		return amount
+		return (self._offsets[self.first_sample + sample_number] -
+		        self._offsets[self.first_sample])
 
 	def get_sample_nb(self, offset):
-		sample_sum = 0
-		count = 0
-		for sample in self.samples:
-			if offset <= self.chunk_offset + sample_sum:
-				if offset != self.chunk_offset + sample_sum:
-					raise InvalidMatchOffset
-				assert self.chunk_offset + sample_sum == offset
-				return count
-			count += 1
-			sample_sum += sample
-		return count
+		first = self.first_sample
+		end = first + self.samples_in_chunk
+		# track data position that must be the start of a sample
+		wanted = offset - self.chunk_offset + self._offsets[first]
+		i = bisect.bisect_left(self._offsets, wanted, first, end)
+		if i < end and self._offsets[i] != wanted:
+			raise InvalidMatchOffset
+		return i - first
 
 def mp4_find_sample_streams(self, tracks, main_mp4_file):
 	mtracks = profile_mp4(FileData(file_name=main_mp4_file),
@@ -2629,6 +2829,7 @@ def wmv_find_sample_streams(self, tracks, main_wmv_file):
 			for i in range(total_data_packets):
 				if i % 15 == 0:
 					show_spinner(i)
+					_loop_progress(start + i * psize)
 				data = ar.read_data_part(start + i * psize, psize)
 
 				packet = AsfDataPacket()
@@ -2831,6 +3032,7 @@ def stream_find_sample_streams(self, tracks, main_file):
 		count = 0
 		while x:
 			show_spinner(count)
+			_loop_progress(stream.tell())
 			if p:
 				match = (p + x).find(track.signature_bytes, ramount - sig_size)
 			else:
@@ -2870,6 +3072,7 @@ def m2ts_find_sample_streams(self, tracks, main_m2ts_file):
 		pskip = 64
 		if source_packet_count % pskip == 0:
 			show_spinner(source_packet_count // pskip)
+			_loop_progress(mr.current_offset)
 
 		packet = mr.current_packet
 		track_number = packet.pid
@@ -2957,6 +3160,7 @@ def m2ts_extract_sample_streams(self, tracks, main_file):
 		source_packet_count += 1
 		if source_packet_count % 32 == 0:
 			show_spinner(source_packet_count // 32)
+			_loop_progress(mr.current_offset)
 
 		packet = mr.current_packet
 		track_number = packet.pid
@@ -2968,7 +3172,7 @@ def m2ts_extract_sample_streams(self, tracks, main_file):
 		# test if located on a chunk with the required data
 		if (packet.start_pos + 192 > track.match_offset):
 			if track.track_file == None:
-				track.track_file = tempfile.TemporaryFile()
+				track.track_file = TrackBuffer(track.data_length)
 
 			previously_read = track.track_file.tell()
 			if previously_read < track.data_length:
@@ -3024,6 +3228,7 @@ def _avi_normal_chunk_extract(tracks, rr, block_count, done):
 	if rr.chunk_type == RiffChunkType.Movi:
 		block_count += 1
 		show_spinner(block_count)
+		_loop_progress(rr.current_chunk.chunk_start_pos)
 
 		# grab track or create new track
 		track_number = rr.current_chunk.stream_number
@@ -3037,7 +3242,7 @@ def _avi_normal_chunk_extract(tracks, rr, block_count, done):
 		len(rr.current_chunk.raw_header) +
 		rr.current_chunk.length > track.match_offset):
 			if track.track_file == None:
-				track.track_file = tempfile.TemporaryFile()
+				track.track_file = TrackBuffer(track.data_length)
 
 			if track.track_file.tell() < track.data_length:
 				# read in data to temporary file track
@@ -3109,6 +3314,7 @@ def mkv_extract_sample_streams(self, tracks, movie):
 			# (cluster is good because they're about 1MB each)
 			cluster_count += 1
 			show_spinner(cluster_count)
+			_loop_progress(er.current_element.element_start_pos)
 
 			# in extract mode, we know the first data offset we're looking for,
 			# so skip any clusters before that
@@ -3151,7 +3357,7 @@ def mkv_extract_sample_streams(self, tracks, movie):
 			# in extract mode,
 			# extract all attachments in case we need them later
 			if attachment.attachment_file == None:
-				attachment.attachment_file = tempfile.TemporaryFile()
+				attachment.attachment_file = TrackBuffer(attachment.size)
 				attachment.attachment_file.write(er.read_contents())
 				attachment.attachment_file.seek(0)
 		else:
@@ -3187,7 +3393,7 @@ def _mkv_block_extract(tracks, tracks_main, er, done):
 		len(er.current_element.raw_block_header) +
 		er.current_element.length > track.match_offset):
 		if track.track_file == None:
-			track.track_file = tempfile.TemporaryFile()
+			track.track_file = TrackBuffer(track.data_length)
 		buff = er.read_contents()
 		offset = 0
 		for i in range(len(er.current_element.frame_lengths)):
@@ -3250,7 +3456,7 @@ def open_main(big_file):
 
 def mp4_extract_sample_stream(track, mtrack, main_mp4_file):
 	"""Can throw InvalidMatchOffset"""
-	track.track_file = tempfile.TemporaryFile()
+	track.track_file = TrackBuffer(track.data_length)
 	mtrack = mp4_add_track_stream(mtrack)
 	mtrack.trackstream.stream = open_main(main_mp4_file)
 
@@ -3290,6 +3496,7 @@ def wmv_extract_sample_streams(self, tracks, main_wmv_file):
 
 				if i % 15 == 0:
 					show_spinner(i)
+					_loop_progress(start + i * psize)
 
 				packet = AsfDataPacket()
 				packet.data = data
@@ -3312,7 +3519,7 @@ def wmv_extract_sample_streams(self, tracks, main_wmv_file):
 						+ payload.header_size
 						+ payload.data_length >= track.match_offset):
 						if track.track_file == None:
-							track.track_file = tempfile.TemporaryFile()
+							track.track_file = TrackBuffer(track.data_length)
 
 						# check if we grabbed enough data
 						if track.track_file.tell() < track.data_length:
@@ -3357,7 +3564,7 @@ def flac_extract_sample_streams(self, tracks, main_flac_file):
 	while fr.read():
 		if fr.current_block.is_frame_data():
 			track = tracks[1]
-			track.track_file = tempfile.TemporaryFile()
+			track.track_file = TrackBuffer(track.data_length)
 			track.track_file.write(fr.read_contents())
 			tracks[1] = track
 		fr.skip_contents()
@@ -3370,7 +3577,7 @@ def mp3_extract_sample_streams(self, tracks, main_mp3_file):
 	for block in mr.read():
 		if block.type in ("MP3", "fLaC"):
 			track = tracks[1]
-			track.track_file = tempfile.TemporaryFile()
+			track.track_file = TrackBuffer(track.data_length)
 			# offset is always zero for now (no sample support)
 			# (start offset must match in mp3_find_sample_streams)
 			offset = track.match_offset - block.start_pos
@@ -3390,7 +3597,7 @@ def stream_extract_sample_streams(self, tracks, main_file):
 
 	try:
 		track = tracks[1]
-		track.track_file = tempfile.TemporaryFile()
+		track.track_file = TrackBuffer(track.data_length)
 		stream.seek(track.match_offset)
 		assert stream.read(len(track.signature_bytes)) == track.signature_bytes
 		stream.seek(track.match_offset)
@@ -3401,6 +3608,263 @@ def stream_extract_sample_streams(self, tracks, main_file):
 
 	return tracks, {}
 
+# batches of samples ----------------------------------------------------------
+class _SharedContents(object):
+	"""Wraps a container reader for checking many samples at once.
+	The contents of the current element are read only once for all of them.
+	element_attribute: the reader attribute with the current element"""
+	def __init__(self, reader, element_attribute):
+		self._reader = reader
+		self._element_attribute = element_attribute
+		self._element = None
+		self._contents = None
+
+	def __getattr__(self, name):
+		return getattr(self._reader, name)
+
+	def read_contents(self):
+		element = getattr(self._reader, self._element_attribute)
+		if self._element is not element:
+			self._contents = self._reader.read_contents()
+			self._element = element
+		return self._contents
+
+@instrumented_many
+def find_sample_streams_many(samples, main_file):
+	"""Locates the tracks of many samples of the same type in main_file.
+	samples: list of (ReSample object, tracks) tuples
+	AVI and MKV main files are walked only once for all samples.
+	Returns the list of located tracks in the order of samples."""
+	if len(samples) > 1:
+		if samples[0][0].file_type == FileType.AVI:
+			return _avi_find_many(samples, main_file)
+		elif samples[0][0].file_type == FileType.MKV:
+			return _mkv_find_many(samples, main_file)
+	return [sample.find_sample_streams(tracks, main_file)
+	        for (sample, tracks) in samples]
+
+@instrumented_many
+def extract_sample_streams_many(samples, main_file):
+	"""Extracts the located tracks of many samples from main_file.
+	Returns a (tracks, attachments) tuple for each sample."""
+	if len(samples) > 1:
+		if samples[0][0].file_type == FileType.AVI:
+			return _avi_extract_many(samples, main_file)
+		elif samples[0][0].file_type == FileType.MKV:
+			return _mkv_extract_many(samples, main_file)
+	return [sample.extract_sample_streams(tracks, main_file)
+	        for (sample, tracks) in samples]
+
+def _start_offset(all_tracks):
+	start_offset = 2 ** 63  # long.MaxValue + 1
+	for tracks in all_tracks:
+		for track in tracks.values():
+			if track.match_offset > 0:
+				start_offset = min(track.match_offset, start_offset)
+	return start_offset
+
+def _avi_find_many(samples, main_avi_file):
+	rr = _SharedContents(RiffReader(RiffReadMode.AVI, main_avi_file,
+		archived_file_name=samples[0][0].archived_file_name), "current_chunk")
+	all_tracks = [tracks for (_sample, tracks) in samples]
+	block_counts = [0] * len(samples)
+	done = [False] * len(samples)
+
+	while rr.read() and not all(done):
+		if rr.chunk_type == RiffChunkType.List:
+			rr.move_to_child()
+		else:  # normal chunk
+			for i in range(len(samples)):
+				if not done[i]:
+					(all_tracks[i], block_counts[i], done[i]) = (
+						_avi_normal_chunk_find(all_tracks[i], rr,
+						                       block_counts[i], done[i]))
+			rr.skip_contents()
+	remove_spinner()
+
+	rr.close()
+	return all_tracks
+
+def _avi_extract_many(samples, movie):
+	all_tracks = [tracks for (_sample, tracks) in samples]
+	try:
+		rr = _SharedContents(RiffReader(RiffReadMode.AVI, movie,
+			match_offset=_start_offset(all_tracks),
+			archived_file_name=samples[0][0].archived_file_name),
+			"current_chunk")
+	except InvalidMatchOffsetException as ex:
+		raise InvalidMatchOffset(format(ex))
+
+	block_counts = [0] * len(samples)
+	done = [False] * len(samples)
+
+	while rr.read() and not all(done):
+		if rr.chunk_type == RiffChunkType.List:
+			rr.move_to_child()
+		else:  # normal chunk
+			for i in range(len(samples)):
+				if not done[i]:
+					(all_tracks[i], block_counts[i], done[i]) = (
+						_avi_normal_chunk_extract(all_tracks[i], rr,
+						                          block_counts[i], done[i]))
+			rr.skip_contents()
+	remove_spinner()
+
+	rr.close()
+	return [(tracks, {}) for tracks in all_tracks]
+
+def _mkv_track_header(er, tracks_main, state):
+	"""Keeps the track information of the main MKV file in tracks_main.
+	Returns False when the element isn't part of the track headers."""
+	if er.element_type == EbmlElementType.TrackNumber:
+		elm_content = er.read_contents()
+		state["track"] = GetEbmlUInt(elm_content, 0, len(elm_content))
+		if not state["track"] in tracks_main:
+			td = TrackData()
+			td.track_number = state["track"]
+			tracks_main[state["track"]] = td
+	elif er.element_type == EbmlElementType.TrackCodec:
+		# not necessary, but might be useful for debugging output
+		elm_content = er.read_contents()
+		tracks_main[state["track"]].codec = elm_content.decode(
+		                                        "ascii", errors="ignore")
+	elif er.element_type == EbmlElementType.CompressionAlgorithm:
+		elm_content = er.read_contents()
+		algorithm = GetEbmlUInt(elm_content, 0, len(elm_content))
+		state["header_stripping"] = algorithm == 3
+	elif er.element_type == EbmlElementType.CompressionSettings:
+		elm_content = er.read_contents()
+		if state["header_stripping"]:
+			tracks_main[state["track"]].compression_settings = elm_content
+	else:
+		return False
+	return True
+
+def _mkv_find_many(samples, main_mkv_file):
+	er = _SharedContents(EbmlReader(EbmlReadMode.MKV, main_mkv_file,
+		archived_file_name=samples[0][0].archived_file_name),
+		"current_element")
+	all_tracks = [tracks for (_sample, tracks) in samples]
+	cluster_count = 0
+	done = [False] * len(samples)
+	state = {"track": 0, "header_stripping": False}
+	tracks_main = {}  # contains TrackData objects; main mkv info
+
+	while er.read() and not all(done):
+		if er.element_type in (
+				EbmlElementType.Segment,
+				EbmlElementType.BlockGroup,
+				EbmlElementType.TrackList,
+				EbmlElementType.Track,
+				EbmlElementType.ContentEncodingList,
+				EbmlElementType.ContentEncoding,
+				EbmlElementType.Compression):
+			er.move_to_child()
+		elif er.element_type == EbmlElementType.Cluster:
+			# simple progress indicator since this can take a while
+			# (cluster is good because they're about 1mb each)
+			cluster_count += 1
+			show_spinner(cluster_count)
+			_loop_progress(er.current_element.element_start_pos)
+			er.move_to_child()
+		elif er.element_type == EbmlElementType.Block:
+			for i, (sample, _tracks) in enumerate(samples):
+				if not done[i]:
+					done[i] = _mkv_block_find(sample, all_tracks[i], er,
+					                          done[i], tracks_main)
+			er.skip_contents()
+		elif _mkv_track_header(er, tracks_main, state):
+			if er.element_type == EbmlElementType.TrackNumber:
+				done = [False] * len(samples)
+		else:
+			er.skip_contents()
+
+	remove_spinner()
+
+	er.close()
+	return all_tracks
+
+def _mkv_extract_many(samples, movie):
+	er = _SharedContents(EbmlReader(EbmlReadMode.MKV, movie,
+		archived_file_name=samples[0][0].archived_file_name),
+		"current_element")
+	all_tracks = [tracks for (_sample, tracks) in samples]
+	# search for first offset so we can skip unnecessary clusters later on
+	start_offset = _start_offset(all_tracks)
+
+	# each sample gets its own copy of the attachments for the rebuild
+	all_attachments = [{} for _ in samples]
+	tracks_main = {}  # contains TrackData objects; main mkv info
+	current_attachment = None
+	cluster_count = 0
+	done = [False] * len(samples)
+	state = {"track": 0, "header_stripping": False}
+
+	while er.read() and not all(done):
+		if er.element_type in (
+				EbmlElementType.Segment,
+				EbmlElementType.BlockGroup,
+				EbmlElementType.TrackList,
+				EbmlElementType.Track,
+				EbmlElementType.ContentEncodingList,
+				EbmlElementType.ContentEncoding,
+				EbmlElementType.Compression,
+				EbmlElementType.AttachmentList,
+				EbmlElementType.Attachment):
+			er.move_to_child()
+		elif er.element_type in (EbmlElementType.TimecodeScale,
+		                         EbmlElementType.Timecode,
+		                         EbmlElementType.TrackCodec):
+			er.skip_contents()
+		elif er.element_type == EbmlElementType.Block:
+			for i in range(len(samples)):
+				if not done[i]:
+					done[i] = _mkv_block_extract(all_tracks[i], tracks_main,
+					                             er, done[i])
+			er.skip_contents()
+		elif er.element_type == EbmlElementType.Cluster:
+			# simple progress indicator since this can take a while
+			# (cluster is good because they're about 1MB each)
+			cluster_count += 1
+			show_spinner(cluster_count)
+			_loop_progress(er.current_element.element_start_pos)
+
+			# in extract mode, we know the first data offset we're looking for,
+			# so skip any clusters before that
+			if (er.current_element.element_start_pos +
+				len(er.current_element.raw_header) +
+				er.current_element.length < start_offset):
+				er.skip_contents()
+			else:
+				er.move_to_child()
+		elif _mkv_track_header(er, tracks_main, state):
+			if er.element_type == EbmlElementType.TrackNumber:
+				done = [False] * len(samples)
+		elif er.element_type == EbmlElementType.AttachedFileName:
+			current_attachment = er.read_contents()
+			for attachments in all_attachments:
+				if current_attachment not in attachments:
+					att = AttachmentData(current_attachment)
+					attachments[current_attachment] = att
+		elif er.element_type == EbmlElementType.AttachedFileData:
+			for attachments in all_attachments:
+				attachment = attachments[current_attachment]
+				attachment.size = er.current_element.length
+
+				# in extract mode,
+				# extract all attachments in case we need them later
+				if attachment.attachment_file == None:
+					attachment.attachment_file = TrackBuffer(attachment.size)
+					attachment.attachment_file.write(er.read_contents())
+					attachment.attachment_file.seek(0)
+		else:
+			er.skip_contents()
+
+	remove_spinner()
+
+	er.close()
+	return list(zip(all_tracks, all_attachments))
+
 def avi_rebuild_sample(self, srs_data, tracks, attachments, srs, out_file):
 	crc = 0  # Crc32.StartValue
 	rr = RiffReader(RiffReadMode.SRS, path=srs)
@@ -3428,9 +3892,10 @@ def avi_rebuild_sample(self, srs_data, tracks, attachments, srs, out_file):
 					block_count += 1
 					if block_count % 15 == 0:
 						show_spinner(block_count)
+						_loop_progress(sample.tell())
 
 					track = tracks[rr.current_chunk.stream_number]
-					buff = track.track_file.read(rr.current_chunk.length)
+					buff = track.track_file.read_view(rr.current_chunk.length)
 					sample.write(buff)
 					crc = crc32(buff, crc) & 0xFFFFFFFF
 					rr.skip_contents()
@@ -3498,6 +3963,7 @@ def mkv_rebuild_sample(self, srs_data, tracks, attachments, srs, out_file):
 				# (cluster is good because they're about 1mb each)
 				cluster_count += 1
 				show_spinner(cluster_count)
+				_loop_progress(sample.tell())
 				er.move_to_child()
 			elif er.element_type == EbmlElementType.AttachedFileName:
 				current_attachment = er.read_contents()
@@ -3506,7 +3972,7 @@ def mkv_rebuild_sample(self, srs_data, tracks, attachments, srs, out_file):
 			elif er.element_type == EbmlElementType.AttachedFileData:
 				attachment = attachments[current_attachment]
 				# restore data from extracted attachments
-				buff = attachment.attachment_file.read()
+				buff = attachment.attachment_file.read_view()
 				sample.write(buff)
 				crc = crc32(buff, crc) & 0xFFFFFFFF
 				if srs_data.flags & FileData.ATTACHMENTS_REMOVED != 0:
@@ -3516,7 +3982,7 @@ def mkv_rebuild_sample(self, srs_data, tracks, attachments, srs, out_file):
 			elif er.element_type == EbmlElementType.Block:
 				track = tracks[er.current_element.track_number]
 				# restore data from extracted tracks
-				buff = track.track_file.read(er.current_element.length)
+				buff = track.track_file.read_view(er.current_element.length)
 				rbh = er.current_element.raw_block_header
 				sample.write(rbh)
 				crc = crc32(rbh, crc) & 0xFFFFFFFF
@@ -3563,7 +4029,7 @@ def mp4_rebuild_sample(self, srs_data, tracks, attachments, srs, out_file):
 				# order the interleaved chunks
 				for (chunk, track_nb) in order_chunks(tracks):
 					track = tracks[track_nb]
-					buff = track.track_file.read(sum(chunk.samples))
+					buff = track.track_file.read_view(chunk.size)
 					# write all the stream data
 					sample.write(buff)
 					crc = crc32(buff, crc) & 0xFFFFFFFF
@@ -3611,48 +4077,12 @@ def profile_mp4_srs(srs, tracks):  # XXX: copy paste edit from other function
 			current_track = tracks[track_id]
 
 			# initialization
-			current_track.chunk_offsets = []
-			current_track.chunk_lengths = []
-			current_track.sample_lengths = []
+			mp4_init_sample_tables(current_track)
 			track_processed = False
-		elif atype in (b"stco", b"co64"):
-			# exactly one variant must be present
+		elif atype in (b"stco", b"co64", b"stsc", b"stsz", b"stz2"):
+			# exactly one variant of the chunk offsets must be present
 			assert current_track != None
-			(entry_count,) = BE_LONG.unpack_from(data, 4)
-			if atype == b"stco":
-				size = 4
-				structunp = BE_LONG
-			else:  # b"co64"
-				size = 8
-				structunp = BE_LONGLONG
-			for i in range(entry_count):
-				j = 8 + i * size
-				(offset,) = structunp.unpack_from(data, j)
-				current_track.chunk_offsets.append(offset)
-		elif atype == b"stsc":  # Sample To Chunk Box
-			(entry_count,) = BE_LONG.unpack_from(data, 4)
-			for i in range(entry_count):
-				j = 8 + i * 12
-				# first_chunk
-				# samples_per_chunk
-				# sample_description_index
-				result_tuple = struct.unpack_from(">LLL", data, j)
-				current_track.chunk_lengths.append(result_tuple)
-
-			# enlarge compactly coded tables
-			current_track.chunk_lengths = stsc(current_track.chunk_lengths)
-		elif atype in (b"stsz", b"stz2"):  # Sample Size Boxes
-			(sample_size,) = BE_LONG.unpack_from(data, 4)
-			(sample_count,) = BE_LONG.unpack_from(data, 8)
-			if sample_size == 0:
-				for i in range(sample_count):
-					j = 12 + i * 4
-					(out,) = BE_LONG.unpack_from(data, j)
-					current_track.sample_lengths.append(out)
-			else:
-				for i in range(sample_count):
-					current_track.sample_lengths.append(sample_size)
-
+			mp4_read_sample_table(atype, data, current_track)
 
 		if (current_track and (not track_processed) and
 		    len(current_track.chunk_offsets) and
@@ -3699,6 +4129,7 @@ def wmv_rebuild_sample(self, srs_data, tracks, attachments, srs, out_file):
 				for i in range(total_data_packets):
 					if i % 15 == 0:
 						show_spinner(i)
+						_loop_progress(sample.tell())
 
 					packet = AsfDataPacket()
 					packet.data_file_offset = start + rp_offsets
@@ -3724,7 +4155,7 @@ def wmv_rebuild_sample(self, srs_data, tracks, attachments, srs, out_file):
 						assert payload.header_size == len(payload.header_data)
 
 						# 2) payload data
-						buff = track.track_file.read(payload.data_length)
+						buff = track.track_file.read_view(payload.data_length)
 						sample.write(buff)
 						crc = crc32(buff, crc) & 0xFFFFFFFF
 
@@ -3781,9 +4212,9 @@ def flac_rebuild_sample(self, srs_data, tracks, attachments, srs, out_file):
 				flac.write(data)
 				if fr.current_block.is_last_block():
 					track = tracks[1]
-					crc = crc32(track.track_file.read(), crc)
-					track.track_file.seek(0)
-					flac.write(track.track_file.read())
+					data = track.track_file.read_view()
+					crc = crc32(data, crc)
+					flac.write(data)
 
 			assert fr.read_done
 	fr.close()
@@ -3807,9 +4238,9 @@ def mp3_rebuild_sample(self, srs_data, tracks, attachments, srs, out_file):
 				if not main_data_written:
 					# we are on an SRS block and no sound data is written yet
 					track = tracks[1]
-					crc = crc32(track.track_file.read(), crc)
-					track.track_file.seek(0)
-					mp3.write(track.track_file.read())
+					data = track.track_file.read_view()
+					crc = crc32(data, crc)
+					mp3.write(data)
 					main_data_written = True
 			else:
 				data = mr.read_contents()
@@ -3826,7 +4257,7 @@ def stream_rebuild_sample(self, srs_data, tracks, attachments, srs, out_file):
 	with open(out_file, "wb") as stream:
 		track = tracks[1]
 		track.track_file.seek(0)
-		data = track.track_file.read()
+		data = track.track_file.read_view()
 		crc = crc32(data, crc)
 		stream.write(data)
 
@@ -35,10 +35,14 @@ import traceback
 import resample
 from resample import file_type_info, fpcalc
 from resample.main import InvalidMatchOffset, InvalidPathValue
+from resample.verify import locate_tracks, WRONG_TYPE, NOT_FOUND
+from resample.batch import rebuild_samples, REBUILT
+from resample.checkpoint import SampleCheckpoint
 from rescene.utility import FileType
 from rescene.utility import sep, is_rar
 from rescene.utility import raw_input, unicode
 from rescene.utility import create_temp_file_name, replace_result
+from rescene.instrumentation import subscribe_from_environment
 
 _DEBUG = bool(os.environ.get("RESCENE_DEBUG"))  # leave empty for False
 
@@ -65,7 +69,10 @@ def setup_cli_parser():
 	"To recreate a sample, pass in the SRS file and the full movie file\n"
 	"or the first file of a RAR set containing the full movie.\n"
 	"	ex: srs sample.srs full.mkv\n"
-	"	or: srs sample.srs full.rar\n"),
+	"	or: srs sample.srs full.rar\n"
+	"To recreate several samples of the same full file at once,\n"
+	"pass in all their SRS files followed by the full file.\n"
+	"	ex: srs cd1.srs cd2.srs full.rar\n"),
 	version="%prog " + resample.__version__)  # --help, --version
 
 	creation = optparse.OptionGroup(parser, "Creation options")
@@ -113,6 +120,11 @@ def setup_cli_parser():
 	output.add_option("-m", dest="no_stored_match_offset",
 				action="store_true", default=False,
 				help="Ignore stored match offset against main movie file.")
+	output.add_option("--resume", dest="resume",
+				action="store_true", default=False,
+				help="Keep the located and extracted tracks until the sample "
+				"is rebuilt, so an interrupted rebuild doesn't need to read "
+				"the main file again.")
 	output.add_option("-k", dest="keep_reconstruction_failure",
 				action="store_true", default=False,
 				help="Keep samples that reconstructed, but failed CRC check. "
@@ -121,37 +133,12 @@ def setup_cli_parser():
 	return parser
 
 def verify_main(sample, tracks, options, pexit):
-	main_file_info = file_type_info(options.check)
-	if main_file_info.file_type != sample.file_type:
-		# not checking STREAM formats against those that will fail
-		# e.g. m2ts proof on MKV release
-		if sample.file_type != FileType.STREAM:
-			msg = "Sample and -c file not the same format.\n"
-			pexit(1, msg, False)
-		elif main_file_info.file_type in (
-			FileType.AVI, FileType.MKV, FileType.MP4, FileType.WMV,
-			FileType.MP3, FileType.FLAC):
-			print("Skipping: file type not possible for stream.")
-			if _DEBUG:
-				print(sample.file_type)
-				print(main_file_info.file_type)
-			return tracks  # don't do anything
-	sample.archived_file_name = main_file_info.archived_file
-	tracks = sample.find_sample_streams(tracks, options.check)
-
-	for track in list(tracks.values()):
-		if ((track.signature_bytes and track.match_offset == 0 and
-				sample.file_type not in (FileType.MP3, FileType.STREAM)) or
-			(track.match_offset == -1 and
-				sample.file_type in (FileType.MP3, FileType.STREAM))):
-			# 0 is a legal match offset for MP3 and STREAM
-			msg = ("\nUnable to locate track signature for"
-			       " track %s. Aborting.\n" % track.track_number)
-			pexit(3, msg, False)
-		elif not track.signature_bytes:
-			# main movie file has more tracks? or empty track?
-			tracks.pop(track.track_number)
-	print("Check Complete. All tracks located.")
+	(status, tracks, message) = locate_tracks(sample, tracks, options.check)
+	if status == WRONG_TYPE:
+		pexit(1, message + "\n", False)
+	elif status == NOT_FOUND:
+		pexit(3, "\n%s\n" % message, False)
+	print(message)
 	return tracks
 
 def find_best_educated_guesses(tracks, cut_data):
@@ -219,6 +206,7 @@ def main(argv=None, no_exit=False):
 		return pexit(0)
 
 	(options, args) = parser.parse_args(args=argv)
+	subscribe_from_environment()
 
 	if ((options.directory and options.parent_directory) or
 		(options.directory and options.srs_parent_directory) or
@@ -443,6 +431,12 @@ def main(argv=None, no_exit=False):
 			print("SRS Load Complete...          "
 			      "Elapsed Time: {0:.2f}s".format(total))
 
+			# the guesses for cut data need a new track location
+			checkpoint = None
+			if options.resume and not is_music and not len(sample.cut_data):
+				checkpoint = SampleCheckpoint(
+					os.path.join(out_folder, srs_data.name), srs, movie)
+
 			skip_location = True
 			for track in tracks.values():
 				if track.match_offset == 0:
@@ -451,7 +445,9 @@ def main(argv=None, no_exit=False):
 
 			# 2) Find the sample streams in the main movie file
 			# always do this search for music files
-			if (is_music or not skip_location or
+			if checkpoint and checkpoint.located(tracks):
+				print("Track Location Restored...")
+			elif (is_music or not skip_location or
 			    options.no_stored_match_offset or len(sample.cut_data)):
 				tracks = movi.find_sample_streams(tracks, movie)
 
@@ -470,13 +466,20 @@ def main(argv=None, no_exit=False):
 						msg = ("\nUnable to locate track signature for track"
 						       " %s. Aborting.\n" % track.track_number)
 						pexit(3, msg, False)
+				if checkpoint:
+					checkpoint.record_located(tracks)
 
 			# 3) Extract those sample streams to memory
-			tracks, attachments = movi.extract_sample_streams(tracks, movie)
-			t1 = time.time()
-			total = t1 - t0
-			print("Track Extraction Complete...  "
-			      "Elapsed Time: {0:.2f}s".format(total))
+			attachments = checkpoint.extracted(tracks) if checkpoint else None
+			extracted = attachments is None
+			if extracted:
+				tracks, attachments = movi.extract_sample_streams(tracks, movie)
+				t1 = time.time()
+				total = t1 - t0
+				print("Track Extraction Complete...  "
+				      "Elapsed Time: {0:.2f}s".format(total))
+			else:
+				print("Track Extraction Restored...")
 
 			# 4) Check for failure
 			for track in tracks.values():
@@ -490,6 +493,8 @@ def main(argv=None, no_exit=False):
 					msg = ("\nUnable to extract correct amount of data for "
 					       "track %s. Aborting.\n" % track.track_number)
 					pexit(4, msg, False)
+			if checkpoint and extracted:
+				checkpoint.record_extracted(tracks, attachments)
 
 			# 5) Ask user for overwrite permission
 			result_file = os.path.join(out_folder, srs_data.name)
@@ -582,6 +587,8 @@ def main(argv=None, no_exit=False):
 					track.track_file.close()
 			for attachment in attachments.values():
 				attachment.attachment_file.close()
+			if checkpoint:
+				checkpoint.remove()
 
 			if sfile.crc32 == srs_data.crc32:
 				replace_result(out_file, result_file)
@@ -625,6 +632,26 @@ def main(argv=None, no_exit=False):
 				msg = "\nRebuild failed for sample: %s\n" % srs_data.name
 				pexit(5, msg, False)
 
+		# reconstructing many samples of the same main file
+		elif len(args) > 2 and all(srs.lower().endswith(".srs")
+		                           for srs in args[:-1]):
+			out_folder = options.output_dir if options.output_dir else "."
+			if not os.path.exists(out_folder):
+				os.makedirs(out_folder)
+			results = rebuild_samples(args[:-1], args[-1], out_folder,
+				lambda result_file: can_overwrite(result_file,
+				                                  options.always_yes))
+			for result in results:
+				print("%s: %s" % (os.path.basename(result.srs_file),
+				                  result.message))
+			t1 = time.time()
+			print("Rebuild Complete...           "
+			      "Elapsed Time: {0:.2f}s".format(t1 - t0))
+			failed = [r for r in results if r.status != REBUILT]
+			if failed:
+				pexit(5, "\nRebuild failed for %d of %d samples.\n" %
+				         (len(failed), len(results)), False)
+
 		else:
 			parser.print_help()
 			pexit(1)
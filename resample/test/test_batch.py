@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+import os
+import struct
+
+import resample.main
+import resample.srs
+from rescene import main as rescene_main
+from rescene.main import MsgCode, Observer
+from resample.batch import rebuild_samples, REBUILT, FAILED
+from resample.verify import SampleProfile, match_samples, MATCHED
+from resample.test.test_main import SampleTest, build_mp4
+
+def riff_chunk(fourcc, data):
+	pad = b"\0" if len(data) % 2 else b""
+	return fourcc + struct.pack("<I", len(data)) + data + pad
+
+def riff_list(fourcc, data):
+	return b"LIST" + struct.pack("<I", len(data) + 4) + fourcc + data
+
+def build_avi(chunks):
+	"""chunks: list of (fourcc, data) tuples for the movi list"""
+	hdrl = riff_list(b"hdrl", riff_chunk(b"avih", b"\0" * 56))
+	movi = riff_list(b"movi",
+		b"".join(riff_chunk(fourcc, data) for (fourcc, data) in chunks))
+	return (b"RIFF" + struct.pack("<I", len(hdrl) + len(movi) + 4) +
+	        b"AVI " + hdrl + movi)
+
+def ebml(element_id, data):
+	"""Element with a 4 byte size field."""
+	return element_id + struct.pack(">I", 0x10000000 | len(data)) + data
+
+def build_mkv(clusters):
+	"""clusters: list of (timecode, [(track number, data), ...]) tuples"""
+	header = ebml(b"\x1a\x45\xdf\xa3", ebml(b"\x42\x82", b"matroska"))
+	tracks = ebml(b"\x16\x54\xae\x6b", b"".join(
+		ebml(b"\xae", ebml(b"\xd7", struct.pack("B", number)) +
+		               ebml(b"\x86", codec))
+		for (number, codec) in ((1, b"V_TEST"), (2, b"A_TEST"))))
+	body = tracks
+	for (timecode, blocks) in clusters:
+		cluster = ebml(b"\xe7", struct.pack(">H", timecode))
+		for (track, data) in blocks:
+			cluster += ebml(b"\xa3",
+				struct.pack("B", 0x80 | track) + b"\0\0\x80" + data)
+		body += ebml(b"\x1f\x43\xb6\x75", cluster)
+	return header + ebml(b"\x18\x53\x80\x67", body)
+
+class TestRebuildSamples(SampleTest):
+	seed = 3
+
+	def profile(self, main, samples):
+		"""Creates an SRS file for every sample. Returns the SRS files."""
+		profiles = [SampleProfile(sample) for sample in samples]
+		matches = match_samples(profiles, main)
+		self.assertEqual([MATCHED] * len(samples),
+		                 [m.status for m in matches])
+		# the batch locates the same tracks as a check per sample
+		for (profile, match) in zip(profiles, matches):
+			single = profile.match(main)
+			self.assertEqual(
+				dict((n, t.match_offset) for n, t in single.tracks.items()),
+				dict((n, t.match_offset) for n, t in match.tracks.items()))
+
+		srs_files = []
+		for (sample, profile, match) in zip(samples, profiles, matches):
+			srs = os.path.splitext(sample)[0] + ".srs"
+			profile.create_srs(srs, match)
+			srs_files.append(srs)
+		return srs_files
+
+	def assert_rebuilt(self, samples, results):
+		self.assertEqual([REBUILT] * len(samples), [r.status for r in results])
+		for (sample, result) in zip(samples, results):
+			self.assertEqual(os.path.basename(sample),
+			                 os.path.basename(result.sample_file))
+			with open(sample, "rb") as expected:
+				with open(result.sample_file, "rb") as rebuilt:
+					self.assertEqual(expected.read(), rebuilt.read())
+
+	def test_avi(self):
+		chunks = [(b"01wb" if i % 3 == 0 else b"00dc", self.data())
+		          for i in range(30)]
+		main = self.write("main.avi", build_avi(chunks))
+		samples = [self.write("cd1.avi", build_avi(chunks[3:9])),
+		           self.write("cd2.avi", build_avi(chunks[15:24]))]
+		srs_files = self.profile(main, samples)
+
+		out = os.path.join(self.dir, "out")
+		os.mkdir(out)
+		results = rebuild_samples(srs_files, main, out)
+		self.assert_rebuilt(samples, results)
+
+		# existing samples are kept when overwriting is refused
+		results = rebuild_samples(srs_files, main, out, lambda path: False)
+		self.assertEqual([FAILED] * 2, [r.status for r in results])
+
+	def test_mkv(self):
+		clusters = [(i, [(1, self.data()), (2, self.data()), (1, self.data())])
+		            for i in range(12)]
+		main = self.write("main.mkv", build_mkv(clusters))
+		samples = [self.write("cd1.mkv", build_mkv(clusters[2:5])),
+		           self.write("cd2.mkv", build_mkv(clusters[7:10]))]
+		srs_files = self.profile(main, samples)
+
+		out = os.path.join(self.dir, "out")
+		os.mkdir(out)
+		self.assert_rebuilt(samples, rebuild_samples(srs_files, main, out))
+
+	def test_events(self):
+		clusters = [(i, [(1, self.data()), (2, self.data())])
+		            for i in range(8)]
+		main = self.write("main.mkv", build_mkv(clusters))
+		samples = [self.write("cd1.mkv", build_mkv(clusters[1:3])),
+		           self.write("cd2.mkv", build_mkv(clusters[5:7]))]
+
+		observer = Observer()
+		callbacks = list(rescene_main.instrumentation_callbacks)
+		interval = resample.main.PROGRESS_INTERVAL
+		rescene_main.instrumentation_callbacks[:] = [observer]
+		resample.main.PROGRESS_INTERVAL = 0
+		try:
+			srs_files = self.profile(main, samples)
+			out = os.path.join(self.dir, "out")
+			os.mkdir(out)
+			rebuild_samples(srs_files, main, out)
+		finally:
+			rescene_main.instrumentation_callbacks[:] = callbacks
+			resample.main.PROGRESS_INTERVAL = interval
+
+		stages = [e.stage for e in observer.events
+		          if e.code == MsgCode.STAGE]
+		self.assertTrue("find_sample_streams_many" in stages)
+		self.assertTrue("extract_sample_streams_many" in stages)
+		# the loops report their position while walking the main file
+		positions = [e.position for e in observer.events
+		             if e.code == MsgCode.PROGRESS and
+		             hasattr(e, "position")]
+		self.assertTrue(positions)
+
+	def test_fallback(self):
+		# MP4 samples are located one at a time
+		video = [self.chunk(3) for _ in range(6)]
+		audio = [self.chunk(2) for _ in range(5)]
+		main = self.write("main.mp4", build_mp4((video, audio)))
+		samples = [self.write("cd1.mp4", build_mp4((video[1:3], audio[0:2]))),
+		           self.write("cd2.mp4", build_mp4((video[3:5], audio[2:4])))]
+		srs_files = self.profile(main, samples)
+		text = self.write("text.srs", b"no SRS file at all")
+
+		out = os.path.join(self.dir, "out")
+		resample.srs.main(srs_files + [main, "-y", "-o", out], no_exit=True)
+		for sample in samples:
+			with open(sample, "rb") as expected:
+				with open(os.path.join(out, os.path.basename(sample)),
+				          "rb") as rebuilt:
+					self.assertEqual(expected.read(), rebuilt.read())
+
+		results = rebuild_samples([text] + srs_files, main, out)
+		self.assertEqual([FAILED, REBUILT, REBUILT],
+		                 [r.status for r in results])
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+import unittest
+
+from resample.buffer import TrackBuffer, MemoryBudget
+
+class TestTrackBuffer(unittest.TestCase):
+	def setUp(self):
+		self.budget = MemoryBudget(100)
+
+	def test_in_memory(self):
+		tb = TrackBuffer(10, self.budget)
+		tb.write(b"0123456789")
+		self.assertTrue(tb.in_memory)
+		self.assertEqual(10, tb.tell())
+		tb.seek(0)
+		self.assertEqual(b"0123", bytes(tb.read_view(4)))
+		self.assertEqual(b"456789", tb.read())
+		tb.close()
+		self.assertEqual(0, self.budget.used)
+
+	def test_spill_on_growth(self):
+		tb = TrackBuffer(10, self.budget)
+		tb.write(b"a" * 60)
+		self.assertTrue(tb.in_memory)
+		tb.write(b"b" * 60)
+		self.assertFalse(tb.in_memory)
+		self.assertEqual(0, self.budget.used)
+		self.assertEqual(120, tb.tell())
+		tb.seek(0)
+		self.assertEqual(b"a" * 60 + b"b" * 60, tb.read_view())
+		tb.close()
+
+	def test_too_large_for_budget(self):
+		other = TrackBuffer(80, self.budget)
+		tb = TrackBuffer(30, self.budget)
+		self.assertFalse(tb.in_memory)
+		other.close()
+		tb.close()
+		self.assertEqual(0, self.budget.used)
+
+	def test_write_after_view(self):
+		tb = TrackBuffer(memory_budget=self.budget)
+		tb.write(b"abc")
+		tb.seek(0)
+		view = tb.read_view(2)
+		tb.seek(0, 2)
+		tb.write(b"def")
+		self.assertEqual(b"ab", bytes(view))
+		tb.seek(0)
+		self.assertEqual(b"abcdef", tb.read())
+		tb.close()
+
+if __name__ == "__main__":
+	unittest.main()
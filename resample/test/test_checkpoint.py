@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+import os
+
+import resample.srs
+from resample.buffer import TrackBuffer
+from resample.checkpoint import SampleCheckpoint
+from resample.main import TrackData, AttachmentData
+from resample.verify import SampleProfile
+from resample.test.test_main import SampleTest, build_mp4
+
+class TestSampleCheckpoint(SampleTest):
+	seed = 5
+
+	def setUp(self):
+		super(TestSampleCheckpoint, self).setUp()
+		self.srs = self.write("sample.srs", b"srs")
+		self.main = self.write("main.mkv", b"main file")
+		self.result = os.path.join(self.dir, "sample.mkv")
+
+	def tracks(self):
+		tracks = {}
+		for number in (1, 2):
+			track = TrackData()
+			track.track_number = number
+			tracks[number] = track
+		return tracks
+
+	def test_restore(self):
+		tracks = self.tracks()
+		tracks[1].match_offset = 1000
+		tracks[2].match_offset = 2000
+		tracks[1].track_file = TrackBuffer()
+		tracks[1].track_file.write(b"track data")
+		attachment = AttachmentData(b"cover.jpg", 5, TrackBuffer())
+		attachment.attachment_file.write(b"image")
+		checkpoint = SampleCheckpoint(self.result, self.srs, self.main)
+		checkpoint.record_located(tracks)
+		checkpoint.record_extracted(tracks, {b"cover.jpg": attachment})
+		# the buffers are left at the end of their data
+		self.assertEqual(10, tracks[1].track_file.tell())
+
+		tracks = self.tracks()
+		checkpoint = SampleCheckpoint(self.result, self.srs, self.main)
+		self.assertTrue(checkpoint.located(tracks))
+		self.assertEqual(2000, tracks[2].match_offset)
+		attachments = checkpoint.extracted(tracks)
+		self.assertEqual(10, tracks[1].track_file.tell())
+		tracks[1].track_file.seek(0)
+		self.assertEqual(b"track data", tracks[1].track_file.read())
+		self.assertEqual(None, tracks[2].track_file)
+		self.assertEqual(b"image",
+		                 attachments[b"cover.jpg"].attachment_file.read())
+
+		# damaged track data is extracted again
+		self.write(os.path.join(checkpoint.directory, "track-1"), b"track dat")
+		self.assertEqual(None, checkpoint.extracted(self.tracks()))
+
+		# the checkpoint of another main file isn't used
+		self.write("main.mkv", b"other main file")
+		checkpoint = SampleCheckpoint(self.result, self.srs, self.main)
+		self.assertFalse(checkpoint.located(self.tracks()))
+		checkpoint.remove()
+		self.assertFalse(os.path.exists(checkpoint.directory))
+
+	def test_rebuild(self):
+		video = [self.chunk(3) for _ in range(6)]
+		audio = [self.chunk(2) for _ in range(5)]
+		main = self.write("main.mp4", build_mp4((video, audio)))
+		sample = self.write("sample.mp4", build_mp4((video[2:4], audio[1:3])))
+		srs = os.path.join(self.dir, "sample.srs")
+		out = os.path.join(self.dir, "out")
+		os.mkdir(out)
+		profile = SampleProfile(sample)
+		match = profile.match(main)
+		profile.create_srs(srs, match)
+
+		# the tracks were extracted before the run was interrupted
+		checkpoint = SampleCheckpoint(os.path.join(out, "sample.mp4"),
+		                              srs, main)
+		checkpoint.record_located(match.tracks)
+		(tracks, attachments) = profile.sample.extract_sample_streams(
+			match.tracks, main)
+		checkpoint.record_extracted(tracks, attachments)
+
+		# the main file isn't read again: wipe the sample data
+		st = os.stat(main)
+		start = min(t.match_offset for t in match.tracks.values())
+		with open(main, "r+b") as f:
+			f.seek(start)
+			f.write(bytearray(sum(t.data_length
+			                      for t in match.tracks.values())))
+		os.utime(main, (st.st_atime, st.st_mtime))
+		resample.srs.main([srs, main, "--resume", "-y", "-o", out],
+		                  no_exit=True)
+
+		with open(sample, "rb") as expected:
+			with open(os.path.join(out, "sample.mp4"), "rb") as rebuilt:
+				self.assertEqual(expected.read(), rebuilt.read())
+		self.assertFalse(os.path.exists(checkpoint.directory))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from resample import fpcalc
+
+FAKE_FPCALC = """#!/bin/sh
+echo run >> "{log}"
+echo DURATION=123
+echo FINGERPRINT=AQAAfake
+"""
+
+@unittest.skipIf(os.name == "nt", "fake fpcalc is a shell script")
+class TestFingerprintMany(unittest.TestCase):
+	def setUp(self):
+		self.dir = tempfile.mkdtemp(prefix="pyReScene-")
+		self.log = os.path.join(self.dir, "runs.log")
+		fake = os.path.join(self.dir, "fpcalc")
+		with open(fake, "w") as f:
+			f.write(FAKE_FPCALC.format(log=self.log))
+		os.chmod(fake, os.stat(fake).st_mode | stat.S_IEXEC)
+		self.executable = fpcalc.fpcalc_executable
+		self.cache = fpcalc.cache_directory
+		fpcalc.fpcalc_executable = fake
+		fpcalc.cache_directory = os.path.join(self.dir, "cache")
+
+		self.tracks = []
+		for i, name in enumerate(("01-one.mp3", "02-twö.mp3")):
+			track = os.path.join(self.dir, name)
+			with open(track, "wb") as f:
+				f.write(b"\xFF\xFB" + bytes(bytearray([i])) * 100)
+			self.tracks.append(track)
+
+	def tearDown(self):
+		fpcalc.fpcalc_executable = self.executable
+		fpcalc.cache_directory = self.cache
+		fpcalc._results.clear()
+		shutil.rmtree(self.dir)
+
+	def runs(self):
+		with open(self.log) as f:
+			return len(f.readlines())
+
+	def test_cache(self):
+		results = fpcalc.fingerprint_many(self.tracks, self.dir, jobs=2)
+		for track in self.tracks:
+			self.assertEqual((b"123", b"AQAAfake"), results[track])
+		self.assertEqual(2, self.runs())
+
+		# no new fpcalc processes in the same process
+		fpcalc.fingerprint(self.tracks[0], self.dir)
+		self.assertEqual(2, self.runs())
+
+		# nor in a new process
+		fpcalc._results.clear()
+		results = fpcalc.fingerprint_many(self.tracks, self.dir)
+		self.assertEqual((b"123", b"AQAAfake"), results[self.tracks[1]])
+		self.assertEqual(2, self.runs())
+		self.assertEqual(2, len(os.listdir(fpcalc.cache_directory)))
+
+		# the temporary file for the non-ASCII name got removed
+		self.assertEqual(sorted(["01-one.mp3", "02-twö.mp3",
+			"cache", "fpcalc", "runs.log"]), sorted(os.listdir(self.dir)))
+
+if __name__ == "__main__":
+	unittest.main()
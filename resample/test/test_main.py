@@ -32,6 +32,7 @@ import shutil
 import os.path
 import struct
 import sys
+import random
 from os import SEEK_CUR
 
 from resample.main import file_type_info, stsc, sample_class_factory
@@ -39,6 +40,7 @@ from resample.main import profile_wmv, FileData
 from resample import asf
 import resample.srs
 import rescene
+from rescene.rarstream import SrrStream
 from rescene.utility import FileType
 
 class TempDirTest(unittest.TestCase):
@@ -47,6 +49,38 @@ class TempDirTest(unittest.TestCase):
 	def tearDown(self):
 		shutil.rmtree(self.dir)
 
+	def write(self, name, data):
+		"""Writes a file in the temporary directory and returns its path."""
+		path = os.path.join(self.dir, name)
+		with open(path, "wb") as f:
+			f.write(data)
+		return path
+
+class SampleTest(TempDirTest):
+	"""Builds media files from random data. What the resample functions
+	print is hidden."""
+	seed = 0
+
+	def setUp(self):
+		super(SampleTest, self).setUp()
+		self.rand = random.Random(self.seed)
+		self.stdout = sys.stdout
+		sys.stdout = open(os.devnull, "w")
+
+	def tearDown(self):
+		sys.stdout.close()
+		sys.stdout = self.stdout
+		super(SampleTest, self).tearDown()
+
+	def data(self, low=20, high=120):
+		"""Random bytes of a random length."""
+		return bytes(bytearray(self.rand.randrange(256)
+		             for _ in range(self.rand.randrange(low, high))))
+
+	def chunk(self, samples):
+		"""A chunk of random samples for build_mp4()."""
+		return [self.data() for _ in range(samples)]
+
 class TestGetFileType(unittest.TestCase):
 	"""http://samples.mplayerhq.hu/
 	http://archive.org/details/2012.10.samples.mplayerhq.hu"""
@@ -82,6 +116,13 @@ class TestGetFileType(unittest.TestCase):
 		self.assertEqual(FileType.WMV, file_type_info(f.name).file_type)
 		os.unlink(f.name)
 
+	def test_unreadable_stream(self):
+		class Stream(object):
+			def read(self, *args):
+				raise IOError("read error")
+			seek = tell = read
+		self.assertRaises(ValueError, file_type_info, Stream())
+
 class TestStsc(unittest.TestCase):
 	"""Help function for decompressing data structure in MP4 files."""
 	def test_normal(self):
@@ -219,6 +260,74 @@ def serialize_atoms(atoms):
 		abuffer.extend(data)
 	return abuffer
 
+def build_mp4(tracks):
+	"""tracks: for each track a list of chunks with a list of samples
+	Track data is interleaved chunk by chunk in the mdat atom."""
+	def moov(chunk_offsets):
+		traks = []
+		for track_nb, chunks in enumerate(tracks):
+			samples = [s for chunk in chunks for s in chunk]
+			stsc_entries = []
+			for i, chunk in enumerate(chunks):
+				if not stsc_entries or stsc_entries[-1][1] != len(chunk):
+					stsc_entries.append((i + 1, len(chunk), 1))
+			stsc = struct.pack(">LL", 0, len(stsc_entries))
+			for entry in stsc_entries:
+				stsc += struct.pack(">LLL", *entry)
+			stsz = struct.pack(">LLL", 0, 0, len(samples))
+			stsz += b"".join(struct.pack(">L", len(s)) for s in samples)
+			stco = struct.pack(">LL", 0, len(chunks))
+			stco += b"".join(struct.pack(">L", offset)
+			                 for offset in chunk_offsets[track_nb])
+			traks.append((b"trak", (
+				(b"tkhd", struct.pack(">LLLL", 0, 0, 0, track_nb + 1)),
+				(b"mdia", (
+					(b"minf", (
+						(b"stbl", (
+							(b"stsc", stsc),
+							(b"stsz", stsz),
+							(b"stco", stco),
+						)),
+					)),
+				)),
+			)))
+		return serialize_atoms(((b"moov", traks),))
+
+	ftyp = serialize_atoms(((b"ftyp", b""),))
+	dummy = [[0] * len(chunks) for chunks in tracks]
+	offset = len(ftyp) + len(moov(dummy)) + 8
+	chunk_offsets = [[] for _ in tracks]
+	mdat = bytearray()
+	for i in range(max(len(chunks) for chunks in tracks)):
+		for track_nb, chunks in enumerate(tracks):
+			if i < len(chunks):
+				chunk_offsets[track_nb].append(offset + len(mdat))
+				mdat.extend(b"".join(chunks[i]))
+	return ftyp + moov(chunk_offsets) + serialize_atoms(((b"mdat", mdat),))
+
+class TestMp4Rebuild(SampleTest):
+	"""Locates and extracts the sample tracks in a main file with
+	multiple samples per chunk and a compactly coded stsc table."""
+	seed = 42
+
+	def runTest(self):
+		chunk = self.chunk
+		video = [chunk(3), chunk(3), chunk(3), chunk(2), chunk(2), chunk(5)]
+		audio = [chunk(1), chunk(4), chunk(4), chunk(4), chunk(1)]
+		main = self.write("main.mp4", build_mp4((video, audio)))
+		sample = self.write("sample.mp4", build_mp4((video[2:], audio[1:4])))
+		with open(sample, "rb") as f:
+			expected = f.read()
+
+		resample.srs.main([sample, "-y", "-o", self.dir, "-c", main],
+		                  no_exit=True)
+		os.unlink(sample)
+		srs = os.path.join(self.dir, "sample.srs")
+		resample.srs.main([srs, main, "-y", "-o", self.dir], no_exit=True)
+
+		with open(sample, "rb") as f:
+			self.assertEqual(expected, f.read())
+
 class TestLoad(TempDirTest):
 	def runTest(self):
 		srr = os.path.join(
@@ -250,5 +359,34 @@ class TestLoad(TempDirTest):
 		self.assertEqual(917376, tracks[1].data_length)
 		self.assertFalse(tracks[1].match_offset)
 
+class TestLoadStream(unittest.TestCase):
+	"""SRS files are loaded from the SRR without extracting them."""
+	def load(self, srr, srs):
+		srr = os.path.join(os.path.dirname(__file__),
+			os.pardir, os.pardir, "test_files", srr)
+		with SrrStream(srr, srs) as stream:
+			ftype = file_type_info(stream).file_type
+			self.assertEqual(0, stream.tell())
+			return (ftype,) + sample_class_factory(ftype).load_srs(stream)
+
+	def test_avi(self):
+		(ftype, srs_data, tracks) = self.load(
+			os.path.join("bug_detected_as_being_different3",
+			"Akte.2012.08.01.German.Doku.WS.dTV.XViD-FiXTv_f4n4t.srr"),
+			"sample/fixtv-akte.2012.08.01.sample.srs")
+		self.assertEqual(FileType.AVI, ftype)
+		self.assertEqual(0xC7FB72A8, srs_data.crc32)
+		self.assertEqual(3385806, tracks[0].data_length)
+
+	def test_mkv(self):
+		(ftype, srs_data, tracks) = self.load(
+			os.path.join("other",
+			"House.S06E12.720p.HDTV.x264-IMMERSE_rarfs_problem.srr"),
+			"house.s06e12.720p.hdtv.x264-immerse.sample.srs")
+		self.assertEqual(FileType.MKV, ftype)
+		self.assertEqual("house.s06e12.720p.hdtv.x264-immerse.sample.mkv",
+			srs_data.name)
+		self.assertEqual(2, len(tracks))
+
 if __name__ == "__main__":
 	unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+
+import resample.srs
+from resample.verify import SampleProfile, MATCHED, NOT_FOUND, WRONG_TYPE
+from resample.test.test_main import SampleTest, build_mp4
+
+class TestSampleProfile(SampleTest):
+	seed = 7
+
+	def setUp(self):
+		super(TestSampleProfile, self).setUp()
+		chunk = self.chunk
+		video = [chunk(3) for _ in range(6)]
+		audio = [chunk(2) for _ in range(5)]
+		self.main = self.write("main.mp4", build_mp4((video, audio)))
+		self.other = self.write("other.mp4",
+			build_mp4(([chunk(3) for _ in range(6)], audio)))
+		self.sample = self.write("sample.mp4",
+			build_mp4((video[2:4], audio[1:3])))
+
+	def test_match_first(self):
+		profile = SampleProfile(self.sample)
+		text = self.write("text.txt", b"no media file at all")
+		results = profile.match_first([self.other, text, self.main, text])
+		self.assertEqual([NOT_FOUND, WRONG_TYPE, MATCHED],
+		                 [r.status for r in results])
+		self.assertFalse(results[0].usable)
+		self.assertTrue(results[2].usable)
+		# the profiled tracks are not changed by the checks
+		self.assertTrue(all(t.match_offset == 0
+		                    for t in profile.tracks.values()))
+
+		with open(self.sample, "rb") as f:
+			expected = f.read()
+		srs = os.path.join(self.dir, "sample.srs")
+		profile.create_srs(srs, results[-1])
+		os.unlink(self.sample)
+		resample.srs.main([srs, self.main, "-y", "-o", self.dir],
+		                  no_exit=True)
+		with open(self.sample, "rb") as f:
+			self.assertEqual(expected, f.read())
+
+	def test_unusable_sample(self):
+		text = self.write("text.txt", b"no media file at all")
+		self.assertRaises(ValueError, SampleProfile, text)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+"""Verification of a sample against the main files of a release.
+
+A sample is profiled once. Its tracks can then be located in one main
+file after the other. Every check returns a MainFileMatch result: an
+unknown format, a sample that isn't found and errors while reading the
+main file don't raise exceptions. match_samples() checks many samples
+with a single walk of an AVI or MKV main file."""
+
+import collections
+import copy
+import os
+
+from resample.main import file_type_info, sample_class_factory, FileData
+from resample.main import find_sample_streams_many
+from rescene.utility import FileType, create_temp_file_name, replace_result
+
+MATCHED = "matched"
+# a STREAM sample with a main file that can't contain it: not checked
+SKIPPED = "skipped"
+NOT_FOUND = "not found"
+WRONG_TYPE = "wrong type"
+FAILED = "failed"
+
+_NOT_FOR_STREAM = (FileType.AVI, FileType.MKV, FileType.MP4, FileType.WMV,
+                   FileType.MP3, FileType.FLAC)
+
+class MainFileMatch(collections.namedtuple("MainFileMatch",
+		"main_file status tracks message")):
+	"""The result of checking a sample against a single main file."""
+	__slots__ = ()
+
+	@property
+	def usable(self):
+		"""The tracks can be used to create the SRS file."""
+		return self.status in (MATCHED, SKIPPED)
+
+def locate_tracks(sample, tracks, main_file):
+	"""Finds the tracks of a profiled sample in main_file.
+	sample: the ReSample object of the sample
+	tracks: the profiled tracks; they get the match offsets
+	Returns (status, tracks, message)."""
+	main_file_info = file_type_info(main_file)
+	if main_file_info.file_type != sample.file_type:
+		# not checking STREAM formats against those that will fail
+		# e.g. m2ts proof on MKV release
+		if sample.file_type != FileType.STREAM:
+			return (WRONG_TYPE, tracks,
+			        "Sample and -c file not the same format.")
+		elif main_file_info.file_type in _NOT_FOR_STREAM:
+			return (SKIPPED, tracks,
+			        "Skipping: file type not possible for stream.")
+	sample.archived_file_name = main_file_info.archived_file
+	tracks = sample.find_sample_streams(tracks, main_file)
+	return check_located(sample, tracks)
+
+def check_located(sample, tracks):
+	"""Checks the result of find_sample_streams().
+	Returns (status, tracks, message)."""
+	for track in list(tracks.values()):
+		if ((track.signature_bytes and track.match_offset == 0 and
+				sample.file_type not in (FileType.MP3, FileType.STREAM)) or
+			(track.match_offset == -1 and
+				sample.file_type in (FileType.MP3, FileType.STREAM))):
+			# 0 is a legal match offset for MP3 and STREAM
+			return (NOT_FOUND, tracks, "Unable to locate track signature "
+			        "for track %s. Aborting." % track.track_number)
+		elif not track.signature_bytes:
+			# main movie file has more tracks? or empty track?
+			tracks.pop(track.track_number)
+	return (MATCHED, tracks, "Check Complete. All tracks located.")
+
+class SampleProfile(object):
+	"""A sample that is profiled once to check it against many main files.
+	Raises ValueError or IncompleteSample when the sample can't be used."""
+	def __init__(self, sample_file, big_file=False):
+		self.sample_file = os.path.abspath(sample_file)
+		self.big_file = big_file
+		file_type = file_type_info(self.sample_file).file_type
+		if file_type == FileType.Unknown:
+			raise ValueError("Could not locate MKV, AVI, MP4, WMV, FLAC or "
+			                 "MP3 data in file: %s" %
+			                 os.path.basename(self.sample_file))
+		if os.path.getsize(self.sample_file) >= 0x80000000 and not big_file:
+			raise ValueError("Samples over 2GiB are not supported "
+			                 "without big_file.")
+		self.sample = sample_class_factory(file_type)
+		self.file_data = FileData(file_name=self.sample_file)
+		(self.tracks, self.attachments) = self.sample.profile_sample(
+			self.file_data)
+		if not len(self.tracks):
+			raise ValueError("No A/V data was found. "
+			                 "The sample is likely corrupted.")
+		# .vob track list always has track number 1
+		self.is_rar = (self.sample_file.lower().endswith(".vob") and
+			self.tracks[1].signature_bytes.startswith(b"Rar!"))
+
+	def _track_copies(self):
+		# the profiled tracks stay untouched for the next main file
+		return dict((number, copy.copy(track))
+		            for (number, track) in self.tracks.items())
+
+	def match(self, main_file):
+		"""Locates the sample in main_file. Returns a MainFileMatch."""
+		if self.is_rar:
+			return MainFileMatch(main_file, SKIPPED, self._track_copies(),
+			                     "The vobsample is a RAR volume.")
+		try:
+			(status, tracks, message) = locate_tracks(
+				self.sample, self._track_copies(), main_file)
+		except Exception as err:
+			return MainFileMatch(main_file, FAILED, None, str(err))
+		return MainFileMatch(main_file, status, tracks, message)
+
+	def match_first(self, main_files):
+		"""Checks the main files in order until one contains the sample.
+		Returns the MainFileMatch of each checked file: the last one
+		is usable when the sample was found."""
+		results = []
+		for main_file in main_files:
+			results.append(self.match(main_file))
+			if results[-1].usable:
+				break
+		return results
+
+	def create_srs(self, srs_name, match=None):
+		"""Writes the SRS file. The tracks of a usable match include
+		the location of the sample in the main file."""
+		tracks = match.tracks if match is not None else self.tracks
+		srs_name_tmp = create_temp_file_name(srs_name)
+		self.sample.create_srs(tracks, self.file_data, self.sample_file,
+		                       srs_name_tmp, self.big_file)
+		replace_result(srs_name_tmp, srs_name)
+
+def match_samples(profiles, main_file):
+	"""Checks many SampleProfile objects against main_file.
+	The samples with the format of the main file are located together.
+	Returns a MainFileMatch for each profile."""
+	main_file_info = file_type_info(main_file)
+	results = [None] * len(profiles)
+	batch = []
+	for (i, profile) in enumerate(profiles):
+		if (profile.is_rar or
+			profile.sample.file_type != main_file_info.file_type):
+			results[i] = profile.match(main_file)
+		else:
+			profile.sample.archived_file_name = main_file_info.archived_file
+			batch.append(i)
+	if not batch:
+		return results
+
+	samples = [(profiles[i].sample, profiles[i]._track_copies())
+	           for i in batch]
+	try:
+		located = find_sample_streams_many(samples, main_file)
+	except Exception as err:
+		for i in batch:
+			results[i] = MainFileMatch(main_file, FAILED, None, str(err))
+		return results
+	for (i, (sample, _tracks), tracks) in zip(batch, samples, located):
+		(status, tracks, message) = check_located(sample, tracks)
+		results[i] = MainFileMatch(main_file, status, tracks, message)
+	return results
@@ -32,10 +32,13 @@ import ctypes
 from ctypes import util
 
 try:
-	from utility import _DEBUG
+	from rescene.utility import _DEBUG
 except ImportError:
-	# not used within rescene, but the scripts
-	_DEBUG = True
+	try:
+		from utility import _DEBUG
+	except ImportError:
+		# not used within rescene, but the scripts
+		_DEBUG = True
 
 def crc32_combine_function():
 	"""Returns function to zlib when possible.
@@ -56,7 +59,16 @@ def crc32_combine_function():
 			print(libpath)
 		try:
 			zlib = ctypes.cdll.LoadLibrary(libpath)
-			return zlib.crc32_combine
+			# the z_off_t length of crc32_combine() can be 32 bits
+			if hasattr(zlib, "crc32_combine64"):
+				combine = zlib.crc32_combine64
+				length_type = ctypes.c_int64
+			else:
+				combine = zlib.crc32_combine
+				length_type = ctypes.c_long
+			combine.argtypes = [ctypes.c_ulong, ctypes.c_ulong, length_type]
+			combine.restype = ctypes.c_ulong
+			return combine
 		except OSError:
 			# OSError: [WinError 193] %1 is not a valid Win32 application
 			# on C:\Program Files\Intel\WiFi\bin\zlib1.dll
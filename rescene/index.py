@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+"""Index database with the metadata of a collection of SRR files.
+
+The index is a SQLite database. It keeps for each SRR file the archived
+files with their sizes and CRCs, the stored files, the OSO hashes and
+some flags. update() only parses the SRR files that are new or that
+have a different modification time or size since the last update.
+Collection queries then need no parsing of SRR files at all."""
+
+import os
+import sqlite3
+
+from rescene.main import content_hash
+from rescene.rar import BlockType
+from rescene.scan import find_srrs, scan
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS srr (
+	id INTEGER PRIMARY KEY,
+	path TEXT UNIQUE NOT NULL,
+	mtime REAL NOT NULL,
+	size INTEGER NOT NULL,
+	appname TEXT,
+	content_hash TEXT,
+	compressed INTEGER NOT NULL DEFAULT 0,
+	has_nfo INTEGER NOT NULL DEFAULT 0,
+	has_sfv INTEGER NOT NULL DEFAULT 0,
+	rar_size INTEGER NOT NULL DEFAULT 0,
+	error TEXT
+);
+CREATE TABLE IF NOT EXISTS archived_file (
+	srr_id INTEGER NOT NULL,
+	name TEXT NOT NULL,
+	size INTEGER NOT NULL,
+	crc32 TEXT,
+	compressed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stored_file (
+	srr_id INTEGER NOT NULL,
+	name TEXT NOT NULL,
+	size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS oso_hash (
+	srr_id INTEGER NOT NULL,
+	name TEXT NOT NULL,
+	size INTEGER NOT NULL,
+	oso_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archived_file_crc32 ON archived_file (crc32);
+CREATE INDEX IF NOT EXISTS archived_file_srr ON archived_file (srr_id);
+CREATE INDEX IF NOT EXISTS stored_file_srr ON stored_file (srr_id);
+CREATE INDEX IF NOT EXISTS oso_hash_hash ON oso_hash (oso_hash);
+CREATE INDEX IF NOT EXISTS oso_hash_srr ON oso_hash (srr_id);
+CREATE INDEX IF NOT EXISTS srr_content_hash ON srr (content_hash);
+"""
+
+# amount of updated SRR files per transaction
+COMMIT_EVERY = 1000
+
+def _record(parsed):
+	"""The rows of the index for a single parsed SRR file."""
+	info = parsed.info()
+	stored = [(block.file_name, block.file_size)
+	          for block in parsed.of_type(BlockType.SrrStoredFile)]
+	extensions = set(name[-4:].lower() for (name, _size) in stored)
+	srr = {
+		"appname": info["appname"],
+		"content_hash": content_hash(parsed.srr_file, blocks=parsed.blocks),
+		"compressed": int(bool(info["compression"])),
+		"has_nfo": int(".nfo" in extensions),
+		"has_sfv": int(".sfv" in extensions),
+		"rar_size": sum(f.file_size for f in info["rar_files"].values()),
+	}
+	archived = [(f.file_name, f.file_size, f.crc32, int(f.compression))
+	            for f in info["archived_files"].values()]
+	oso_hashes = [(name, size, oso_hash)
+	              for (name, oso_hash, size) in info["oso_hashes"]]
+	return (srr, archived, stored, oso_hashes)
+
+class SrrIndex(object):
+	"""SQLite index of a collection of SRR files."""
+	def __init__(self, db_file):
+		self.connection = sqlite3.connect(db_file)
+		self.connection.executescript(SCHEMA)
+
+	def close(self):
+		self.connection.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def update(self, paths, recursive=True, processes=None, prune=True):
+		"""Indexes the new and changed SRR files among the given files
+		and directories.
+		prune: forget indexed files that do not exist anymore
+		Returns (amount of indexed files, amount of removed files)."""
+		known = dict((path, (mtime, size)) for (path, mtime, size) in
+			self.connection.execute("SELECT path, mtime, size FROM srr"))
+		stats = {}
+		def changed():
+			for srr_file in find_srrs(paths, recursive):
+				srr_file = os.path.abspath(srr_file)
+				if srr_file in stats:
+					continue  # also reached through another path
+				stat = os.stat(srr_file)
+				stats[srr_file] = (stat.st_mtime, stat.st_size)
+				if known.get(srr_file) != stats[srr_file]:
+					yield srr_file
+
+		indexed = 0
+		try:
+			for (srr_file, record, err) in scan(changed(), _record, processes):
+				(mtime, size) = stats[srr_file]
+				self._store(srr_file, mtime, size, record, err)
+				indexed += 1
+				if indexed % COMMIT_EVERY == 0:
+					self.connection.commit()
+			removed = 0
+			if prune:
+				for path in known:
+					if not os.path.isfile(path):
+						self._remove(path)
+						removed += 1
+			self.connection.commit()
+		except:
+			self.connection.rollback()
+			raise
+		return (indexed, removed)
+
+	def _remove(self, path):
+		cursor = self.connection.cursor()
+		row = cursor.execute("SELECT id FROM srr WHERE path = ?",
+		                     (path,)).fetchone()
+		if row is None:
+			return
+		for table in ("archived_file", "stored_file", "oso_hash"):
+			cursor.execute("DELETE FROM %s WHERE srr_id = ?" % table, row)
+		cursor.execute("DELETE FROM srr WHERE id = ?", row)
+
+	def _store(self, path, mtime, size, record, err):
+		self._remove(path)
+		cursor = self.connection.cursor()
+		if err is not None:
+			# remembered so broken files are not parsed again each update
+			cursor.execute("INSERT INTO srr (path, mtime, size, error) "
+			               "VALUES (?, ?, ?, ?)", (path, mtime, size, str(err)))
+			return
+		(srr, archived, stored, oso_hashes) = record
+		columns = sorted(srr)
+		cursor.execute("INSERT INTO srr (path, mtime, size, %s) "
+			"VALUES (?, ?, ?, %s)" % (", ".join(columns),
+			", ".join("?" * len(columns))),
+			[path, mtime, size] + [srr[c] for c in columns])
+		srr_id = cursor.lastrowid
+		cursor.executemany("INSERT INTO archived_file VALUES (?, ?, ?, ?, ?)",
+			[(srr_id,) + row for row in archived])
+		cursor.executemany("INSERT INTO stored_file VALUES (?, ?, ?)",
+			[(srr_id,) + row for row in stored])
+		cursor.executemany("INSERT INTO oso_hash VALUES (?, ?, ?, ?)",
+			[(srr_id,) + row for row in oso_hashes])
+
+	def _paths(self, query, parameters=()):
+		return [row[0] for row in self.connection.execute(query, parameters)]
+
+	def __len__(self):
+		return self.connection.execute("SELECT COUNT(*) FROM srr").fetchone()[0]
+
+	def with_crc(self, crc32):
+		"""(SRR path, archived file name) for each archived file with the
+		given CRC32 hash."""
+		return list(self.connection.execute(
+			"SELECT srr.path, archived_file.name FROM archived_file "
+			"JOIN srr ON srr.id = archived_file.srr_id "
+			"WHERE archived_file.crc32 = ? ORDER BY srr.path",
+			("%08X" % int(crc32, 16),)))
+
+	def with_oso_hash(self, oso_hash):
+		"""(SRR path, file name) for each file with the given OSO hash."""
+		return list(self.connection.execute(
+			"SELECT srr.path, oso_hash.name FROM oso_hash "
+			"JOIN srr ON srr.id = oso_hash.srr_id "
+			"WHERE oso_hash.oso_hash = ? ORDER BY srr.path",
+			(oso_hash.lower(),)))
+
+	def archived_files(self):
+		"""(SRR path, archived file name, CRC32) for all archived files."""
+		return self.connection.execute(
+			"SELECT srr.path, archived_file.name, archived_file.crc32 "
+			"FROM archived_file JOIN srr ON srr.id = archived_file.srr_id "
+			"ORDER BY srr.path, archived_file.rowid")
+
+	def compressed(self):
+		"""SRR files of releases with compressed RARs."""
+		return self._paths("SELECT path FROM srr WHERE compressed "
+		                   "ORDER BY path")
+
+	def missing(self, extension):
+		"""SRR files without a stored .nfo or .sfv file."""
+		column = {".nfo": "has_nfo", ".sfv": "has_sfv"}[extension.lower()]
+		return self._paths("SELECT path FROM srr WHERE NOT %s "
+		                   "AND error IS NULL ORDER BY path" % column)
+
+	def duplicates(self):
+		"""Lists of SRR files with the same content hash."""
+		groups = {}
+		for (content, path) in self.connection.execute(
+				"SELECT content_hash, path FROM srr WHERE content_hash IN "
+				"(SELECT content_hash FROM srr WHERE content_hash IS NOT NULL "
+				"GROUP BY content_hash HAVING COUNT(*) > 1) "
+				"ORDER BY content_hash, path"):
+			groups.setdefault(content, []).append(path)
+		return [groups[content] for content in sorted(groups)]
+
+	def errors(self):
+		"""(SRR path, error message) for the files that could not be read."""
+		return list(self.connection.execute(
+			"SELECT path, error FROM srr WHERE error IS NOT NULL "
+			"ORDER BY path"))
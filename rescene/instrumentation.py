@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+"""Sinks for the PROGRESS and STAGE events of the rescene event bus.
+
+Sinks are subscribed with subscribe(sink, instrumentation=True).
+JsonLinesSink appends every event as a JSON object to a file.
+PrometheusSink keeps totals per stage in a file in the Prometheus text
+exposition format, e.g. for the textfile collector of the node exporter.
+
+Set RESCENE_METRICS to a file name to enable a sink in the command line
+tools: a .prom file name selects the Prometheus format."""
+
+from __future__ import division
+import json
+import os
+import tempfile
+import threading
+import time
+
+from rescene.main import MsgCode, subscribe
+
+try:
+	_replace = os.replace
+except AttributeError:  # Python 2
+	_replace = os.rename
+
+EVENT_NAMES = {
+	MsgCode.PROGRESS: "progress",
+	MsgCode.STAGE: "stage",
+}
+
+class JsonLinesSink(object):
+	"""Appends one JSON object per event to file_name."""
+	def __init__(self, file_name):
+		self.file_name = file_name
+		self._lock = threading.Lock()
+
+	def __call__(self, event):
+		if event.code not in MsgCode.instrumentation:
+			return
+		record = dict(event.__dict__)
+		record["event"] = EVENT_NAMES[event.code]
+		record["time"] = time.time()
+		del record["code"]
+		line = json.dumps(record, sort_keys=True, default=str)
+		with self._lock:
+			with open(self.file_name, "a") as jsonl:
+				jsonl.write(line + "\n")
+
+class PrometheusSink(object):
+	"""Rewrites file_name with the totals of all finished stages."""
+	METRICS = (
+		("runs_total", "counter", "Finished stages."),
+		("bytes_total", "counter", "Bytes processed."),
+		("seconds_total", "counter", "Wall clock time."),
+		("cpu_seconds_total", "counter", "CPU time of the process."),
+		("throughput_bytes", "gauge", "Bytes per second of the last stage."),
+	)
+
+	def __init__(self, file_name, prefix="rescene_stage_"):
+		self.file_name = file_name
+		self.prefix = prefix
+		self.stages = {}
+		self._lock = threading.Lock()
+
+	def __call__(self, event):
+		if event.code != MsgCode.STAGE:
+			return
+		with self._lock:
+			totals = self.stages.setdefault(event.stage, {
+				"runs_total": 0, "bytes_total": 0, "seconds_total": 0.0,
+				"cpu_seconds_total": 0.0, "throughput_bytes": 0.0})
+			totals["runs_total"] += 1
+			totals["bytes_total"] += event.bytes
+			totals["seconds_total"] += event.wall_time
+			totals["cpu_seconds_total"] += event.cpu_time
+			totals["throughput_bytes"] = event.throughput
+			self.write()
+
+	def exposition(self):
+		"""The metrics in the Prometheus text format."""
+		lines = []
+		for (name, metric_type, description) in self.METRICS:
+			metric = self.prefix + name
+			lines.append("# HELP %s %s" % (metric, description))
+			lines.append("# TYPE %s %s" % (metric, metric_type))
+			for stage in sorted(self.stages):
+				lines.append('%s{stage="%s"} %r' % (
+					metric, stage, self.stages[stage][name]))
+		return "\n".join(lines) + "\n"
+
+	def write(self):
+		# the collector must never see a partially written file
+		directory = os.path.dirname(os.path.abspath(self.file_name))
+		(fd, tmp_name) = tempfile.mkstemp(dir=directory, suffix=".tmp")
+		try:
+			with os.fdopen(fd, "w") as prom:
+				prom.write(self.exposition())
+			_replace(tmp_name, self.file_name)
+		except:
+			os.unlink(tmp_name)
+			raise
+
+def sink_for(file_name):
+	"""Prometheus sink for .prom files, JSON lines otherwise."""
+	if file_name.lower().endswith(".prom"):
+		return PrometheusSink(file_name)
+	return JsonLinesSink(file_name)
+
+_environment_sink = None
+
+def subscribe_from_environment():
+	"""Subscribes the sink for the RESCENE_METRICS file if it is set.
+	Safe to call more than once. Returns the sink or None."""
+	global _environment_sink
+	file_name = os.environ.get("RESCENE_METRICS")
+	if file_name and _environment_sink is None:
+		_environment_sink = sink_for(file_name)
+		subscribe(_environment_sink, instrumentation=True)
+	return _environment_sink
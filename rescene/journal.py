@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Checkpoint journals for long-running reconstructions.
+
+A journal is a small JSON file kept next to the output. It records the
+finished parts of a run so an interrupted run can continue where it
+stopped instead of starting over. A journal belongs to its input files:
+it is discarded when one of them has changed."""
+
+import json
+import os
+import tempfile
+import zlib
+
+try:
+	_replace = os.replace
+except AttributeError:  # Python 2
+	_replace = os.rename
+
+VERSION = 1
+
+def identity(file_name):
+	"""Name, size and modification time of a file."""
+	st = os.stat(file_name)
+	return [os.path.basename(file_name), st.st_size, int(st.st_mtime)]
+
+def file_crc32(file_name):
+	"""CRC32 of a file."""
+	crc = 0
+	with open(file_name, "rb") as f:
+		data = f.read(0x100000)
+		while data:
+			crc = zlib.crc32(data, crc)
+			data = f.read(0x100000)
+	return crc & 0xFFFFFFFF
+
+class Journal(object):
+	"""file_name: the JSON file of the journal
+	sources: the input files the journal belongs to"""
+	def __init__(self, file_name, sources):
+		self.file_name = file_name
+		self.sources = [identity(source) for source in sources]
+		self.entries = {}
+		try:
+			with open(file_name) as journal:
+				data = json.load(journal)
+		except (EnvironmentError, ValueError):
+			data = {}
+		if (isinstance(data, dict) and data.get("version") == VERSION and
+			data.get("sources") == self.sources):
+			self.entries = data.get("entries", {})
+
+	@property
+	def resumed(self):
+		"""True when a previous run has recorded progress."""
+		return bool(self.entries)
+
+	def get(self, section, name):
+		"""The recorded value or None."""
+		return self.entries.get(section, {}).get(name)
+
+	def record(self, section, name, value):
+		"""Stores a JSON serializable value and writes the journal."""
+		self.entries.setdefault(section, {})[name] = value
+		self.write()
+
+	def write(self):
+		# an interruption must never leave a partially written journal
+		directory = os.path.dirname(os.path.abspath(self.file_name))
+		(fd, tmp_name) = tempfile.mkstemp(dir=directory, suffix=".tmp")
+		try:
+			with os.fdopen(fd, "w") as journal:
+				json.dump({"version": VERSION, "sources": self.sources,
+				           "entries": self.entries}, journal, sort_keys=True)
+			_replace(tmp_name, self.file_name)
+		except:
+			os.unlink(tmp_name)
+			raise
+
+	def remove(self):
+		"""Deletes the journal after a successful run."""
+		self.entries = {}
+		if os.path.isfile(self.file_name):
+			os.unlink(self.file_name)
+
+	def verified(self, section, name, file_name):
+		"""Returns the recorded value of a finished output file when the
+		file still has the recorded size and CRC, None otherwise."""
+		entry = self.get(section, name)
+		if not entry or entry.get("crc") is None:
+			return None
+		try:
+			if os.path.getsize(file_name) != entry["size"]:
+				return None
+			if file_crc32(file_name) != entry["crc"]:
+				return None
+		except EnvironmentError:
+			return None
+		return entry
@@ -43,6 +43,7 @@ import re
 import hashlib
 import nntplib
 import collections
+import itertools
 
 import time
 import shutil
@@ -57,11 +58,14 @@ from rescene.rarstream import RarStream, FakeFile
 from rescene.utility import (SfvEntry, is_rar, _DEBUG,
                              first_rars, next_archive, empty_folder)
 from rescene.utility import parse_sfv_file, parse_sfv_data
-from rescene.utility import filter_sfv_duplicates
+from rescene.utility import filter_sfv_duplicates, is_good_srr
 from rescene.utility import basestring, fsunicode
 from rescene.utility import decodetext, encodeerrors
-from rescene.utility import capitalized_fn
-from rescene.osohash import osohash_from
+from rescene.utility import capitalized_fn, copy_stream
+from rescene.utility import pipelined_copy, open_sequential, COPY_BUFFER
+from rescene.osohash import osohash_from, osohash_segments, SegmentMap
+from rescene.volumes import VolumeIndex, damaged_volumes, volume_path
+from rescene.recovery import RecoveryRecord
 from rescene.utility import FileType
 
 # compatibility with 2.x
@@ -69,18 +73,11 @@ if sys.hexversion < 0x3000000:
 	# prefer 3.x behavior
 	range = xrange #@ReservedAssignment
 
-try:  # Python 3
-	from functools import partial
-	int_to_bytes_big = partial(int.to_bytes, byteorder="big")
-	int_from_bytes_big = partial(int.from_bytes, byteorder="big")
-except AttributeError:  # Python < 3
-	from binascii import unhexlify, hexlify
-	def int_to_bytes_big(value, length):
-		return unhexlify(format(value, "0{0}X".format(length * 2)))
-	def int_from_bytes_big(bytes):
-		return int(hexlify(bytes), 16)
+# amount of RAR volumes that have their headers read at the same time
+SCAN_THREADS = 8
 
 callbacks = []
+instrumentation_callbacks = []  # receivers of PROGRESS and STAGE events
 
 try:
 	odict = collections.OrderedDict #@UndefinedVariable
@@ -93,8 +90,13 @@ class Event(object):
 	"""Attributes 'message' and 'code'."""
 	pass
 
-def subscribe(callback):
-	callbacks.append(callback)
+def subscribe(callback, instrumentation=False):
+	"""instrumentation: the callback receives the PROGRESS and STAGE
+	events instead of the regular messages"""
+	if instrumentation:
+		instrumentation_callbacks.append(callback)
+	else:
+		callbacks.append(callback)
 	
 def _fire(code, **kwargs):
 	"""Notify subscribers of a new event."""
@@ -102,7 +104,11 @@ def _fire(code, **kwargs):
 	e.code = code
 	for k, v in kwargs.items():
 		setattr(e, k, v)
-	for fn in callbacks:
+	if code in MsgCode.instrumentation:
+		receivers = instrumentation_callbacks
+	else:
+		receivers = callbacks
+	for fn in receivers:
 		fn(e) # this is calling the __call__ method
 
 class Observer(object):
@@ -127,11 +133,69 @@ class MsgCode(object):
 	MSG, OS_ERROR, NO_OVERWRITE, NO_EXTRACTION, DUPE, STORING, FILE_NOT_FOUND,\
 	NO_FILES, DEL_STORED_FILE, RENAME_FILE, CMT, AV, ACL, AUTHENTCITY, \
 	NO_RAR, BLOCK, FBLOCK, RBLOCK, COMPRESSION, UNSUPPORTED_FLAG, CRC,  \
-	USER_ABORTED, AUTO_LOCATE, UNKNOWN = list(range(24))
+	USER_ABORTED, AUTO_LOCATE, UNKNOWN, PROGRESS, STAGE = list(range(26))
 	
 	# informative messages not printed to stderr
 	informative = [MSG, STORING, DEL_STORED_FILE,
 	               BLOCK, RBLOCK, FBLOCK, COMPRESSION]
+	
+	# progress and timing data: only for instrumentation subscribers
+	instrumentation = [PROGRESS, STAGE]
+
+try:
+	_cpu_time = time.process_time
+except AttributeError:  # Python 2
+	_cpu_time = time.clock
+
+class Stage(object):
+	"""Measures a processing stage such as the reconstruction of a RAR set.
+	progress() fires a PROGRESS event with the totals so far and finish()
+	fires a single STAGE event. Both events have the attributes
+	stage, bytes, wall_time, cpu_time and throughput (bytes per second)
+	together with the keyword arguments given to the stage and event.
+	Used as a context manager, the STAGE event is fired when the block
+	completes without an exception."""
+	def __init__(self, name, **info):
+		self.name = name
+		self.info = info
+		self.amount = 0
+		self.finished = False
+		self.start = time.time()
+		self.cpu_start = _cpu_time()
+		
+	def add(self, amount):
+		"""amount: bytes processed"""
+		self.amount += amount
+	
+	def progress(self, amount=0, **info):
+		self.amount += amount
+		self._fire(MsgCode.PROGRESS, info)
+		
+	def finish(self, **info):
+		if not self.finished:
+			self.finished = True
+			self._fire(MsgCode.STAGE, info)
+		
+	def _fire(self, code, info):
+		if not instrumentation_callbacks:
+			return
+		wall_time = time.time() - self.start
+		throughput = self.amount / wall_time if wall_time > 0 else 0.0
+		kwargs = dict(self.info)
+		kwargs.update(info)
+		kwargs.update(stage=self.name, bytes=self.amount,
+		              wall_time=wall_time, throughput=throughput,
+		              cpu_time=_cpu_time() - self.cpu_start)
+		_fire(code, message="%s: %d bytes in %.2fs (%.2f MB/s)" % (
+		      self.name, self.amount, wall_time, throughput / 1000000), 
+		      **kwargs)
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exc_type, exc_value, traceback):
+		if exc_type is None:
+			self.finish()
 
 class DupeFileName(Exception):
 	"""A file already exists with the given name."""
@@ -232,7 +296,7 @@ def _extract(block, out_file):
 		# what error when we cannot create path? XXX: Subs vs subs
 		# that already exists -> LINUX
 		with open(out_file, "wb") as out_stream:
-			out_stream.write(block.srr_data())
+			block.copy_srr_data(out_stream)
 		return True
 	else: # User cancelled the file extraction
 		_fire(MsgCode.NO_OVERWRITE, message="Operation aborted. "
@@ -283,64 +347,19 @@ def add_stored_files(srr_file, store_files, in_folder="", save_paths=False,
 				else:
 					raise DupeFileName(msg)
 
-	# create a temporarily file
-	tmpfd, tmpname = mkstemp(prefix="srr_", suffix=".tmp", 
-							 dir=os.path.dirname(srr_file))
-	tmpfile = os.fdopen(tmpfd, "wb")
-
+	editor = SrrEditor(srr_file, rr)
 	in_folder = in_folder if in_folder else os.path.dirname(srr_file)
-	location = False # whether we've added the files or not
-	if _DEBUG: print("Reading blocks for adding files.")
-	try:
-		for block in rr.read_all():
-			# add the files before the srr rar blocks
-			if block.rawtype == BlockType.SrrRarFile and not location:
-				location = True
-				if not usenet:
-					amount_added = 0
-					for f in _search(store_files, in_folder):
-						_store(f, tmpfile, save_paths, in_folder)
-						amount_added += 1
-					if not amount_added:
-						_fire(MsgCode.NO_FILES,
-						      message="No files found to add.")
-				else: #TODO: make it nicer
-					for f in store_files:
-						_store_fh(f, tmpfile)
-				
-			tmpfile.write(block.block_bytes())
-			
-			# we need to copy the contents from blocks too
-			if block.rawtype == BlockType.SrrStoredFile:
-				tmpfile.write(block.srr_data())
-			# XXX: will this always work correct? 
-			
-		if not location: # music video SRR file: add to end
-			if not usenet:
-				amount_added = 0
-				for f in _search(store_files, in_folder):
-					_store(f, tmpfile, save_paths, in_folder)
-					amount_added += 1
-				if not amount_added:
-					_fire(MsgCode.NO_FILES,
-					      message="No files found to add.")
-			else: #TODO: make it nicer
-				for f in store_files:
-					_store_fh(f, tmpfile)	
-	except:
-		tmpfile.close()
-		os.unlink(tmpname)
-		raise
-	else:
-		tmpfile.close()
-#		if not location:
-#			# Bad SRR file or RAR file given.
-#			os.remove(tmpname)
-#			raise NotSrrFile("No SrrRarFile blocks detected. -> Not SRR. "
-#							 "Zero files added.")
-		# original srr file is replaced by the temp file
-		os.remove(srr_file)
-		os.rename(tmpname, srr_file)
+	if not usenet:
+		amount_added = 0
+		for f in _search(store_files, in_folder):
+			editor.add_file(f, save_paths, in_folder)
+			amount_added += 1
+		if not amount_added:
+			_fire(MsgCode.NO_FILES, message="No files found to add.")
+	else: #TODO: make it nicer
+		for f in store_files:
+			editor.add_open_file(f)
+	editor.apply()
 
 def remove_stored_files(srr_file, store_files):
 	"""Remove files stored inside a SRR file.
@@ -349,33 +368,12 @@ def remove_stored_files(srr_file, store_files):
 	             must contain the relative path when necessary
 	
 	raises ArchiveNotFoundError, NotSrrFile, TypeError"""
-	rr = RarReader(srr_file) # ArchiveNotFoundError
-	if rr.file_type() != RarReader.SRR:
-		raise NotSrrFile("Not an SRR file.")
-	
-	# create a temporarily file
-	tmpfd, tmpname = mkstemp(prefix="remove_", suffix=".srr", 
-							 dir=os.path.dirname(srr_file))
-	tmpfile = os.fdopen(tmpfd, "wb")
-	
-	try:
-		for block in rr.read_all():
-			if block.rawtype == BlockType.SrrStoredFile:
-				if block.file_name in store_files:
-					_fire(MsgCode.DEL_STORED_FILE,
-						  message="'%s' deleted." % block.file_name)
-				else: # write header and stored file
-					tmpfile.write(block.block_bytes())
-					tmpfile.write(block.srr_data())		
-			else: # TODO: write better tests here!!
-				tmpfile.write(block.block_bytes())
-		tmpfile.close()
-		os.remove(srr_file)
-		os.rename(tmpname, srr_file)
-	except BaseException as ex:
-		print(ex)
-		os.unlink(tmpname)
-		raise
+	editor = SrrEditor(srr_file)
+	if isinstance(store_files, basestring):
+		store_files = [store_files]
+	for stored_name in store_files:
+		editor.remove(stored_name)
+	editor.apply()
 
 def rename_stored_file(srr_file, stored_name, new_name):
 	"""Changes the stored file name and the path. 
@@ -388,21 +386,125 @@ def rename_stored_file(srr_file, stored_name, new_name):
 	AttributeError (invalid chars),
 	FileNotFound
 	"""
-	rr = RarReader(srr_file) # ArchiveNotFoundError
-	if rr.file_type() != RarReader.SRR:
-		raise NotSrrFile("Not an SRR file.")
-	
-	for block in rr.read_all():
-		if block.rawtype == BlockType.SrrStoredFile  \
-				and block.file_name == stored_name:
-			_fire(MsgCode.RENAME_FILE,
-				  message="Renaming '%s'" % block.file_name)
-			block.renameto(new_name)
-			break
-	else:
-		_fire(MsgCode.FILE_NOT_FOUND, 
-			  message="'%s' not found" % stored_name)
-		raise FileNotFound("No stored file with such name.")
+	editor = SrrEditor(srr_file)
+	editor.rename(stored_name, new_name)
+	editor.apply()
+
+class SrrEditor(object):
+	"""Collects changes to the stored files of an SRR file and applies them
+	all at once. The SRR file is rewritten a single time, or it is patched
+	in place when no data needs to move: for renames to a name of the same
+	length and for files added to an SRR file without RAR volumes.
+	New files are stored before the first RAR volume."""
+	def __init__(self, srr_file, reader=None):
+		"""reader: RarReader of srr_file that has been used before
+		raises ArchiveNotFoundError, NotSrrFile"""
+		rr = reader if reader else RarReader(srr_file) # ArchiveNotFoundError
+		if rr.file_type() != RarReader.SRR:
+			raise NotSrrFile("Not an SRR file.")
+		self.srr_file = srr_file
+		self.blocks = rr.read_all()
+		self.removed = set()
+		self.renamed = {}  # stored file block: new header
+		self.added = []  # functions that store a file to a stream
+
+	def stored_file_block(self, stored_name):
+		for block in self.blocks:
+			if (block.rawtype == BlockType.SrrStoredFile and
+			    block.file_name == stored_name):
+				return block
+		return None
+
+	def add_file(self, sfile, save_paths=False, in_folder=""):
+		self.added.append(
+			lambda stream: _store(sfile, stream, save_paths, in_folder))
+
+	def add_open_file(self, open_file):
+		"""open_file: file object with the name attribute and
+		the file_size() method, e.g. from usenet"""
+		self.added.append(lambda stream: _store_fh(open_file, stream))
+
+	def remove(self, stored_name):
+		for block in self.blocks:
+			if (block.rawtype == BlockType.SrrStoredFile and
+			    block.file_name == stored_name):
+				self.removed.add(block)
+
+	def rename(self, stored_name, new_name):
+		"""raises AttributeError (invalid chars), FileNotFound"""
+		block = self.stored_file_block(stored_name)
+		if block is None:
+			_fire(MsgCode.FILE_NOT_FOUND, 
+				  message="'%s' not found" % stored_name)
+			raise FileNotFound("No stored file with such name.")
+		if not is_good_srr(new_name):
+			raise AttributeError("Invalid characters used in the new name.")
+		_fire(MsgCode.RENAME_FILE, message="Renaming '%s'" % block.file_name)
+		self.renamed[block] = SrrStoredFileBlock(
+			file_name=new_name, file_size=block.file_size).block_bytes()
+
+	def apply(self):
+		has_volumes = any(b.rawtype == BlockType.SrrRarFile
+		                  for b in self.blocks)
+		same_size = all(len(header) == block.header_size
+		                for (block, header) in self.renamed.items())
+		if not self.removed and same_size and not (
+				self.added and has_volumes):
+			self._patch()
+		else:
+			self._rewrite()
+		self.removed = set()
+		self.renamed = {}
+		self.added = []
+
+	def _patch(self):
+		if not self.renamed and not self.added:
+			return
+		with open(self.srr_file, "r+b") as srr:
+			# the SRR file is left as it was when storing a file fails
+			srr.seek(0, os.SEEK_END)
+			size = srr.tell()
+			try:
+				for store in self.added:
+					store(srr)
+			except:
+				srr.truncate(size)
+				raise
+			for (block, header) in self.renamed.items():
+				srr.seek(block.block_position)
+				srr.write(header)
+
+	def _rewrite(self):
+		tmpfd, tmpname = mkstemp(prefix="srr_", suffix=".tmp", 
+								 dir=os.path.dirname(self.srr_file))
+		added = self.added
+		try:
+			with os.fdopen(tmpfd, "wb") as tmpfile:
+				with open(self.srr_file, "rb") as srr:
+					for (block, start, end) in _block_ranges(
+							self.blocks, self.srr_file):
+						if block.rawtype == BlockType.SrrRarFile:
+							for store in added:
+								store(tmpfile)
+							added = []
+						if block in self.removed:
+							_fire(MsgCode.DEL_STORED_FILE,
+								  message="'%s' deleted." % block.file_name)
+							continue
+						if block in self.renamed:
+							tmpfile.write(self.renamed[block])
+							start += block.header_size
+						srr.seek(start)
+						copy_stream(srr, tmpfile, end - start)
+				# music video SRR file: add to end
+				for store in added:
+					store(tmpfile)
+		except:
+			os.unlink(tmpname)
+			raise
+		# original srr file is replaced by the temp file
+		os.remove(self.srr_file)
+		os.rename(tmpname, self.srr_file)
 
 def validate_srr(srr_file):
 	"""Checks if the SRR file has the right format and verifies
@@ -410,6 +512,29 @@ def validate_srr(srr_file):
 	"""
 	raise NotImplementedError()
 
+def _block_ranges(blocks, file_name):
+	"""Yields (block, start offset, end offset) for the blocks read from
+	file_name. The range includes the data following the block header."""
+	ends = [b.block_position for b in blocks[1:]]
+	ends.append(os.path.getsize(file_name))
+	for (block, end) in zip(blocks, ends):
+		yield (block, block.block_position, end)
+
+def _copy_ranges(ranges, stream):
+	"""Copies the (file name, start offset, end offset) ranges to stream."""
+	source = None
+	try:
+		for (file_name, start, end) in ranges:
+			if source is None or source.name != file_name:
+				if source is not None:
+					source.close()
+				source = open(file_name, "rb")
+			source.seek(start)
+			copy_stream(source, stream, end - start)
+	finally:
+		if source is not None:
+			source.close()
+
 # TODO: test joining SRRs, although it works (exceptions)
 def merge_srrs(srr_files, output_file, application_name=None):
 	"""Merge the given iterable of srr_files together.
@@ -419,6 +544,8 @@ def merge_srrs(srr_files, output_file, application_name=None):
 	                  otherwise the first non empty name is used
 	
 	Order data of the result: application name, stored files, RAR meta-data
+	Only the block offsets are kept in memory: the blocks and their data
+	are copied from the input files.
 	
 	TODO: rarfixes that need to be merged somewhere in the middle
 	      2 sfvs that both have all the RAR files, but not individually
@@ -426,34 +553,133 @@ def merge_srrs(srr_files, output_file, application_name=None):
 	stored_files = []
 	other_blocks = []
 
-	# read in all data
+	# collect the byte ranges of all blocks
 	for srr_file in srr_files:
-		for block in RarReader(srr_file).read_all():
+		blocks = RarReader(srr_file).read_all()
+		for (block, start, end) in _block_ranges(blocks, srr_file):
 			if block.rawtype == BlockType.SrrHeader:
 				if not application_name or application_name == "":
 					application_name = block.appname
 			elif block.rawtype == BlockType.SrrStoredFile:
-				stored_files.append(block)
+				stored_files.append((srr_file, start, end))
 			else:
-				other_blocks.append(block)
+				other_blocks.append((srr_file, start, end))
 			
 	# write the gathered data in the correct order
 	with open(output_file, "wb") as new:
 		new.write(SrrHeaderBlock(appname=application_name).block_bytes())
 		
 		# all stored files in the beginning after the header
-		for sblock in stored_files:
-			new.write(sblock.block_bytes())
-			new.write(sblock.srr_data())
+		_copy_ranges(stored_files, new)
 		
 		# everything else in the same order as the original file
-		for block in other_blocks:
-			new.write(block.block_bytes())
-			#TODO: this is skipping data in some less common cases?
+		_copy_ranges(other_blocks, new)
+
+def _merge_job(job):
+	(srr_files, output_file) = job
+	try:
+		merge_srrs(srr_files, output_file)
+		return None
+	except Exception as err:
+		return err
+
+def merge_srrs_many(jobs, processes=None):
+	"""Runs many merge_srrs() jobs with a pool of worker processes.
+	jobs:      iterable of (srr_files, output_file) tuples
+	processes: amount of workers; the amount of CPUs by default
+	Yields (output_file, None or the raised exception) in the job order."""
+	jobs = [(list(srr_files), output) for (srr_files, output) in jobs]
+	pool = multiprocessing.Pool(processes)
+	try:
+		for (job, err) in zip(jobs, pool.imap(_merge_job, jobs)):
+			yield (job[1], err)
+	finally:
+		pool.terminate()
+		pool.join()
+
+def _rebuild_job(job):
+	(srr_file, in_folder, out_folder, name, index, options) = job
+	try:
+		reconstruct(srr_file, in_folder, out_folder, extract_files=False,
+		            volumes=[name], volume_index=index, **options)
+		return None
+	except Exception as err:
+		return err
+
+def rebuild_volumes(srr_file, in_folder, out_folder, names,
+                    volume_index=None, processes=None, **options):
+	"""Rebuilds some RAR volumes of srr_file with a pool of worker processes.
+	Every worker only reads the SRR blocks and the archived data of the
+	volume it rebuilds.
+	names:        the SrrRarFile names of the volumes, e.g. from
+	              VolumeIndex.matching() or damaged_volumes()
+	volume_index: rescene.volumes.VolumeIndex of srr_file
+	processes:    amount of workers; the amount of CPUs by default
+	options:      other keyword arguments of reconstruct()
+	Yields (name, None or the raised exception) in the order of names."""
+	if volume_index is None:
+		volume_index = VolumeIndex.from_blocks(
+			srr_file, RarReader(srr_file).read_all())
+	jobs = [(srr_file, in_folder, out_folder, name, volume_index, options)
+	        for name in names]
+	if len(jobs) < 2 or processes == 1:
+		for job in jobs:
+			yield (job[3], _rebuild_job(job))
+		return
+	pool = multiprocessing.Pool(processes)
+	try:
+		for (job, err) in zip(jobs, pool.imap(_rebuild_job, jobs)):
+			yield (job[3], err)
+	finally:
+		pool.terminate()
+		pool.join()
+
+def repair_volumes(srr_file, in_folder, out_folder, volume_index=None,
+                   processes=None, **options):
+	"""Rebuilds every volume in out_folder that is missing or that doesn't
+	match the CRC in the SFV files stored in srr_file. A damaged volume is
+	moved aside while it is rebuilt and put back when its rebuild fails,
+	so it can still be repaired with its recovery record.
+	Yields (name, None or the raised exception) like rebuild_volumes()."""
+	if volume_index is None:
+		volume_index = VolumeIndex.from_blocks(
+			srr_file, RarReader(srr_file).read_all())
+	extract_paths = options.get("extract_paths", True)
+	names = damaged_volumes(volume_index, out_folder, extract_paths, processes)
+	moved = {}  # name -> (volume path, private folder with the damaged one)
+	try:
+		for name in names:
+			path = volume_path(volume_index.volumes[name], out_folder,
+			                   extract_paths)
+			if os.path.isfile(path):
+				folder = mkdtemp(prefix="damaged-", dir=os.path.dirname(path))
+				os.rename(path, os.path.join(folder, os.path.basename(path)))
+				moved[name] = (path, folder)
+		for (name, err) in rebuild_volumes(srr_file, in_folder, out_folder,
+				names, volume_index, processes, **options):
+			if name in moved:
+				_restore_damaged(moved.pop(name), err is not None)
+			yield (name, err)
+	finally:
+		# the rebuilds that didn't happen
+		for aside in moved.values():
+			_restore_damaged(aside, True)
+
+def _restore_damaged(aside, failed):
+	"""Puts a damaged volume back when its rebuild failed, or deletes it."""
+	(path, folder) = aside
+	damaged = os.path.join(folder, os.path.basename(path))
+	if failed:
+		if os.path.isfile(path):
+			os.unlink(path)  # the partially rebuilt volume
+		os.rename(damaged, path)
+	else:
+		os.unlink(damaged)
+	os.rmdir(folder)
 
 def create_srr(srr_name, infiles, in_folder="",
                store_files=None, save_paths=False, compressed=False,
-               oso_hash=True, tmp_srr_name=None):
+               oso_hash=True, tmp_srr_name=None, store_sfvs=True):
 	"""
 	srr_name:    path and name of the SRR file to create
 	             (for checking existence)
@@ -469,6 +695,7 @@ def create_srr(srr_name, infiles, in_folder="",
 	             must be stored with the file name e.g. Sample/ or Proof/
 	compressed:  Do we create an SRR or not when encountered compressed files?
 	oso_hash:    Store OSO/ISDb hashes or not.
+	store_sfvs:  Store the SFV files of infiles or not.
 	
 	Returns True: success
 	Returns False: existing .srr file not overwritten
@@ -491,18 +718,23 @@ def create_srr(srr_name, infiles, in_folder="",
 		else:
 			raise
 	
+	stage = Stage("create_srr", srr_file=srr_name)
 	srr = open(tmp_srr_name, "wb")
 	srr.write(SrrHeaderBlock(appname=rescene.APPNAME).block_bytes())
+	executor = None
 	
 	try:
 		# STORE FILES
 		# We store copies of any files included in the store_files list 
 		# in the .srr using a "store block".
 		# Any SFV files used are also included.
-		store_files.extend([f for f in infiles if f[-4:].lower() == ".sfv"])
+		if store_sfvs:
+			store_files.extend(
+				[f for f in infiles if f[-4:].lower() == ".sfv"])
 		
 		if not len([_store(f, srr, save_paths, in_folder)
-					for f in _search(store_files, in_folder)]):
+					for f in _search(store_files, in_folder)]) and \
+				(store_files or store_sfvs):
 			_fire(MsgCode.NO_FILES, message="No files found to store.")
 		
 		# COLLECT ARCHIVES
@@ -516,8 +748,7 @@ def create_srr(srr_name, infiles, in_folder="",
 			else:
 				rarfiles.extend(_handle_rar(infile))
 	
-		oso_dict = odict()
-		# STORE ARCHIVE BLOCKS
+		volumes = []
 		for rarfile in rarfiles:
 			# take into account case sensitivity on Unix systems
 			(rfexact, rfcapitals) = capitalized_fn(rarfile)
@@ -528,7 +759,22 @@ def create_srr(srr_name, infiles, in_folder="",
 				srr.close()	  
 				os.unlink(tmp_srr_name)
 				raise FileNotFound(msg)
+			volumes.append((rarfile, rfexact, rfcapitals))
+		
+		# The headers of the next volumes are read at the same time
+		# and the OSO hashes are calculated while that is going on.
+		executor = _thread_pool(SCAN_THREADS)
+		if executor:
+			scanned = _read_ahead(executor, _read_blocks,
+			                      [v[1] for v in volumes], SCAN_THREADS)
+		else:
+			scanned = (_read_blocks(v[1]) for v in volumes)
+		oso_dict = odict()
+		oso_jobs = {}
+		segment_map = SegmentMap()  # file data offsets for the OSO hashes
 	
+		# STORE ARCHIVE BLOCKS
+		for ((rarfile, rfexact, rfcapitals), blocks) in zip(volumes, scanned):
 			fname = os.path.relpath(rfcapitals, in_folder) if save_paths  \
 				else os.path.basename(rfcapitals)
 			_fire(MsgCode.MSG, message="Processing file: %s" % fname)
@@ -538,8 +784,7 @@ def create_srr(srr_name, infiles, in_folder="",
 	#			rarblock.flags |= SrrRarFileBlock.PATHS_SAVED
 			srr.write(rarblock.block_bytes())
 			
-			rr = RarReader(rfexact)
-			for block in rr.read_all():
+			for block in blocks:
 				if block.rawtype == BlockType.RarPackedFile:
 					_fire(MsgCode.FBLOCK, message="RAR Packed File Block",
 						  compression_method=block.compression_method,
@@ -554,9 +799,9 @@ def create_srr(srr_name, infiles, in_folder="",
 							os.unlink(tmp_srr_name)
 							raise ValueError("Archive uses unsupported "
 							           "compression method: %s" % rarfile)
-					else:
+					elif block.os_file_name() not in oso_dict:
 						# store first RAR where we encounter the stored file
-						oso_dict.setdefault(block.os_file_name(), rarfile)
+						oso_dict[block.os_file_name()] = rarfile
 				elif _is_recovery(block):
 					_fire(MsgCode.RBLOCK, message="RAR Recovery Block",
 						  packed_size=block.packed_size,
@@ -567,25 +812,72 @@ def create_srr(srr_name, infiles, in_folder="",
 						  type=block.rawtype, size=block.header_size)
 				# store the raw data for any blocks found
 				srr.write(block.block_bytes())
+			stage.progress(os.path.getsize(rfexact), volume=fname)
+			
+			# hash the files that end in this volume while the next
+			# volumes are processed
+			if oso_hash:
+				for name in segment_map.add(rfexact, blocks):
+					if executor and _oso_hashable(name):
+						oso_jobs[name] = executor.submit(
+							osohash_segments, segment_map.files[name])
 				
 		# STORE OSO/ISDb HASHES
 		if oso_hash:
 			for (fname, rarname) in oso_dict.items():
-				# skip over the many files in PS3 and PS4 releases
-				ext = os.path.splitext(fname)[1].lower()
-				if ext not in FileType.VideoExtensions:
+				if not _oso_hashable(fname):
 					continue
 				try:
-					oso_hash, file_size = osohash_from(rarname, fname, True)
+					if fname in oso_jobs:
+						oso_hash, file_size = oso_jobs[fname].result()
+					elif fname in segment_map.files:
+						oso_hash, file_size = osohash_segments(
+							segment_map.files[fname])
+					else:
+						oso_hash, file_size = osohash_from(
+							rarname, fname, True)
 					block = SrrOsoHashBlock(file_size=file_size, 
 						file_name=os.path.basename(fname), oso_hash=oso_hash)
 					srr.write(block.block_bytes())	
 				except (ValueError, AttributeError):
 					pass # file is too small or compressed RARs
+		stage.finish()
 		return True
 	finally:
+		if executor:
+			executor.shutdown()
 		# when an IOError is raised, we close the file for further cleanup
 		srr.close()
+
+def _read_blocks(rar_file):
+	return RarReader(rar_file).read_all()
+
+def _read_ahead(executor, function, items, window):
+	"""Like executor.map, but keeps only window calls queued at a time.
+	Jobs submitted while the results are consumed, such as the OSO hashes,
+	run between the calls instead of after all of them."""
+	items = iter(items)
+	pending = collections.deque()
+	for item in itertools.islice(items, window):
+		pending.append(executor.submit(function, item))
+	while pending:
+		result = pending.popleft().result()
+		for item in itertools.islice(items, 1):
+			pending.append(executor.submit(function, item))
+		yield result
+
+def _oso_hashable(fname):
+	# skip over the many files in PS3 and PS4 releases
+	ext = os.path.splitext(fname)[1].lower()
+	return ext in FileType.VideoExtensions
+
+def _thread_pool(threads):
+	"""A ThreadPoolExecutor or None when it is not available."""
+	try:
+		from concurrent.futures import ThreadPoolExecutor
+	except ImportError:  # Python 2 without the futures backport
+		return None
+	return ThreadPoolExecutor(max_workers=threads)
 		
 def create_srr_single_volume(srr_name, infile, tmp_srr_name=None):
 	"""
@@ -953,7 +1245,7 @@ def _handle_rar(rfile, filelist=None, read_retries=7):
 		yield next_file
 		next_file = filename(next_archive(next_file, is_old_style_naming))
 		
-def info(srr_file):
+def info(srr_file, blocks=None):
 	"""Returns a dictionary with the following keys:
 	- appname:        the application name stored in the srr file
 	- stored_files:   a list of the files that are added to the srr file
@@ -964,7 +1256,10 @@ def info(srr_file):
 	- sfv_comments:   the comments that are available in the sfv files
 	- compression:    there are files inside the archive that use compression
 	Apart from appname, everything is represented by a FileInfo object.
+	blocks: the blocks of srr_file when they have been read before
 	"""
+	if blocks is None:
+		blocks = RarReader(srr_file).read_all()
 	stored_files = odict()   # files stored in the srr
 	rar_files = odict()      # rar, r00, ...
 	sfv_entries = []         # non repairable files from the SFV
@@ -976,7 +1271,7 @@ def info(srr_file):
 	compression = False     # RAR compression on some files
 	oso_hashes = []
 
-	for block in RarReader(srr_file).read_all():
+	for block in blocks:
 		add_size = True
 		if block.rawtype == BlockType.SrrHeader:
 			appname = block.appname
@@ -1129,15 +1424,16 @@ def info(srr_file):
 	        "compression": compression,
 	        "oso_hashes": oso_hashes}
 
-def content_hash(srr_file, algorithm='sha1'):
+def content_hash(srr_file, algorithm='sha1', blocks=None):
 	"""Returns a Sha1 hash for comparing SRR files.
 	
 	Has the same behavior as rescene.php: 
 	hash is based on the sorted RAR metadata.
 	Exact behavior?
 	 -> sort on lower case RAR names (no paths)
-	Can be used to detect doubles."""
-	rar_files = info(srr_file)["rar_files"]
+	Can be used to detect doubles.
+	blocks: the blocks of srr_file when they have been read before"""
+	rar_files = info(srr_file, blocks)["rar_files"]
 	m = hashlib.new(algorithm)
 	with open(srr_file, 'rb') as sfile:
 		# sort based on file name without path
@@ -1179,7 +1475,8 @@ class RarMtSettings(object):
 def reconstruct(srr_file, in_folder, out_folder, extract_paths=True, hints={},
 				skip_rar_crc=False, auto_locate_renamed=False, empty=False,
 				rar_executable_dir=None, tmp_dir=None, extract_files=True,
-				srr_part="", rar_mt=None):
+				srr_part="", rar_mt=None, journal=None, volume_index=None,
+				volumes=None):
 	"""
 	srr_file: SRR file of the archives that need to be rebuild
 	in_folder: root folder in which we start looking for the files
@@ -1195,6 +1492,12 @@ def reconstruct(srr_file, in_folder, out_folder, extract_paths=True, hints={},
 	extract_files: if set, extract additional files stored in the srr
 	srr_part: string with volume(s) to reconstruct
 	rar_mt: object with settings for the rar -mt parameter
+	journal: rescene.journal.Journal object to record the finished volumes
+	         in. Volumes a previous run has finished are not rebuilt again.
+	volume_index: rescene.volumes.VolumeIndex of srr_file. With srr_part,
+	         only the SRR blocks of the matching volumes are read then.
+	volumes: the exact names of the volumes to reconstruct instead of
+	         the ones srr_part matches
 	"""
 	rar_name = ""
 	ofile = ""
@@ -1209,11 +1512,18 @@ def reconstruct(srr_file, in_folder, out_folder, extract_paths=True, hints={},
 	
 	skip_volume = False # helps to reconstruct a single volume
 	skip_offset = 0
-	partial_reconstruction = srr_part != "" and srr_part is not None
+	if volumes is not None:
+		srr_part = None
+	partial_reconstruction = (srr_part != "" and srr_part is not None or
+	                          volumes is not None)
 	partial_set = False
+	resumed_crc = None  # running_crc at the end of a finished volume
+	next_offset = None  # of the source after the last rebuilt part of a set
+	whole_file = True  # running_crc covers the file from its start
 	
 	global temp_dir
 	temp_dir = tmp_dir
+	stage = Stage("reconstruct", srr_file=srr_file)
 	
 	if rar_executable_dir:
 		initialize_rar_repository(rar_executable_dir)
@@ -1226,7 +1536,21 @@ def reconstruct(srr_file, in_folder, out_folder, extract_paths=True, hints={},
 				"http://rescene.wikidot.com/tutorials#compressed")
 			return False
 	
-	blocks = RarReader(srr_file).read_all()
+	if (partial_reconstruction and volume_index is not None and
+		not volume_index.compressed):
+		# compressed files need the blocks of the other volumes too
+		if volumes is not None:
+			names = [name for name in volume_index.volumes if name in volumes]
+		else:
+			names = volume_index.matching(srr_part)
+		blocks = volume_index.read_blocks(names)
+	else:
+		blocks = RarReader(srr_file).read_all()
+	if partial_reconstruction and volume_index is None:
+		volume_index = VolumeIndex.from_blocks(srr_file, blocks)
+	volume_sources = iter(())  # Source of each packed file in the volume
+	sources = _SourceFiles(in_folder, hints, auto_locate_renamed)
+	sources.resolve(blocks)
 	for block in blocks:
 		_fire(MsgCode.BLOCK, message="RAR Block",
 			  type=block.rawtype, size=block.header_size)
@@ -1246,7 +1570,9 @@ def reconstruct(srr_file, in_folder, out_folder, extract_paths=True, hints={},
 			
 			skip_volume = False # always reset for new volume
 			# check whether to re-create the volume
-			if partial_reconstruction:
+			if volumes is not None:
+				skip_volume = block.file_name not in volumes
+			elif partial_reconstruction:
 				if not block.file_name.endswith(srr_part):
 					skip_volume = True
 				
@@ -1255,6 +1581,9 @@ def reconstruct(srr_file, in_folder, out_folder, extract_paths=True, hints={},
 				    block.file_name.startswith(srr_part[:-1])):
 					skip_volume = False
 					partial_set = True
+			if partial_reconstruction:
+				volume_sources = iter(
+					volume_index.volumes[block.file_name].sources)
 
 			# We need to create a RAR file for each SRR block.
 			# Get the stored name and create it.
@@ -1263,17 +1592,31 @@ def reconstruct(srr_file, in_folder, out_folder, extract_paths=True, hints={},
 				# records removed.  All other flags are currently undefined.
 				rebuild_recovery = (block.flags &
 							SrrRarFileBlock.RECOVERY_BLOCKS_REMOVED) != 0
-				rar_name = block.file_name
-				try:
+				if rarfs and not rarfs.closed:
+					stage.progress(rarfs.tell(), volume=rarfs.name)
 					rarfs.close()
-				except: pass
+					_journal_volume(journal, rar_name, rarfs, running_crc)
+				rar_name = block.file_name
 				ofile = _opath(block, extract_paths, out_folder)
-				if can_overwrite(ofile):
+				finished = journal and journal.verified("volumes", rar_name,
+				                                        ofile)
+				if finished:
+					_fire(MsgCode.MSG, message="Already reconstructed: %s" %
+						os.path.basename(ofile))
+					# continue with the next volume like -m does
+					skip_volume = True
+					resumed_crc = finished["running_crc"]
+				elif ((journal and
+				       journal.get("volumes", rar_name) is not None) or
+				      can_overwrite(ofile)):
+					# a volume an interrupted run didn't finish is rebuilt
 					_fire(MsgCode.MSG, message="Re-creating RAR file: %s" % 
 						os.path.basename(ofile))
 					if not os.path.isdir(os.path.dirname(ofile)):
 						os.makedirs(os.path.dirname(ofile))
-					rarfs = open(ofile, "w+b")
+					rarfs = _CrcWriter(open(ofile, "w+b"))
+					if journal:
+						journal.record("volumes", rar_name, {})
 				else:
 					_fire(MsgCode.USER_ABORTED,
 						message="Operation aborted. Archive already exists.")
@@ -1296,6 +1639,7 @@ def reconstruct(srr_file, in_folder, out_folder, extract_paths=True, hints={},
 				
 				source_name = block.file_name
 				running_crc = 0
+				next_offset = None
 				continue
 
 			# This is the main RAR block and treat it differently.
@@ -1310,10 +1654,22 @@ def reconstruct(srr_file, in_folder, out_folder, extract_paths=True, hints={},
 #			if block.packed_size > 0:
 			# Make sure we have the correct extracted file open. 
 			# If not, attempt to locate and open it.
+			continued = resumed_crc is not None
+			if continued and source_name != block.file_name:
+				# the file was finished in the last skipped volume
+				skip_offset = 0
+				resumed_crc = 0
+			source_offset = None
+			if partial_reconstruction:
+				source_offset = next(volume_sources).offset
+			# the volumes of a set continue with the data of the previous
+			# volume, unless the set starts in the middle of the file
+			chained = (partial_set and source_name == block.file_name and
+			           source_offset == next_offset)
 			if (source_name != block.file_name
-				or (partial_reconstruction and not partial_set)
-				or (partial_set and source_name != block.file_name)):
-				try: srcfs.close()
+				or (partial_reconstruction and not chained)
+				or continued):
+				try: sources.release(srcfs)
 				except: pass
 				source_name = block.file_name
 				running_crc = 0
@@ -1322,8 +1678,7 @@ def reconstruct(srr_file, in_folder, out_folder, extract_paths=True, hints={},
 					if block.flags & block.DIRECTORY == block.DIRECTORY:
 						srcfs = FakeFile(block.unpacked_size)
 					else:
-						src = _locate_file(block, in_folder,
-										   hints, auto_locate_renamed)
+						src = sources.locate(block)
 						if block.compression_method != COMPR_STORING:
 							_fire(MsgCode.MSG,
 								message="Trying to rebuild compressed file %s."
@@ -1332,7 +1687,7 @@ def reconstruct(srr_file, in_folder, out_folder, extract_paths=True, hints={},
 										in_folder, hints, auto_locate_renamed)
 							compressed_block_encountered = srcfs
 						else:  # uncompressed file
-							srcfs = open(src, "rb")
+							srcfs = sources.open(src)
 							if compressed_block_encountered:
 								global archived_files
 								archived_files.setdefault(block.file_name,
@@ -1348,12 +1703,23 @@ def reconstruct(srr_file, in_folder, out_folder, extract_paths=True, hints={},
 			assert srcfs
 			
 			# make sure the offset is correct
-			if partial_reconstruction and not partial_set:
+			if not partial_reconstruction:
+				whole_file = True
+			elif not chained:
+				srcfs.seek(source_offset)
+				whole_file = source_offset == 0
+				next_offset = source_offset
+			if continued:
 				srcfs.seek(skip_offset)
+				running_crc = resumed_crc
+				resumed_crc = None
+				whole_file = True
 			
 			# then grab the correct amount of data from the extracted file
 			running_crc = _repack(block, rarfs, in_folder, srcfs, running_crc, 
-			                      skip_rar_crc)
+			                      skip_rar_crc, whole_file)
+			if partial_reconstruction:
+				next_offset = source_offset + block.packed_size
 		elif (BlockType.RarMin <= block.rawtype <= BlockType.RarMax or 
 			(block.rawtype == 0x00 and block.header_size == 20)): #TODO: test
 			if not skip_volume:
@@ -1378,11 +1744,42 @@ def reconstruct(srr_file, in_folder, out_folder, extract_paths=True, hints={},
 				  "This block will be skipped." % 
 				  (block.rawtype, block.header_size))
 	if rarfs:
-		rarfs.close()
-	if srcfs:
-		srcfs.close()
+		if not rarfs.closed:
+			stage.progress(rarfs.tell(), volume=rarfs.name)
+			rarfs.close()
+			_journal_volume(journal, rar_name, rarfs, running_crc)
+	sources.release(srcfs)
+	sources.close()
 		
 	temp_folder_cleanup()
+	if journal:
+		journal.remove()
+	stage.finish()
+
+class _CrcWriter(object):
+	"""Wraps a volume that is being reconstructed and keeps the CRC32 of
+	the bytes written to it. All writes append to the end of the volume."""
+	def __init__(self, stream):
+		self.stream = stream
+		self.crc = 0
+		self.size = 0
+
+	def write(self, data):
+		self.crc = zlib.crc32(data, self.crc)
+		self.size += len(data)
+		return self.stream.write(data)
+
+	def __getattr__(self, name):
+		return getattr(self.stream, name)
+
+def _journal_volume(journal, rar_name, rarfs, running_crc):
+	"""Records a finished volume with the state needed to continue
+	with the next one. rarfs is the _CrcWriter of the volume."""
+	if journal:
+		journal.record("volumes", rar_name, {
+			"size": rarfs.size,
+			"crc": rarfs.crc & 0xFFFFFFFF,
+			"running_crc": running_crc})
 
 def _write_recovery_record(block, rarfs):
 	"""block: original rar recovery block from SRR
@@ -1405,47 +1802,26 @@ def _write_recovery_record(block, rarfs):
 		  recovery_sectors=block.recovery_sectors,
 		  protected_sectors=block.data_sectors)
 
-	rs_slice = 0
-	current_sector = 0	
-	crc = [0] * (protected_sectors * 2)
-	rs = [0] * recovery_sectors # [0, 0, ..., 0]
+	stage = Stage("recovery_record", volume=getattr(rarfs, "name", None),
+	              recovery_sectors=recovery_sectors)
+	rr = RecoveryRecord(recovery_sectors)
 
 	rarfs.seek(0, os.SEEK_END) # move relative to end of file
 	rar_length = rarfs.tell()
 	assert rar_length != 0 # you can't calculate stuff on nothing
 	rarfs.seek(0)
-	
-	count = 0
-	while count < rar_length:
-		count += 512
-		
-		# Read data one sector at a time.  Pad the last sector with 0's.
-		sector = rarfs.read(512)
-		if len(sector) != 512:
-			# Before Python 3, crc32() does not accept a
-			# bytearray(), and bytes(int) does not make a string
-			# of zeros
-			sector += bytes(bytearray(512 - len(sector)))
-		# assert len(sector) == 512
-
-		# calculate the crc32 for the sector and store the 2 low-order bytes
-		sector_crc = ~zlib.crc32(sector) & 0xffff # Bitwise Inversion
-		crc[current_sector*2] = sector_crc & 0xff
-		crc[current_sector*2+1] = sector_crc >> 8
-		current_sector += 1
-
-		# update the recovery sector parity data for this slice
-		rs[rs_slice] ^= int_from_bytes_big(sector)
-		rs_slice = rs_slice + 1 if (rs_slice + 1) % recovery_sectors else 0
+	rr.read_from(rarfs, rar_length)
 	# https://lists.ubuntu.com/archives/bazaar/2007q1/023524.html
 	rarfs.seek(0, 2) # prevent IOError: [Errno 0] Error on Windows
 	
 	rarfs.write(block.block_bytes())  # write the backed-up block header,
-	rarfs.write(bytearray(crc))	      # CRC data and
-	for sector in rs:                 # recovery sectors
-		rarfs.write(int_to_bytes_big(sector, 512))
+	rarfs.write(rr.crcs().ljust(protected_sectors * 2, b"\0"))  # CRC data
+	for sector in rr.parity():        # and recovery sectors
+		rarfs.write(sector)
+	stage.add(rar_length)
+	stage.finish()
 
-def _locate_file(block, in_folder, hints, auto_locate_renamed):
+def _locate_file(block, in_folder, hints, auto_locate_renamed, tree=None):
 	"""
 	block:	 RarPackedFile that contains info of the file to look for
 	in_folder: root folder in which we start looking for the file
@@ -1454,6 +1830,7 @@ def _locate_file(block, in_folder, hints, auto_locate_renamed):
 			   used for handling renamed files
 	auto_locate_renamed: if set, start looking in sub folders and guess based
 			   on file size and extension
+	tree:	 _SourceTree of in_folder to reuse for auto_locate_renamed
 	"""
 	# if file has been renamed, use renamed file name
 	src = hints.get(block.file_name)
@@ -1464,7 +1841,7 @@ def _locate_file(block, in_folder, hints, auto_locate_renamed):
 	if not os.path.isfile(src):
 		if auto_locate_renamed:
 			src = _auto_locate_renamed(block.os_file_name(),
-				block.unpacked_size, in_folder) or src
+				block.unpacked_size, in_folder, tree) or src
 		if not os.path.isfile(src):
 			raise FileNotFound("The file does not exist: %s." % src)
 		
@@ -1485,53 +1862,143 @@ def _locate_file(block, in_folder, hints, auto_locate_renamed):
 		                                file_size_candidate))
 	return src
 	
-def _auto_locate_renamed(name, size, in_folder):
+def _auto_locate_renamed(name, size, in_folder, tree=None):
 	"""Tries to find the right file by searching in_folder based on the
 	file extension and the file size. 
+	tree: _SourceTree of in_folder. Without it, in_folder is walked again.
 	Returns empty string when nothing found."""
 	# message to user because this could potentially take a while
 	_fire(MsgCode.AUTO_LOCATE, message="Auto locate '%s'" % name)
 	
-	for root, _dirnames, filenames in os.walk(in_folder):
-		for fn in fnmatch.filter(filenames, "*" + os.path.splitext(name)[1]):
-			f = os.path.join(root, fn)
-			if os.path.getsize(f) == size:
-				_fire(MsgCode.MSG, message="Trying 'renamed' file: %s" % f)
+	if tree is None:
+		tree = _SourceTree(in_folder)
+	f = tree.find(os.path.splitext(name)[1], size)
+	if f:
+		_fire(MsgCode.MSG, message="Trying 'renamed' file: %s" % f)
+	return f
+
+class _SourceTree(object):
+	"""Index of the sizes of all files below in_folder.
+	The folder is walked only once, on the first find()."""
+	def __init__(self, in_folder):
+		self.in_folder = in_folder
+		self._sizes = None  # size -> paths in os.walk() order
+
+	def _walk(self):
+		self._sizes = {}
+		for root, _dirnames, filenames in os.walk(self.in_folder):
+			for fn in filenames:
+				f = os.path.join(root, fn)
+				try:
+					size = os.path.getsize(f)
+				except OSError:
+					continue  # broken link
+				self._sizes.setdefault(size, []).append(f)
+
+	def find(self, extension, size):
+		"""The first file with the extension and the size or ''."""
+		if self._sizes is None:
+			self._walk()
+		pattern = "*" + extension
+		for f in self._sizes.get(size, ()):
+			if fnmatch.fnmatch(os.path.basename(f), pattern):
 				return f
-	return ""
+		return ""
+
+class _SourceFiles(object):
+	"""Locates and opens the extracted files reconstruct() packs.
+	Every file is located once and the tree is walked at most once to
+	auto locate renamed files. The last max_open stored files stay open
+	to continue with them in later volumes or partial reconstructions."""
+	def __init__(self, in_folder, hints, auto_locate_renamed, max_open=8):
+		self.in_folder = in_folder
+		self.hints = hints
+		self.auto_locate_renamed = auto_locate_renamed
+		self.max_open = max_open
+		self.tree = _SourceTree(in_folder)
+		self._located = {}  # file name -> path or raised exception
+		self._handles = odict()  # path -> open file, least recent first
+
+	def resolve(self, blocks):
+		"""Locates all archived files up front. Errors are kept until
+		the file is actually needed."""
+		for block in blocks:
+			if (block.rawtype == BlockType.RarPackedFile and
+				not block.flags & block.DIRECTORY == block.DIRECTORY):
+				try:
+					self.locate(block)
+				except (FileNotFound, InvalidFileSize):
+					pass
+
+	def locate(self, block):
+		"""Same as _locate_file(), but only done once per file."""
+		try:
+			src = self._located[block.file_name]
+		except KeyError:
+			try:
+				src = _locate_file(block, self.in_folder, self.hints,
+				                   self.auto_locate_renamed, self.tree)
+			except (FileNotFound, InvalidFileSize) as error:
+				src = error
+			self._located[block.file_name] = src
+		if isinstance(src, Exception):
+			raise src
+		return src
+
+	def open(self, src):
+		"""Open file handle positioned at the start of src."""
+		handle = self._handles.pop(src, None)
+		if handle is None:
+			handle = open_sequential(src)
+		else:
+			handle.seek(0)
+		self._handles[src] = handle
+		while len(self._handles) > self.max_open:
+			self._handles.popitem(last=False)[1].close()
+		return handle
+
+	def release(self, srcfs):
+		"""Closes srcfs unless it is kept open for later use."""
+		if srcfs is not None and srcfs not in self._handles.values():
+			srcfs.close()
+
+	def close(self):
+		for handle in self._handles.values():
+			handle.close()
+		self._handles.clear()
 		
-def _repack(block, rarfs, in_folder, srcfs, running_crc, skip_rar_crc):
+def _repack(block, rarfs, in_folder, srcfs, running_crc, skip_rar_crc,
+            whole_file=True):
 	"""
 	Adds a file to the RAR archive.
 	running_crc: CRC of the bytes used in packaging the file
 	skip_rar_crc: whether to display CRC warnings
+	whole_file: running_crc includes the start of the file, so the CRC of
+	            the whole file can be checked at its end
 	"""
-	bytes_copied_inc = 0
-	file_crc = 0  # CRC of the file inside a single RAR volume
-
-	while bytes_copied_inc < block.packed_size:
-		# grab the correct amount of data from the extracted file
-		bytes_to_copy = block.packed_size - bytes_copied_inc
-		if bytes_to_copy > 0x10000: # 64 KiB
-			bytes_to_copy = 0x10000
-		copy_buffer = srcfs.read(bytes_to_copy)
-		rarfs.write(copy_buffer)
-		bytes_read = len(copy_buffer)
-		
-		if not skip_rar_crc: # because it slows the process down
-			running_crc = zlib.crc32(copy_buffer, running_crc)
-			file_crc = zlib.crc32(copy_buffer, file_crc)
-
-		if bytes_read != bytes_to_copy:
-			# If the file didn't have as many bytes as we needed, this file 
-			# record was padded. Add null bytes to correct the length.
-			# bytes are not used in CRC check - See ReScene .NET 1.2
-			rarfs.write(bytearray(bytes_to_copy - bytes_read))
-			print("Crappy release group. Adding %d zero bytes." % 
-			      (bytes_to_copy - bytes_read))
-			
-		bytes_copied_inc += bytes_to_copy
-	
+	stage = Stage("repack", file_name=block.file_name, volume=rarfs.name)
+	# CRC of the bytes used in packaging the file and
+	# CRC of the file inside a single RAR volume
+	crcs = [running_crc, 0]
+	def update_crcs(data):
+		crcs[0] = zlib.crc32(data, crcs[0])
+		crcs[1] = zlib.crc32(data, crcs[1])
+
+	# read ahead from the extracted file while writing and checking
+	bytes_read = pipelined_copy(srcfs, rarfs, block.packed_size,
+	                            None if skip_rar_crc else update_crcs)
+	(running_crc, file_crc) = crcs
+
+	if bytes_read != block.packed_size:
+		# If the file didn't have as many bytes as we needed, this file 
+		# record was padded. Add null bytes to correct the length.
+		# bytes are not used in CRC check - See ReScene .NET 1.2
+		padding = block.packed_size - bytes_read
+		print("Crappy release group. Adding %d zero bytes." % padding)
+		while padding > 0:
+			rarfs.write(bytearray(min(padding, COPY_BUFFER)))
+			padding -= COPY_BUFFER
+
 	if not skip_rar_crc:
 		def file_end():
 			return block.flags & RarPackedFileBlock.SPLIT_AFTER == 0
@@ -1544,13 +2011,16 @@ def _repack(block, rarfs, in_folder, srcfs, running_crc, skip_rar_crc):
 			_fire(MsgCode.CRC, message=msg)
 			print("%08x %08x" % (block.file_crc, file_crc & 0xffffffff), 
 				  rarfs.name)
-		elif file_end() and running_crc_fail() and not block.is_compressed():
+		elif (file_end() and whole_file and running_crc_fail() and
+		      not block.is_compressed()):
 			# running_crc is on compressed data, so not applicable there
 			msg = "CRC mismatch in file: %s" % block.file_name
 			_fire(MsgCode.CRC, message=msg)
 			print("%08x %08x" % (block.file_crc, running_crc & 0xffffffff), 
 				  block.file_name, rarfs.name)
 			
+	stage.add(block.packed_size)
+	stage.finish()
 	return running_crc
 
 def _flag_check_srr(block):
@@ -1591,21 +2061,27 @@ def _store(sfile, stream, save_paths, in_folder):
 #		block.flags |= SrrStoredFileBlock.PATHS_SAVED
 	with open(sfile, "rb") as fdata:
 		stream.write(block.block_bytes())
-		stream.write(fdata.read())
+		if copy_stream(fdata, stream, block.file_size) != block.file_size:
+			raise IOError("Size of %s is not %d bytes." %
+			              (sfile, block.file_size))
 		
 def _store_fh(open_file, stream):
 	"""Adds 'file' to the file stream by creating a SrrStoredFileBlock."""
 	_fire(MsgCode.STORING, message="Storing file: %s" % open_file.name)
+	start = stream.tell()
 	try:
 		open_file.seek(0) # has been read before for SFV parsing
-		data = open_file.read()
 		block = SrrStoredFileBlock(file_name=open_file.name, 
 								   file_size=open_file.file_size())
 		stream.write(block.block_bytes())
-		stream.write(data)
+		if copy_stream(open_file, stream) != block.file_size:
+			raise IOError("Size of %s is not %d bytes." %
+			              (open_file.name, block.file_size))
 	except Exception as ex:
 		# reading data fails, so just skip the file
 		print(ex)
+		stream.seek(start)
+		stream.truncate()
 
 def _search(files, folder=""):
 	"""Enumerates all files to store. Yields a generator.
@@ -24,8 +24,11 @@
 # THE SOFTWARE.
 
 import struct
+from rescene import rar
 from rescene.rarstream import RarStream
 
+HASH_CHUNK_SIZE = 64 * 1024
+
 def compute_hash(mfile):
 	"""
 	Calculates the ISDb hash.
@@ -57,6 +60,97 @@ def osohash_from(rar_archive, enclosed_file=None, middle=False):
 	# TODO: return dict with srr_hash for each file in the archive
 	# or list with tuples (path, filename, srr_hash)
 
+class SegmentMap(object):
+	"""Where the data of the stored files is in the volumes of RAR sets.
+	It is built from the blocks that are already parsed, so no volume is
+	read again to calculate the OSO hashes of the files.
+
+	files: os_file_name -> list of (volume, offset, size) segments
+	       for every file of which the last segment has been added"""
+	def __init__(self):
+		self.files = {}
+		self._split = {}  # os_file_name -> segments of unfinished files
+
+	def add(self, volume, blocks):
+		"""Adds the RarPackedFile blocks of a volume.
+		Returns the names of the files that end in this volume."""
+		finished = []
+		for block in blocks:
+			if (block.rawtype != rar.BlockType.RarPackedFile or
+				block.compression_method != rar.COMPR_STORING):
+				continue
+			name = block.os_file_name()
+			if block.flags & block.SPLIT_BEFORE:
+				segments = self._split.pop(name, None)
+				if segments is None:
+					continue  # the start of the file is missing
+			else:
+				segments = []
+			segments.append((volume,
+				block.block_position + block.header_size, block.packed_size))
+			if block.flags & block.SPLIT_AFTER:
+				self._split[name] = segments
+			elif name not in self.files:
+				# the first occurrence like RarStream would find
+				self.files[name] = segments
+				finished.append(name)
+		return finished
+
+def osohash_segments(segments):
+	"""Same as osohash_from(), but for a file of which the segments are
+	known. Only the first and the last 64 KiB are read."""
+	filesize = sum(size for (_volume, _offset, size) in segments)
+	if filesize < HASH_CHUNK_SIZE:
+		raise ValueError("The file is smaller than 64 KiB.")
+	return _checksum(filesize,
+		_read_segments(segments, 0, HASH_CHUNK_SIZE),
+		_read_segments(segments, filesize - HASH_CHUNK_SIZE, HASH_CHUNK_SIZE))
+
+def osohashes_from(volumes, names=None, executor=None):
+	"""Calculates the OSO hashes of many files at once.
+	volumes:  (volume, blocks) tuples in the order of the RAR set(s)
+	          with the blocks as returned by RarReader.read_all()
+	names:    function to select the os_file_names to hash; default all
+	executor: concurrent.futures executor to read the files concurrently
+	Returns a dictionary os_file_name -> (oso_hash, file_size).
+	Files smaller than 64 KiB are left out."""
+	segment_map = SegmentMap()
+	for (volume, blocks) in volumes:
+		segment_map.add(volume, blocks)
+	files = [name for name in segment_map.files
+	         if names is None or names(name)]
+	segments = [segment_map.files[name] for name in files]
+	if executor:
+		results = executor.map(_try_osohash_segments, segments)
+	else:
+		results = map(_try_osohash_segments, segments)
+	return dict((name, result) for (name, result) in zip(files, results)
+	            if result is not None)
+
+def _try_osohash_segments(segments):
+	try:
+		return osohash_segments(segments)
+	except ValueError:
+		return None
+
+def _read_segments(segments, start, amount):
+	"""Reads amount bytes from position start of the segmented file."""
+	data = []
+	position = 0
+	for (volume, offset, size) in segments:
+		if amount <= 0:
+			break
+		if start < position + size:
+			skip = max(0, start - position)
+			length = min(size - skip, amount)
+			with open(volume, "rb") as stream:
+				stream.seek(offset + skip)
+				data.append(stream.read(length))
+			amount -= length
+			start += length
+		position += size
+	return b"".join(data)
+
 def _length(stream):
 	"""Returns the size of the given file stream."""
 	original_offset = stream.tell()
@@ -81,8 +175,7 @@ def _osorg_hash(stream):
 	On opensubtitles.org is movie file size limited to 
 		9000000000 > $moviebytesize > 131072 bytes, (1024*64*2)
 	if is there any reason to change these sizes, let us know. """
-	HASH_CHUNK_SIZE = 64 * 1024
-	srr_hash = filesize = _length(stream)
+	filesize = _length(stream)
 
 	# TODO: make it work for smaller sizes too
 	if filesize < HASH_CHUNK_SIZE:
@@ -91,6 +184,10 @@ def _osorg_hash(stream):
 	buffer_begin = stream.read(HASH_CHUNK_SIZE)
 	stream.seek(-HASH_CHUNK_SIZE, 2)
 	buffer_end = stream.read(HASH_CHUNK_SIZE)
+	return _checksum(filesize, buffer_begin, buffer_end)
+
+def _checksum(filesize, buffer_begin, buffer_end):
+	srr_hash = filesize
 	bytesize = struct.calcsize("Q")  # unsigned long long
 	for index in range(0, HASH_CHUNK_SIZE, bytesize):
 		srr_hash += struct.unpack_from("<Q", buffer_begin, index)[0]
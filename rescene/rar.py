@@ -81,6 +81,43 @@ ZERO = b"\0"
 # default fallback charset
 DEFAULT_CHARSET = "windows-1252"
 
+# struct formats used for every block
+S_BASE_HEADER = struct.Struct("<HBHH")
+S_ADD_SIZE = struct.Struct("<I")
+S_FILE_HEADER = struct.Struct("<IIBIIBBHI")
+S_NAME_LENGTH = struct.Struct("<H")
+
+class _LazyField(object):
+	"""A block attribute that is decoded from the header bytes on first
+	access. decode(block) decodes the value into the slot, together with
+	the other fields of the group stored next to it. Assigning a value
+	skips decoding: the decoder doesn't overwrite assigned fields."""
+	def __init__(self, slot, decode, group=()):
+		self.slot = slot
+		self.decode = decode
+		self.group = group or (slot,)
+
+	def __get__(self, block, owner=None):
+		if block is None:
+			return self
+		try:
+			return getattr(block, self.slot)
+		except AttributeError:
+			assigned = [(slot, getattr(block, slot)) for slot in self.group
+			            if hasattr(block, slot)]
+			self.decode(block)
+			for (slot, value) in assigned:
+				setattr(block, slot, value)
+			return getattr(block, self.slot)
+
+	def __set__(self, block, value):
+		setattr(block, self.slot, value)
+
+def _lazy(decode, *slots):
+	"""One _LazyField for each slot, all decoded with the same function."""
+	fields = tuple(_LazyField(slot, decode, slots) for slot in slots)
+	return fields if len(fields) > 1 else fields[0]
+
 def _parse_dos_time(stamp):
 	sec = stamp & 0x1F; stamp = stamp >> 5
 	mnt = stamp & 0x3F; stamp = stamp >> 6
@@ -96,7 +133,7 @@ def _parse_ext_time(block, pos):
 	# flags and rest of data can be missing
 	flags = 0
 	if pos + 2 <= len(data):
-		flags = struct.Struct('<H').unpack_from(data, pos)[0] # short
+		flags = S_NAME_LENGTH.unpack_from(data, pos)[0] # short
 		pos += 2
 
 	block.mtime, pos = _parse_xtime(flags >> 3*4, data, pos, 
@@ -344,6 +381,10 @@ class RarBlock(object):
 	SKIP_IF_UNKNOWN = 0x4000
 	
 	SUPPORTED_FLAG_MASK = (LONG_BLOCK | SKIP_IF_UNKNOWN)
+
+	# SRR files of big releases have thousands of blocks: no __dict__
+	__slots__ = ("_rawdata", "_p", "block_position", "fname",
+	             "crc", "rawtype", "flags", "header_size", "add_size")
 	
 	def __init__(self, block_bytes, file_position, fname):
 		"""Interprets the first 7 bytes of the header.
@@ -360,12 +401,12 @@ class RarBlock(object):
 		self.fname = fname
 		
 		(self.crc, self.rawtype, self.flags, self.header_size) =  \
-						struct.unpack_from("<HBHH", self._rawdata)
+						S_BASE_HEADER.unpack_from(self._rawdata)
 		self._p = HEADER_LENGTH # pointer to ease reading
 		
 		# Outcast BiA releases don't set this flag for BlockType.RarPackedFile 
 		if self.flags & RarBlock.LONG_BLOCK:
-			self.add_size = struct.unpack_from("<I", self._rawdata, 7)[0]
+			self.add_size = S_ADD_SIZE.unpack_from(self._rawdata, 7)[0]
 		else:
 			self.add_size = 0
 			
@@ -436,15 +477,20 @@ class _SrrFileNameBlock(RarBlock):
 	separator, but apparently the Net version also recognizes the
 	backward slash (\\), and there is a test case for this. File paths in
 	RAR files use backward slashes."""
+	__slots__ = ("_file_name",)
+
+	# offset of the name length field in the header
+	NAME_OFFSET = HEADER_LENGTH
 	
 	def _unpack_file_name(self):
 		'''Read in "self.file_name"'''
 		
 		# 2 bytes for name length, then the name (unsigned short)
-		length = struct.unpack_from("<H", self._rawdata, self._p)[0]
-		self.file_name = self._rawdata[self._p+2:self._p+2+length]
-		self.file_name = self.file_name.decode("utf-8")
-		self._p += 2 + length
+		pos = self.NAME_OFFSET
+		length = S_NAME_LENGTH.unpack_from(self._rawdata, pos)[0]
+		self._file_name = self._rawdata[pos+2:pos+2+length].decode("utf-8")
+
+	file_name = _lazy(_unpack_file_name, "_file_name")
 	
 	def _pack_file_name(self, file_name):
 		"""Set attribute and return byte string ready for writing
@@ -506,6 +552,7 @@ class SrrHeaderBlock(RarBlock):
 	"""
 	SRR_APP_NAME_PRESENT = 0x1
 	SUPPORTED_FLAG_MASK = SRR_APP_NAME_PRESENT
+	__slots__ = ("appname",)
 	
 	def __init__(self, bbytes=None, filepos=None, fname=None, appname=None):
 		if not appname and appname != "": # read block
@@ -590,6 +637,8 @@ class SrrStoredFileBlock(_SrrFileNameBlock):
 #	PATH_ONLY = 0x4 -> empty file and name ends on /?
 	
 	SUPPORTED_FLAG_MASK = RarBlock.LONG_BLOCK # | PATHS_SAVED
+	NAME_OFFSET = HEADER_LENGTH + 4
+	__slots__ = ("file_size",)
 
 	def __init__(self, bbytes=None, filepos=None, fname=None,
 	             file_name=None, file_size=None):
@@ -602,10 +651,8 @@ class SrrStoredFileBlock(_SrrFileNameBlock):
 			super(SrrStoredFileBlock, self).__init__(bbytes, filepos, fname)
 			
 			# 4 bytes for file length (unsigned int) (add_size field)
-			(self.file_size,) = struct.unpack_from("<I",
-			                           self._rawdata, self._p)
-			self._p += 4
-			self._unpack_file_name()
+			# followed by the file name
+			(self.file_size,) = S_ADD_SIZE.unpack_from(self._rawdata, self._p)
 		
 		# creating a srr file block
 #		elif (file_name != None and
@@ -657,6 +704,12 @@ class SrrStoredFileBlock(_SrrFileNameBlock):
 			data = f.read(self.file_size)
 		return data
 
+	def copy_srr_data(self, stream):
+		""" Writes the stored file to stream a chunk at a time. """
+		with open(self.fname, "rb") as f:
+			f.seek(self.block_position + self.header_size)
+			utility.copy_stream(f, stream, self.file_size)
+
 	def renameto(self, new_name): #XXX: not a method on this level?
 		""" Only works for real files. """
 		if not utility.is_good_srr(new_name):
@@ -670,10 +723,11 @@ class SrrStoredFileBlock(_SrrFileNameBlock):
 		tmpfile = os.fdopen(tmpfd, "wb")
 		
 		with open(self.fname, "rb") as f:
-			tmpfile.write(f.read(self.block_position)) # previous block data
+			# previous block data
+			utility.copy_stream(f, tmpfile, self.block_position)
 			tmpfile.write(self.block_bytes()) # new block header
 			f.seek(old_file_offset) # go to beginning stored file
-			tmpfile.write(f.read()) # read all data until EOF
+			utility.copy_stream(f, tmpfile) # all data until EOF
 			
 		tmpfile.close() 
 		os.remove(self.fname)
@@ -718,12 +772,12 @@ class SrrRarFileBlock(_SrrFileNameBlock):
 	PATHS_SAVED = 0x2
 	SUPPORTED_FLAG_MASK = (RECOVERY_BLOCKS_REMOVED | PATHS_SAVED |
 						   RarBlock.LONG_BLOCK)
+	__slots__ = ()
 	
 	def __init__(self, bbytes=None, filepos=None, fname=None, file_name=None):
 		if not file_name:
+			# only a file name follows the basic header
 			super(SrrRarFileBlock, self).__init__(bbytes, filepos, fname)
-			
-			self._unpack_file_name()
 		else:
 			self.crc = 0x7171
 			self.rawtype = 0x71
@@ -771,6 +825,8 @@ class SrrOsoHashBlock(_SrrFileNameBlock):
 	    0xFFFF - 7 - 8 - 8 - 2 = 65510 (0xFFE6)
 	File name: must match a stored file name"""
 	SUPPORTED_FLAG_MASK = 0
+	NAME_OFFSET = HEADER_LENGTH + 16
+	__slots__ = ("file_size", "_oso_hash")
 	
 	def __init__(self, bbytes=None, filepos=None, fname=None,
 				file_size=None, file_name=None, oso_hash=None):
@@ -778,15 +834,9 @@ class SrrOsoHashBlock(_SrrFileNameBlock):
 			super(SrrOsoHashBlock, self).__init__(bbytes, filepos, fname)
 			
 			# 8 bytes for the file size
+			# 8 bytes for the OSO hash, then the file name
 			self.file_size = struct.unpack_from("<Q", 
 				self._rawdata, self._p)[0]
-			
-			# 8 bytes for the OSO hash
-			self.oso_hash = "%016x" % struct.unpack_from("<Q", 
-				self._rawdata, self._p+8)[0]
-			
-			self._p += 16
-			self._unpack_file_name()
 		elif file_size != None and file_name != None and oso_hash != None:
 			self.crc = 0x6B6B
 			self.rawtype = 0x6B
@@ -805,6 +855,12 @@ class SrrOsoHashBlock(_SrrFileNameBlock):
 			self._rawdata += file_name_data
 		else:
 			raise AttributeError("Invalid values for the constructor.")
+
+	def _unpack_oso_hash(self):
+		self._oso_hash = "%016x" % struct.unpack_from("<Q",
+			self._rawdata, HEADER_LENGTH + 8)[0]
+
+	oso_hash = _lazy(_unpack_oso_hash, "_oso_hash")
 			
 	def explain(self):
 		out = super(SrrOsoHashBlock, self).explain()
@@ -831,6 +887,8 @@ class SrrRarPaddingBlock(RarBlock):
 	HL:     Header Length (2 bytes)
 	        Always 7 + 4 = 11 bytes.
 	"""
+	__slots__ = ("padding_size",)
+
 	def __init__(self, bbytes=None, filepos=None, fname=None,
 				padding_bytes=None):
 		if bbytes != None:
@@ -885,6 +943,8 @@ class RarVolumeHeaderBlock(RarBlock): # 0x73
 	SUPPORTED_FLAG_MASK = (RarBlock.SUPPORTED_FLAG_MASK | VOLUME | COMMENT |
 	                       LOCK | SOLID | NEW_NUMBERING | AUTHENTICITY | 
 	                       PROTECTED | ENCRYPTED | FIRST_VOLUME | ENCRYPTVER)
+	__slots__ = ("_reserved1", "_reserved2")
+
 	def explain_flags(self):
 		out = super(RarVolumeHeaderBlock, self).explain_flags()
 		if self.flags & self.VOLUME:
@@ -921,23 +981,18 @@ class RarVolumeHeaderBlock(RarBlock): # 0x73
 	
 	def __init__(self, bbytes, filepos, fname):
 		super(RarVolumeHeaderBlock, self).__init__(bbytes, filepos, fname)
-		# 2 bytes + 4 bytes
-		(self.reserved1, self.reserved2) = struct.unpack_from("<HL",
-								self._rawdata, self._p) 
+		# 2 bytes + 4 bytes reserved fields
 		self._p += 6
 
+	def _unpack_reserved(self):
 		# TODO: look what is in the reserved places and figure it out
-		if self.reserved1 != 0 or self.reserved2 != 0:
-#			print(self.reserved1, self.reserved2, self.fname)
-			pass
-			
-#		print(self.reserved1, self.reserved2, self.fname)
 		# hex = hexlify(self._rawdata[7:]).decode('ascii')
-		# print(hex)
-#		if not bytearray(6) == self._rawdata[7:]:
-##			print(hex, self.fname)
-#			# only with solid archives?
-#			pass
+		# only with solid archives?
+		(self._reserved1, self._reserved2) = struct.unpack_from("<HL",
+								self._rawdata, HEADER_LENGTH)
+
+	(reserved1, reserved2) = _lazy(_unpack_reserved,
+	                               "_reserved1", "_reserved2")
 
 	def explain(self):
 		out = super(RarVolumeHeaderBlock, self).explain()
@@ -1009,6 +1064,16 @@ class RarPackedFileBlock(RarBlock): # 0x74
 	                       LARGE_FILE | UTF8_FILE_NAME | SALT | VERSION |
 	                       EXT_TIME | EXTFLAGS | RarBlock.SUPPORTED_FLAG_MASK)
 
+	# the sizes, CRC and method are decoded up front: reconstructing
+	# needs them for every block. The name and the time stamps are
+	# decoded when they are used.
+	__slots__ = ("packed_size", "unpacked_size", "os", "file_crc",
+	             "rar_version", "compression_method", "file_attributes",
+	             "high_pack_size", "high_unpack_size",
+	             "_dos_time", "_name_length", "_file_datetime",
+	             "_file_name", "_orig_filename", "_unicode_filename",
+	             "_salt", "_mtime", "_ctime", "_atime", "_arctime")
+
 	def __init__(self, blockbytes, filepos, fname):
 		super(RarPackedFileBlock, 
 			  self).__init__(blockbytes, filepos, fname)
@@ -1019,9 +1084,9 @@ class RarPackedFileBlock(RarBlock): # 0x74
 		# 1 byte for compression method, then 2 for filename length
 		# 4 bytes for file attributes
 		(self.packed_size, self.unpacked_size, self.os, self.file_crc,
-		 self.file_datetime, self.rar_version, self.compression_method,
-		 filename_length, self.file_attributes) =  \
-		 struct.unpack_from("<IIBIIBBHI", self._rawdata, self._p)
+		 self._dos_time, self.rar_version, self.compression_method,
+		 self._name_length, self.file_attributes) =  \
+		 S_FILE_HEADER.unpack_from(self._rawdata, self._p)
 		self._p += 25
 		# If large file flag is set, next are 4 bytes each
 		# for high order bits of file sizes.
@@ -1041,36 +1106,56 @@ class RarPackedFileBlock(RarBlock): # 0x74
 		# CMT: Comment
 		# RR: Recovery Record
 		# AV: Authenticity Verification
-		
+		# the file name starts at self._p
+
+	def _unpack_datetime(self):
 		# Copyright (c) 2005-2010  Marko Kreen <markokr@gmail.com>
-		self.file_datetime = _parse_dos_time(self.file_datetime)
-		self.file_name = self._rawdata[self._p:self._p+filename_length]
-		self._p += filename_length
+		self._file_datetime = _parse_dos_time(self._dos_time)
+
+	file_datetime = _lazy(_unpack_datetime, "_file_datetime")
+
+	def _name_offset(self):
+		if self.flags & self.LARGE_FILE == self.LARGE_FILE:
+			return HEADER_LENGTH + 25 + 8
+		return HEADER_LENGTH + 25
+
+	def _unpack_file_name(self):
+		pos = self._name_offset()
+		name = self._rawdata[pos:pos+self._name_length]
 		if self.flags & RarPackedFileBlock.UTF8_FILE_NAME:
-			null = self.file_name.find(ZERO) # index zero byte
-			self.orig_filename = self.file_name[:null]
-			u = UnicodeFilename(self.orig_filename, self.file_name[null + 1:])
-			self.unicode_filename = u.decode()
+			null = name.find(ZERO) # index zero byte
+			self._orig_filename = name[:null]
+			u = UnicodeFilename(self._orig_filename, name[null + 1:])
+			self._unicode_filename = u.decode()
 		else:
-			self.orig_filename = self.file_name
-			self.unicode_filename = self.file_name.decode(DEFAULT_CHARSET, 
-			                                              "replace")
-		self.file_name = self.unicode_filename
-		
+			self._orig_filename = name
+			self._unicode_filename = name.decode(DEFAULT_CHARSET, "replace")
+		self._file_name = self._unicode_filename
+
+	(file_name, orig_filename, unicode_filename) = _lazy(_unpack_file_name,
+		"_file_name", "_orig_filename", "_unicode_filename")
+
+	def _unpack_extra_fields(self):
+		"""Decodes the fields after the file name and returns the offset
+		of the fields that follow them."""
+		pos = self._name_offset() + self._name_length
 		if self.flags & self.SALT:
-			self.salt = self._rawdata[self._p:self._p + 8]
-			self._p += 8
+			self._salt = self._rawdata[pos:pos + 8]
+			pos += 8
 		else:
-			self.salt = None
+			self._salt = None
 
 		# optional extended time stamps
 		if self.flags & self.EXT_TIME:
-			self._p = _parse_ext_time(self, self._p)
+			pos = _parse_ext_time(self, pos)
 		else:
 			self.mtime = self.atime = self.ctime = self.arctime = None
-			
 		# other new fields may appear here
 		# e.g. recovery fields used in a RarNewSubBlock
+		return pos
+
+	(salt, mtime, ctime, atime, arctime) = _lazy(_unpack_extra_fields,
+		"_salt", "_mtime", "_ctime", "_atime", "_arctime")
 
 	def explain(self):
 		out = super(RarPackedFileBlock, self).explain()
@@ -1234,10 +1319,13 @@ class RarNewSubBlock(RarPackedFileBlock): # 0x7A
 	crc = crc32(data, ~0x0fffffff)
 	"""
 	#(FILE and NEWSUB share the same structure)
+	__slots__ = ("recovery_sectors", "data_sectors", "is_recovery")
+
 	def __init__(self, blockbytes, filepos, fname):
 		super(RarNewSubBlock, self).__init__(blockbytes, filepos, fname)
 		
 		if self.file_name == "RR":
+			self._p = self._unpack_extra_fields()
 			# skip 8 bytes for 'Protect+' (also part of the header)
 			# 4 bytes for recovery sector count, 8 bytes for data sector count
 			(self.recovery_sectors, self.data_sectors) =  \
@@ -1266,6 +1354,9 @@ class RarNewSubBlock(RarPackedFileBlock): # 0x7A
 		return out
 			
 class RarOldRecoveryBlock(RarBlock): # 0x78
+	__slots__ = ("packed_size", "rar_version", "recovery_sectors",
+	             "data_sectors")
+
 	def __init__(self, blockbytes, filepos, fname):
 		super(RarOldRecoveryBlock, self).__init__(blockbytes, filepos, fname)
 		# 2 bytes for packed size
@@ -1311,6 +1402,7 @@ class RarEndArchiveBlock(RarBlock):
 	
 	SUPPORTED_FLAG_MASK = (RarBlock.SUPPORTED_FLAG_MASK | NEXT_VOLUME |
 	                       DATACRC | REVSPACE | VOLNUMBER)
+	__slots__ = ("rarcrc", "volume_number")
 
 	def __init__(self, blockbytes, filepos, fname):
 		super(RarEndArchiveBlock, self).__init__(blockbytes, filepos, fname)
@@ -1372,6 +1464,9 @@ BTYPES_CLASSES = {
 	BlockType.RarOldAuthenticity76: RarBlock,
 	BlockType.RarOldAuthenticity79: RarBlock,
 }
+# every block type must have its class
+assert (len(BTYPES_CLASSES) == 
+        len([t for t in dir(BlockType) if not t.startswith("__")]))
 		
 ###############################################################################
 	
@@ -1520,8 +1615,7 @@ class RarReader(object):
 		is considered a fixed byte.
 		"""
 		header_buffer = self._rarstream.read(HEADER_LENGTH)
-		fmt = "<HBHH"
-		(_crc, btype, flags, hsize) = struct.unpack(fmt, header_buffer)
+		(_crc, btype, flags, hsize) = S_BASE_HEADER.unpack(header_buffer)
 		
 		# detect padding bytes
 		if self._rar_end_block_encountered and self._readmode == self.RAR:
@@ -1554,7 +1648,7 @@ class RarReader(object):
 		# Or if this is a File or NewSub block. -> e.g. BiA Outcasts releases
 		# (always additional length, but flag not always set (e.g. CMT))
 		# The next 4 bytes are additional data size.
-		add_size = struct.unpack_from("<I", block_buffer, 7)[0]  \
+		add_size = S_ADD_SIZE.unpack_from(block_buffer, 7)[0]  \
 			if flags & RarBlock.LONG_BLOCK or  \
 			btype == BlockType.RarPackedFile or  \
 			btype == BlockType.RarNewSub else 0
@@ -1601,8 +1695,6 @@ class RarReader(object):
 		elif self._readmode in (self.RAR, self.SFX) and add_size > 0:
 			self._rarstream.seek(add_size, 1) # relative to current position
 
-		assert (len(BTYPES_CLASSES) == 
-				len([t for t in dir(BlockType) if not t.startswith("__")]))
 		# for releases such as Haven.S02E05.HDTV.XviD-P0W4:
 		# except for the header size field, everything in the rar
 		# archive end block are null bytes -> still create RarBlock
@@ -31,26 +31,130 @@
 
 # The unit tests provide 100% code coverage for this file!
 
+import collections
 import io
+import mmap
 import os
+import threading
 from rescene import rar, utility
 
-def _check(first_rar):
+# amount of parsed RAR sets rar_set() keeps
+SET_CACHE_SIZE = 16
+
+def _check(rarset):
 	"""Check if first RAR file is given. 
-	Raises ArchiveNotFoundError or
-	       AttributeError (not the first rar archive is given).
+	Raises AttributeError (not the first rar archive is given).
 	Returns True if all is OK.
 	Returns False when we have an empty archive."""
-	rar_reader = rar.RarReader(first_rar)
-	blocks = rar_reader.read_all()
-	rar_reader.close()
-	for block in blocks:
-		if block.rawtype == rar.BlockType.RarPackedFile:
-			if block.flags & rar.RarPackedFileBlock.SPLIT_BEFORE:
-				raise AttributeError(
-					"You must start with the first volume from a RAR set")
-			return True  # we have what we wanted
-	return False
+	if rarset.starts_split:
+		raise AttributeError(
+			"You must start with the first volume from a RAR set")
+	return rarset.starts_split is not None
+
+class RarSet(object):
+	"""The headers of the volumes of a RAR set, parsed once.
+	Use rar_set() to share them between all readers of the set.
+
+	volumes: the paths of the volumes, starting with first_rar
+	old_naming: the set uses .rar, .r00, ... volume names
+	file_names: the archived files in the order they first appear
+	first_volume_files: the archived files of the first volume
+	starts_split: the first file of the first volume starts in an
+	              earlier volume; None when the first volume has no files
+	compressed: one of the archived files is not stored (m0)
+	segments: file name -> list of (volume, offset, size) tuples
+	          of the data of the file in every volume"""
+	def __init__(self, first_rar):
+		self.first_rar = first_rar
+		self.volumes = []
+		self.old_naming = False
+		self.file_names = []
+		self.first_volume_files = []
+		self.starts_split = None
+		self.compressed = False
+		self.segments = {}
+
+		rar_file = first_rar
+		while True:
+			is_old = self._process(rar_file)
+			if not self.volumes:
+				self.old_naming = is_old
+			self.volumes.append(rar_file)
+			if not isinstance(rar_file, utility.basestring):
+				break  # a stream: there are no other volumes
+			rar_file = utility.next_archive(rar_file, is_old)
+			if not os.path.isfile(rar_file):
+				break
+
+	def _process(self, rar_file):
+		"""Adds the segments of a volume.
+		Returns true if old style volume naming is used."""
+		is_old_style_naming = False
+		reader = rar.RarReader(rar_file)
+		try:
+			blocks = reader.read_all()
+		finally:
+			reader.close()
+		for block in blocks:
+			if block.rawtype == rar.BlockType.RarVolumeHeader:
+				# necessary for when the file name is ambiguous
+				if not block.flags & block.NEW_NUMBERING:
+					is_old_style_naming = True
+			if block.rawtype == rar.BlockType.RarPackedFile:
+				if block.compression_method != rar.COMPR_STORING:
+					self.compressed = True
+				if not self.volumes:
+					if self.starts_split is None:
+						self.starts_split = bool(
+							block.flags & block.SPLIT_BEFORE)
+					self.first_volume_files.append(block.file_name)
+				if block.file_name not in self.segments:
+					self.file_names.append(block.file_name)
+					self.segments[block.file_name] = []
+				self.segments[block.file_name].append((rar_file,
+					block.block_position + block.header_size,
+					block.packed_size))
+		return is_old_style_naming
+
+	def stamp(self):
+		"""Sizes and modification times of the volumes or None when a
+		volume is gone. A new volume after the last one changes it too."""
+		stamp = []
+		for volume in self.volumes:
+			try:
+				st = os.stat(volume)
+			except (OSError, TypeError):
+				return None
+			stamp.append((st.st_size, getattr(st, "st_mtime_ns", st.st_mtime)))
+		if os.path.isfile(utility.next_archive(self.volumes[-1],
+		                                       self.old_naming)):
+			return None
+		return stamp
+
+_sets = collections.OrderedDict()  # path -> (RarSet, stamp)
+_sets_lock = threading.Lock()
+
+def rar_set(first_rar):
+	"""The RarSet starting with the volume first_rar.
+	The last SET_CACHE_SIZE sets are kept as long as none of their
+	volumes changes. Streams are parsed every time."""
+	if not isinstance(first_rar, utility.basestring):
+		return RarSet(first_rar)
+	key = os.path.abspath(first_rar)
+	with _sets_lock:
+		cached = _sets.pop(key, None)
+	if cached is not None:
+		(rarset, stamp) = cached
+		if stamp is not None and rarset.stamp() == stamp:
+			with _sets_lock:
+				_sets[key] = cached
+			return rarset
+	rarset = RarSet(first_rar)
+	with _sets_lock:
+		_sets[key] = (rarset, rarset.stamp())
+		while len(_sets) > SET_CACHE_SIZE:
+			_sets.popitem(last=False)
+	return rarset
 
 class RarStream(io.IOBase):
 	"""Implements a read-only Stream that can read a packed file from
@@ -71,15 +175,18 @@ class RarStream(io.IOBase):
 		self._current_position = 0
 		self._closed = False
 
+		if middle and not os.path.isfile(first_rar):
+			raise AttributeError("File not found in the archive.")
+		rarset = rar_set(first_rar)
+
 		# don't do the first RAR check if told not to
 		# this is only when we know that the previous RARs are not needed
-		if not middle and not _check(first_rar):
+		if not middle and not _check(rarset):
 			raise AttributeError("Archive without stored files.")
 
-		rar_file = first_rar
-		while os.path.isfile(rar_file):
-			is_old = self._process(rar_file, packed_file_name, compressed)
-			rar_file = utility.next_archive(rar_file, is_old)
+		if rarset.compressed and not compressed:
+			raise AttributeError("Compressed RARs are not supported")
+		self._add_volumes(rarset, packed_file_name)
 
 		try:
 			# choose the first archive with the rar_file to start with
@@ -88,44 +195,25 @@ class RarStream(io.IOBase):
 			# IndexError: list index out of range
 			raise AttributeError("File not found in the archive.")
 
-	def _process(self, rar_file, packed_file_name=None, compressed=False):
-		"""Checks if the rar_file has the packed_file and adds 
-		the _RarVolumes it creates to the list.
-		If packed_file_name is not supplied, the first file will be used.
-		Returns true if old style volume naming is used."""
+	def _add_volumes(self, rarset, packed_file_name=None):
+		"""Adds a _RarVolume for every segment of packed_file_name.
+		If packed_file_name is not supplied, the first file will be used."""
 		if packed_file_name:
 			# / is an illegal character in Windows
 			# We support POSIX paths, but the path structure in RAR files
 			# is always Windows style.
 			packed_file_name = packed_file_name.replace("/", "\\")
-		is_old_style_naming = False
-		reader = rar.RarReader(rar_file)
-		for block in reader.read_all():
-			if block.rawtype == rar.BlockType.RarVolumeHeader:
-				# necessary for when the file name is ambiguous
-				if not block.flags & block.NEW_NUMBERING:
-					is_old_style_naming = True
-			if block.rawtype == rar.BlockType.RarPackedFile:
-				if (block.compression_method != rar.COMPR_STORING and
-					not compressed):
-					raise AttributeError("Compressed RARs are not supported")
-
-				if not packed_file_name:
-					packed_file_name = block.file_name
-				if packed_file_name == block.file_name:
-					cvol = self._RarVolume()
-					cvol.archive_path = rar_file
-					cvol.pfile_start = self._packed_file_length
-					cvol.pfile_end = \
-						self._packed_file_length + block.packed_size - 1
-					cvol.pfile_offset = \
-						block.block_position + block.header_size
-
-					self._rar_volumes.append(cvol)
-					self._packed_file_length += block.packed_size
-		reader.close()
+		elif rarset.file_names:
+			packed_file_name = rarset.file_names[0]
+		for (volume, offset, size) in rarset.segments.get(packed_file_name, ()):
+			cvol = self._RarVolume()
+			cvol.archive_path = volume
+			cvol.pfile_start = self._packed_file_length
+			cvol.pfile_end = self._packed_file_length + size - 1
+			cvol.pfile_offset = offset
+			self._rar_volumes.append(cvol)
+			self._packed_file_length += size
 		self.packed_file_name = packed_file_name
-		return is_old_style_naming
 
 	def length(self):
 		"""Length of the packed file being accessed."""
@@ -296,10 +384,129 @@ class RarStream(io.IOBase):
 		"""
 
 class SrrStream(io.IOBase):
-	""" TODO: Direct file like access (read-only) + change name?
-		to files stored in the SRR file.
-		To support SRR files in a nfoviewer."""
-	pass
+	"""Implements a read-only Stream of a file stored in an SRR file.
+	The stored bytes are memory mapped: nothing gets extracted to disk.
+	Regular reads are used when the SRR file can't be mapped."""
+
+	def __init__(self, srr_file, file_name=None, block=None):
+		"""
+		file_name: the name of the stored file, including its path
+		block: the SrrStoredFileBlock of the file when it has been read
+		       before; file_name isn't used then
+		"""
+		if block is None:
+			block = self._find(srr_file, file_name)
+		self.name = block.file_name
+		self._offset = block.block_position + block.header_size
+		self._file_size = block.file_size
+		self._current_position = 0
+		self._srr_stream = open(srr_file, "rb")
+		self._map = None
+		self._map_start = 0
+		if self._file_size:
+			# the offset of a map must be a multiple of the granularity
+			start = self._offset - self._offset % mmap.ALLOCATIONGRANULARITY
+			try:
+				self._map = mmap.mmap(self._srr_stream.fileno(),
+					self._offset - start + self._file_size,
+					access=mmap.ACCESS_READ, offset=start)
+				self._map_start = self._offset - start
+			except (EnvironmentError, ValueError, OverflowError):
+				# e.g. a truncated SRR file
+				self._map = None
+
+	@staticmethod
+	def _find(srr_file, file_name):
+		for block in rar.RarReader(srr_file):
+			if (block.rawtype == rar.BlockType.SrrStoredFile and
+				block.file_name == file_name):
+				return block
+		raise ValueError("The file %s is not stored in %s." %
+		                 (file_name, srr_file))
+
+	def length(self):
+		"""Length of the stored file being accessed."""
+		return self._file_size
+
+	def tell(self):
+		"""Return the current stream position."""
+		return self._current_position
+
+	def readable(self):
+		"""Return True if the stream can be read from. 
+		If False, read() will raise IOError."""
+		return not self.closed
+
+	def seekable(self):
+		"""Return True if the stream supports random access. 
+		If False, seek(), tell() and truncate() will raise IOError."""
+		return not self.closed
+
+	def close(self):
+		"""Closes the map and the SRR file. Can be called more than once."""
+		if self._map is not None:
+			self._map.close()
+			self._map = None
+		self._srr_stream.close()
+		super(SrrStream, self).close()
+
+	def seek(self, offset, origin=0):
+		"""
+		Change the stream position to the given byte offset. offset is 
+		interpreted relative to the position indicated by origin. 
+		Values for whence are:
+	
+			* SEEK_SET or 0 - start of the stream (the default); 
+			                  offset should be zero or positive
+			* SEEK_CUR or 1 - current stream position; offset may be negative
+			* SEEK_END or 2 - end of the stream; offset is usually negative
+	
+		Return the new absolute position.
+		"""
+		destination = 0
+		if origin == os.SEEK_SET:
+			destination = offset
+		elif origin == os.SEEK_CUR:
+			destination = self._current_position + offset
+		elif origin == os.SEEK_END:
+			destination = self._file_size + offset
+
+		if destination < 0:
+			raise IndexError("Negative index.")
+		self._current_position = destination
+		return self._current_position
+
+	def _remaining(self, size):
+		remainder = max(0, self._file_size - self._current_position)
+		if size is None or size < 0:
+			return remainder
+		return min(size, remainder)
+
+	def read(self, size=-1):
+		"""
+		read([size])
+			-> read at most size bytes, returned as a string.
+			If the size argument is negative, read until EOF is reached.
+			Returns an empty string at EOF.
+		"""
+		amount = self._remaining(size)
+		if not amount:
+			return b""
+		if self._map is not None:
+			start = self._map_start + self._current_position
+			data = self._map[start:start + amount]
+		else:
+			self._srr_stream.seek(self._offset + self._current_position)
+			data = self._srr_stream.read(amount)
+		self._current_position += len(data)
+		return data
+
+	def readinto(self, byte_array):
+		"""Read up to len(byte_array) bytes into byte_array and return 
+		the number of bytes read."""
+		data = self.read(len(byte_array))
+		byte_array[:len(data)] = data
+		return len(data)
 
 class FakeFile(io.IOBase):
 	"""Fake file that exists only of null bytes."""
@@ -348,7 +555,7 @@ class FakeFile(io.IOBase):
 
 		if destination < 0:
 			raise IndexError("Negative index.")
-		if destination >= self._file_size:
+		if destination > self._file_size:
 			raise IndexError("Beyond end of file.")
 		self._current_position = destination
 		return self._current_position
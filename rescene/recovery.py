@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+"""Calculation of the recovery record of a RAR volume.
+
+All data preceding the recovery record is protected. It is broken into
+sectors of 512 bytes and the last sector is padded with zeros. For every
+sector, the 2 low-order bytes of its inverted CRC32 are stored. Sector n
+belongs to slice n % recovery_sectors and every slice gets one parity
+sector: the XOR of all the sectors in the slice.
+
+A stripe of recovery_sectors consecutive sectors has one sector of every
+slice, so the parity sectors are calculated a stripe at a time with a
+single XOR of two wide integers."""
+
+import struct
+import zlib
+
+SECTOR_SIZE = 512
+READ_SIZE = 0x100000
+
+try:  # Python 3
+	from functools import partial
+	_int_to_bytes = partial(int.to_bytes, byteorder="big")
+	_int_from_bytes = partial(int.from_bytes, byteorder="big")
+except AttributeError:  # Python < 3
+	from binascii import unhexlify, hexlify
+	def _int_to_bytes(value, length):
+		return unhexlify(format(value, "0{0}X".format(length * 2)))
+	def _int_from_bytes(data):
+		return int(hexlify(data.tobytes()), 16)
+
+class RecoveryRecord(object):
+	"""Sector CRCs and parity sectors of the data added so far.
+	recovery_sectors: the amount of parity sectors"""
+	def __init__(self, recovery_sectors):
+		if recovery_sectors < 1:
+			raise ValueError("At least one recovery sector is needed.")
+		self.recovery_sectors = recovery_sectors
+		self.sectors = 0  # protected sectors
+		self._crcs = bytearray()
+		self._stripe_size = recovery_sectors * SECTOR_SIZE
+		self._parity = 0
+		self._pending = bytearray()  # the incomplete stripe
+		self._next = 0  # the sector after the pending data
+
+	def add(self, data, sector=None):
+		"""Adds whole sectors of data. Only the last sector of the volume
+		can be short: it is padded with zeros.
+		sector: the index of the first sector of data. Sectors can be
+		        added in any order. Default: the sector after the data
+		        that was added before."""
+		if sector is None:
+			sector = self._next
+		if len(data) % SECTOR_SIZE:
+			data = bytes(data) + bytes(bytearray(
+				SECTOR_SIZE - len(data) % SECTOR_SIZE))
+		data = memoryview(data)
+		count = len(data) // SECTOR_SIZE
+		self._add_crcs(data, sector, count)
+
+		if sector != self._next:
+			self._flush()
+		if not self._pending:
+			# the stripe starts at a sector of the first slice
+			self._pending.extend(bytearray(
+				sector % self.recovery_sectors * SECTOR_SIZE))
+		start = min(len(data), self._stripe_size - len(self._pending))
+		self._pending.extend(data[:start])
+		if len(self._pending) == self._stripe_size:
+			self._flush()
+		end = start + (len(data) - start) // self._stripe_size * \
+			self._stripe_size
+		for pos in range(start, end, self._stripe_size):
+			self._parity ^= _int_from_bytes(data[pos:pos + self._stripe_size])
+		if end < len(data):
+			self._pending.extend(data[end:])
+		self._next = sector + count
+		self.sectors = max(self.sectors, self._next)
+
+	def read_from(self, stream, size):
+		"""Adds size bytes read from stream."""
+		left = bytes()
+		while size > 0:
+			data = stream.read(min(READ_SIZE, size))
+			if not data:
+				raise EOFError()
+			size -= len(data)
+			data = left + data
+			whole = len(data) - len(data) % SECTOR_SIZE
+			if size <= 0:
+				whole = len(data)
+			self.add(data[:whole])
+			left = data[whole:]
+
+	def _add_crcs(self, data, sector, count):
+		crcs = struct.pack("<%dH" % count, *[
+			~zlib.crc32(data[pos:pos + SECTOR_SIZE]) & 0xffff
+			for pos in range(0, count * SECTOR_SIZE, SECTOR_SIZE)])
+		start = sector * 2
+		if len(self._crcs) < start:
+			self._crcs.extend(bytearray(start - len(self._crcs)))
+		self._crcs[start:start + len(crcs)] = crcs
+
+	def _flush(self):
+		"""XORs the incomplete stripe padded with zeros."""
+		if self._pending:
+			self._pending.extend(bytearray(
+				self._stripe_size - len(self._pending)))
+			self._parity ^= _int_from_bytes(memoryview(self._pending))
+			self._pending = bytearray()
+
+	def crcs(self):
+		"""The 2 byte CRCs of all protected sectors."""
+		return bytes(self._crcs)
+
+	def parity(self):
+		"""List with the parity sector of every slice."""
+		self._flush()
+		data = _int_to_bytes(self._parity, self._stripe_size)
+		return [data[pos:pos + SECTOR_SIZE]
+		        for pos in range(0, self._stripe_size, SECTOR_SIZE)]
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+"""Scanning of large collections of SRR files.
+
+Every SRR file is parsed only once. All checks of a scan work on the same
+ParsedSrr object and run in a pool of worker processes. The results come
+back in the order of the input files, as soon as they are available."""
+
+import multiprocessing
+import os
+
+from rescene.main import info
+from rescene.rar import RarReader
+
+class ParsedSrr(object):
+	"""The blocks of an SRR file, read once and shared by all checks."""
+	def __init__(self, srr_file):
+		self.srr_file = srr_file
+		self.blocks = RarReader(srr_file).read_all()
+		self._info = None
+
+	def of_type(self, rawtype):
+		return [block for block in self.blocks if block.rawtype == rawtype]
+
+	def info(self):
+		"""rescene.info() of the SRR file without parsing it again."""
+		if self._info is None:
+			self._info = info(self.srr_file, self.blocks)
+		return self._info
+
+def find_srrs(paths, recursive=False, unknown=None):
+	"""Yields the .srr files among the given files and directories.
+	The files of a directory are listed in sorted order.
+	recursive: also list the files in subdirectories
+	unknown:   called with each path that is no SRR file or directory"""
+	for path in paths:
+		if os.path.isdir(path):
+			if recursive:
+				for (dirpath, dirnames, filenames) in os.walk(path):
+					dirnames.sort()
+					for fname in sorted(filenames):
+						if fname.lower().endswith(".srr"):
+							yield os.path.join(dirpath, fname)
+			else:
+				for fname in sorted(os.listdir(path)):
+					srr_file = os.path.join(path, fname)
+					if (fname.lower().endswith(".srr") and
+						os.path.isfile(srr_file)):
+						yield srr_file
+		elif os.path.isfile(path) and path.lower().endswith(".srr"):
+			yield path
+		elif unknown:
+			unknown(path)
+
+def _scan_job(job):
+	(function, srr_file) = job
+	try:
+		return (srr_file, function(ParsedSrr(srr_file)), None)
+	except Exception as err:
+		return (srr_file, None, err)
+
+def scan(srr_files, function, processes=None, chunksize=8):
+	"""Calls function with the ParsedSrr object of every SRR file.
+	The function and its result must be picklable: a module level
+	function or a functools.partial of one.
+	processes: amount of workers; the amount of CPUs by default.
+	           The files are scanned in this process when it is 1.
+	Yields (srr_file, result, None) or (srr_file, None, the raised
+	exception) in the order of srr_files."""
+	jobs = ((function, srr_file) for srr_file in srr_files)
+	if processes == 1:
+		for job in jobs:
+			yield _scan_job(job)
+		return
+	pool = multiprocessing.Pool(processes)
+	try:
+		for scanned in pool.imap(_scan_job, jobs, chunksize):
+			yield scanned
+	finally:
+		pool.terminate()
+		pool.join()
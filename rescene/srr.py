@@ -43,6 +43,9 @@ from rescene.utility import raw_input
 from rescene.utility import encodeerrors
 from rescene.utility import calculate_crc32
 from rescene.utility import create_temp_file_name, replace_result
+from rescene.journal import Journal
+from rescene.volumes import volume_index
+from rescene.instrumentation import subscribe_from_environment
 
 
 o = rescene.Observer()
@@ -204,6 +207,19 @@ def verify_extracted_files(srr, in_folder, auto_locate):
 					status = 1
 	return status
 
+def cached_volume_index(srr_file, out_folder):
+	"""The VolumeIndex of srr_file. It is saved next to the reconstructed
+	volumes so rebuilding a few of them later won't read the whole SRR."""
+	cache_file = os.path.join(out_folder,
+		os.path.basename(srr_file) + ".volumes")
+	try:
+		if not os.path.isdir(out_folder):
+			os.makedirs(out_folder)
+		return volume_index(srr_file, cache_file)
+	except EnvironmentError:
+		# the output folder isn't writable: only the reconstruction fails
+		return volume_index(srr_file)
+
 def manage_srr(options, in_folder, infiles, working_dir):
 	out_folder = working_dir
 	if options.output_dir:
@@ -311,12 +327,48 @@ def manage_srr(options, in_folder, infiles, working_dir):
 		rar_mt.mt_min = options.mt_min
 		rar_mt.mt_max = options.mt_max
 
+		if options.repair:
+			status = 0
+			rebuilt = rescene.repair_volumes(infiles[0], in_folder, out_folder,
+				volume_index=cached_volume_index(infiles[0], out_folder),
+				extract_paths=save_paths, hints=hints,
+				skip_rar_crc=options.no_auto_crc,
+				auto_locate_renamed=options.auto_locate, empty=options.fake,
+				rar_executable_dir=options.rar_executable_dir,
+				tmp_dir=options.temp_dir, rar_mt=rar_mt)
+			damaged = 0
+			for (name, err) in rebuilt:
+				damaged += 1
+				if err is None:
+					print("{0}: rebuilt.".format(name))
+				else:
+					status = 1
+					print("{0}: not rebuilt! {1}".format(name, err),
+					      file=sys.stderr)
+			if not damaged:
+				print("All volumes match the SFV.")
+			return status
+
+		journal = None
+		if options.resume:
+			if not os.path.isdir(out_folder):
+				os.makedirs(out_folder)
+			journal = Journal(os.path.join(out_folder,
+				os.path.basename(infiles[0]) + ".journal"), [infiles[0]])
+			if journal.resumed:
+				print("Resuming the interrupted reconstruction.")
+
+		index = None
+		if options.volume:
+			index = cached_volume_index(infiles[0], out_folder)
+
 		try:
 			rescene.reconstruct(infiles[0], in_folder, out_folder, save_paths,
 			                    hints, options.no_auto_crc,
 			                    options.auto_locate, options.fake,
 			                    options.rar_executable_dir, options.temp_dir,
-			                    options.volume is None, options.volume, rar_mt)
+			                    options.volume is None, options.volume, rar_mt,
+			                    journal, volume_index=index)
 		except (FileNotFound, RarNotFound) as err:
 			mthread.done = True
 			mthread.join()
@@ -479,6 +531,13 @@ def main(argv=None):
 					metavar="VOLUME", help="Specify a single RAR volume "
 					"to reconstruct. Provide the extension or file name. "
 					"End name with * to trigger entire subset reconstruction.")
+	recon.add_option("--repair", action="store_true", dest="repair",
+					 default=False, help="rebuild every volume in the output "
+					 "directory that is missing or doesn't match the SFV")
+	recon.add_option("--resume", action="store_true", dest="resume",
+					 default=False, help="keep a journal of the finished "
+					 "volumes in the output directory and continue an "
+					 "interrupted reconstruction where it stopped")
 	recon.add_option("-u", "--no-autocrc",
 					 action="store_true", dest="no_auto_crc", default=False,
 					 help="disable automatic CRC checking during reconstruction")
@@ -540,6 +599,7 @@ def main(argv=None):
 		return 0
 
 	(options, infiles) = parser.parse_args(args=argv)
+	subscribe_from_environment()
 
 	def can_overwrite(file_path):
 		retvalue = True
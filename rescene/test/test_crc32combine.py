@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+import os
+import unittest
+import zlib
+
+from rescene.crc32combine import crc32_combine, crc32_combine_function
+
+class TestCombine(unittest.TestCase):
+	def test_combine(self):
+		first = os.urandom(5000)
+		second = os.urandom(3000)
+		crc1 = zlib.crc32(first) & 0xFFFFFFFF
+		crc2 = zlib.crc32(second) & 0xFFFFFFFF
+		expected = zlib.crc32(first + second) & 0xFFFFFFFF
+		combine = crc32_combine_function()
+		self.assertEqual(expected, crc32_combine(crc1, crc2, len(second)))
+		self.assertEqual(expected, combine(crc1, crc2, len(second)))
+		# lengths of volumes larger than 4 GiB
+		self.assertEqual(crc32_combine(crc1, crc2, 2 ** 33 + 5),
+		                 combine(crc1, crc2, 2 ** 33 + 5))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import shutil
+import unittest
+from tempfile import mkdtemp
+
+from rescene.index import SrrIndex
+
+# for running nose tests
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+class TestIndex(unittest.TestCase):
+	def setUp(self):
+		self.dir = mkdtemp(prefix="pyReScene-")
+		files_dir = os.path.join(os.pardir, os.pardir, "test_files")
+		self.srrs = os.path.join(self.dir, "srrs")
+		os.mkdir(self.srrs)
+		for name in ("store_little.srr", "store_little_srrfile_with_path.srr"):
+			shutil.copy(os.path.join(files_dir, "store_little", name),
+			            self.srrs)
+		self.empty = os.path.join(self.srrs, "empty.srr")
+		open(self.empty, "wb").close()
+		self.index = SrrIndex(os.path.join(self.dir, "index.db"))
+
+	def tearDown(self):
+		self.index.close()
+		shutil.rmtree(self.dir)
+
+	def test_queries(self):
+		self.assertEqual((3, 0), self.index.update([self.srrs], processes=1))
+		little = os.path.abspath(os.path.join(self.srrs, "store_little.srr"))
+		matches = self.index.with_crc("876dbba3")
+		self.assertEqual(2, len(matches))
+		self.assertEqual((little, "little_file.txt"), matches[0])
+		self.assertEqual(1, len(self.index.duplicates()))
+		self.assertEqual([], self.index.compressed())
+		self.assertEqual(2, len(self.index.missing(".nfo")))
+		self.assertEqual([os.path.abspath(self.empty)],
+		                 [path for (path, _err) in self.index.errors()])
+
+	def test_incremental(self):
+		self.index.update([self.srrs], processes=1)
+		self.assertEqual((0, 0), self.index.update([self.srrs], processes=1))
+		with open(self.empty, "ab") as empty:
+			empty.write(b"x")
+		os.remove(os.path.join(self.srrs, "store_little.srr"))
+		self.assertEqual((1, 1), self.index.update([self.srrs], processes=1))
+		self.assertEqual(2, len(self.index))
+		self.assertEqual(1, len(self.index.with_crc("876DBBA3")))
+
+	def test_overlapping_paths(self):
+		paths = [os.path.join(self.srrs, "store_little.srr"), self.srrs,
+		         self.srrs]
+		self.assertEqual((3, 0), self.index.update(paths, processes=2))
+		with SrrIndex(os.path.join(self.dir, "other.db")) as other:
+			self.assertEqual((3, 0), other.update(paths, processes=1))
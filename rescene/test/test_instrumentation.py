@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import os
+import shutil
+import unittest
+from tempfile import mkdtemp
+
+from rescene import main
+from rescene.main import MsgCode, Observer, Stage
+from rescene.instrumentation import JsonLinesSink, PrometheusSink
+
+class TestStage(unittest.TestCase):
+	def setUp(self):
+		self.dir = mkdtemp(prefix="pyReScene-")
+		self.o = Observer()
+		self.callbacks = list(main.instrumentation_callbacks)
+		main.instrumentation_callbacks[:] = [self.o]
+
+	def tearDown(self):
+		main.instrumentation_callbacks[:] = self.callbacks
+		shutil.rmtree(self.dir)
+
+	def test_events(self):
+		with Stage("test", volume="a.rar") as stage:
+			stage.progress(10, track=1)
+			stage.add(5)
+		(progress, finished) = self.o.events
+		self.assertEqual(MsgCode.PROGRESS, progress.code)
+		self.assertEqual(10, progress.bytes)
+		self.assertEqual(1, progress.track)
+		self.assertEqual(MsgCode.STAGE, finished.code)
+		self.assertEqual(15, finished.bytes)
+		self.assertEqual("test", finished.stage)
+		self.assertEqual("a.rar", finished.volume)
+		self.assertTrue(finished.wall_time >= 0)
+		self.assertTrue(finished.cpu_time >= 0)
+
+	def test_failed_stage(self):
+		try:
+			with Stage("test"):
+				raise ValueError()
+		except ValueError:
+			pass
+		self.assertEqual([], self.o.events)
+
+	def test_sinks(self):
+		jsonl = os.path.join(self.dir, "events.jsonl")
+		prom = os.path.join(self.dir, "metrics.prom")
+		main.instrumentation_callbacks.extend([JsonLinesSink(jsonl), PrometheusSink(prom)])
+		for _ in range(2):
+			with Stage("test") as stage:
+				stage.progress(100)
+
+		with open(jsonl) as f:
+			events = [json.loads(line) for line in f]
+		self.assertEqual(["progress", "stage"] * 2,
+		                 [event["event"] for event in events])
+		with open(prom) as f:
+			metrics = f.read()
+		self.assertTrue('rescene_stage_runs_total{stage="test"} 2\n' in metrics)
+		self.assertTrue('rescene_stage_bytes_total{stage="test"} 200\n'
+		                in metrics)
+		# no temporary files are left behind
+		self.assertEqual(["events.jsonl", "metrics.prom"],
+		                 sorted(os.listdir(self.dir)))
@@ -39,7 +39,10 @@ import struct
 import rescene
 from rescene.main import *
 from rescene.main import _handle_rar, _flag_check_srr, _auto_locate_renamed
+from rescene.main import _SourceFiles, _read_ahead
 from rescene.rar import ArchiveNotFoundError
+from rescene.journal import Journal
+from rescene.volumes import VolumeIndex, volume_index
 from rescene import rar
 
 try:  # Python < 3
@@ -262,6 +265,97 @@ class TestRename(TmpDirSetup):
 # 		rename_stored_file(srr, "store_little.srr",
 # 						   "store_little_renamed.srr")
 
+	def test_rename_in_place(self):
+		orig = os.path.join(self.little, "store_little_srrfile_with_path.srr")
+		srr = os.path.join(self.tdir, os.path.basename(orig))
+		_copy(orig, self.tdir)
+		inode = os.stat(srr).st_ino
+
+		rename_stored_file(srr, "store_little/store_little.srr",
+		                   "store_little/store_little.sfv")
+		self.assertEqual(inode, os.stat(srr).st_ino)
+		self.assertEqual(os.path.getsize(orig), os.path.getsize(srr))
+		self.assertEqual(["store_little/store_little.sfv"],
+		                 list(info(srr)["stored_files"].keys()))
+
+class TestSrrEditor(TmpDirSetup):
+	def test_single_rewrite(self):
+		orig = os.path.join(self.little, "store_little_srrfile_with_path.srr")
+		srr = os.path.join(self.tdir, os.path.basename(orig))
+		_copy(orig, self.tdir)
+		txt = os.path.join(self.files_dir, "txt")
+		added = sorted(os.listdir(txt))[:2]
+
+		editor = SrrEditor(srr)
+		editor.rename("store_little/store_little.srr", "renamed.srr")
+		for name in added:
+			editor.add_file(os.path.join(txt, name))
+		editor.apply()
+		stored = info(srr)["stored_files"]
+		self.assertEqual(["renamed.srr"] + added, list(stored.keys()))
+		blocks = [b for b in RarReader(srr).read_all()
+		          if b.rawtype == BlockType.SrrStoredFile]
+		with open(os.path.join(txt, added[0]), "rb") as data:
+			self.assertEqual(data.read(), blocks[1].srr_data())
+
+		editor = SrrEditor(srr)
+		editor.remove("renamed.srr")
+		editor.rename(added[0], "store_little/store_little.srr")
+		editor.apply()
+		self.assertEqual(["store_little/store_little.srr", added[1]],
+		                 list(info(srr)["stored_files"].keys()))
+		# the RAR meta data is left alone
+		self.assertEqual(info(orig)["rar_files"].keys(),
+		                 info(srr)["rar_files"].keys())
+
+	def test_failed_patch(self):
+		srr = os.path.join(self.tdir, "music.srr")
+		with open(srr, "wb") as new:
+			new.write(SrrHeaderBlock(appname=rescene.APPNAME).block_bytes())
+		size = os.path.getsize(srr)
+		editor = SrrEditor(srr)
+		editor.add_file(os.path.join(self.files_dir, "txt", "little_file.txt"))
+		editor.add_file(os.path.join(self.tdir, "missing.txt"))
+		self.assertRaises(EnvironmentError, editor.apply)
+		self.assertEqual(size, os.path.getsize(srr))
+
+class TestMerge(TmpDirSetup):
+	def test_merge(self):
+		srr = os.path.join(self.little, "store_little_srrfile_with_path.srr")
+		vobsub = os.path.join(self.files_dir, "store_utf8_comment",
+		                      "utf8_filename_added.srr")
+		merged = os.path.join(self.tdir, "merged.srr")
+		merge_srrs([srr, vobsub], merged)
+		blocks = RarReader(merged).read_all()
+		self.assertEqual(BlockType.SrrHeader, blocks[0].rawtype)
+		stored = [b.file_name for b in blocks
+		          if b.rawtype == BlockType.SrrStoredFile]
+		self.assertEqual(list(info(srr)["stored_files"].keys()) +
+		                 list(info(vobsub)["stored_files"].keys()), stored)
+		# stored files first, then the rest of both files
+		types = [b.rawtype for b in blocks[1:]]
+		self.assertEqual(sorted(types, key=lambda t:
+		                        t != BlockType.SrrStoredFile), types)
+		# only the SRR header block is replaced
+		self.assertEqual(os.path.getsize(srr) - _header_size(srr) +
+		                 os.path.getsize(vobsub) - _header_size(vobsub) +
+		                 blocks[0].header_size, os.path.getsize(merged))
+
+	def test_merge_many(self):
+		srr = os.path.join(self.little, "store_little.srr")
+		jobs = [([srr, srr], os.path.join(self.tdir, "one.srr")),
+		        ([srr, "missing.srr"], os.path.join(self.tdir, "two.srr"))]
+		results = list(merge_srrs_many(jobs, 2))
+		self.assertEqual([job[1] for job in jobs], [r[0] for r in results])
+		self.assertEqual(None, results[0][1])
+		self.assertTrue(isinstance(results[1][1], EnvironmentError))
+		merge_srrs([srr, srr], os.path.join(self.tdir, "serial.srr"))
+		self.assertTrue(cmp(os.path.join(self.tdir, "one.srr"),
+		                    os.path.join(self.tdir, "serial.srr")))
+
+def _header_size(srr_file):
+	return RarReader(srr_file).read_all()[0].header_size
+
 class TestHash(TestInit):
 	def test_hash_capitals(self):
 		"""To compare with the PHP hash implementation"""
@@ -554,6 +648,50 @@ class TestRebuild(TmpDirSetup):
 		# self._print_events()
 		self.assertTrue(cmp(new, rar), "Files not equivalent.")
 
+	def test_resume(self):
+		srr = os.path.join(self.oldfolder, "store_split_folder.srr")
+		names = ["store_split_folder.rar", "store_split_folder.r00",
+		         "store_split_folder.r01"]
+		journal_file = os.path.join(self.tdir, "store_split_folder.journal")
+
+		# an interrupted run keeps its journal
+		journal = Journal(journal_file, [srr])
+		journal.remove = lambda: None
+		reconstruct(srr, self.files_dir, self.tdir, journal=journal)
+		self.assertTrue(os.path.isfile(journal_file))
+
+		# the finished volumes are verified and skipped
+		os.unlink(os.path.join(self.tdir, names[2]))
+		self.o.events = []
+		reconstruct(srr, self.files_dir, self.tdir,
+		            journal=Journal(journal_file, [srr]))
+		skipped = [e.message for e in self.o.events
+		           if e.message.startswith("Already reconstructed")]
+		self.assertEqual(2, len(skipped))
+		self.assertFalse(any(e.code == MsgCode.CRC for e in self.o.events))
+		self.assertFalse(os.path.isfile(journal_file))
+		for name in names:
+			self.assertTrue(cmp(os.path.join(self.oldfolder, name),
+			                    os.path.join(self.tdir, name)),
+			                "Files not equivalent.")
+
+		# a changed volume is rebuilt without asking to overwrite it
+		for name in names:
+			os.unlink(os.path.join(self.tdir, name))
+		journal = Journal(journal_file, [srr])
+		journal.remove = lambda: None
+		reconstruct(srr, self.files_dir, self.tdir, journal=journal)
+		with open(os.path.join(self.tdir, names[1]), "r+b") as volume:
+			volume.seek(100)
+			volume.write(b"changed")
+		self.o.events = []
+		reconstruct(srr, self.files_dir, self.tdir,
+		            journal=Journal(journal_file, [srr]))
+		self.assertEqual(2, len([e for e in self.o.events
+			if e.message.startswith("Already reconstructed")]))
+		self.assertTrue(cmp(os.path.join(self.oldfolder, names[1]),
+		                    os.path.join(self.tdir, names[1])))
+
 	def test_hints(self):
 		pass
 
@@ -566,6 +704,122 @@ class TestRebuild(TmpDirSetup):
 
 
 
+class TestVolumes(TmpDirSetup):
+	names = ["store_split_folder.rar", "store_split_folder.r00",
+	         "store_split_folder.r01"]
+
+	def setUp(self):
+		super(TestVolumes, self).setUp()
+		self.srr = os.path.join(self.oldfolder, "store_split_folder.srr")
+
+	def assertRebuilt(self, names):
+		for name in names:
+			self.assertTrue(cmp(os.path.join(self.oldfolder, name),
+			                    os.path.join(self.tdir, name)),
+			                "Files not equivalent.")
+
+	def test_index(self):
+		cache = os.path.join(self.tdir, "store_split_folder.volumes")
+		index = volume_index(self.srr, cache)
+		self.assertEqual(self.names, list(index.volumes))
+		self.assertEqual(["store_split_folder.sfv"], index.sfv_files)
+		r01 = index.volumes["store_split_folder.r01"]
+		self.assertEqual(2, len(r01.sources))
+		self.assertTrue(r01.sources[0].offset > 0)
+		self.assertEqual(0, r01.sources[1].offset)
+		loaded = VolumeIndex.load(cache, self.srr)
+		self.assertEqual(list(index.volumes.values()),
+		                 list(loaded.volumes.values()))
+		self.assertEqual(["store_split_folder.r00"], index.matching(".r00"))
+		self.assertEqual(self.names, index.matching("store_split*"))
+
+		# only the volume is rebuilt and without CRC warnings
+		reconstruct(self.srr, self.files_dir, self.tdir, srr_part=".r01",
+		            extract_files=False, volume_index=loaded)
+		self.assertEqual(["store_split_folder.r01",
+		                  "store_split_folder.volumes"],
+		                 sorted(os.listdir(self.tdir)))
+		self.assertFalse(any(e.code == MsgCode.CRC for e in self.o.events))
+		self.assertRebuilt(["store_split_folder.r01"])
+
+	def test_wildcard_subset(self):
+		# the set starts in the middle of an archived file
+		for index in (None, volume_index(self.srr)):
+			self.o.events = []
+			reconstruct(self.srr, self.files_dir, self.tdir,
+			            srr_part="store_split_folder.r0*",
+			            extract_files=False, volume_index=index)
+			self.assertEqual(self.names[1:], sorted(os.listdir(self.tdir)))
+			self.assertFalse(any(e.code == MsgCode.CRC
+			                     for e in self.o.events))
+			self.assertRebuilt(self.names[1:])
+			for name in self.names[1:]:
+				os.unlink(os.path.join(self.tdir, name))
+
+	def test_srr_volume(self):
+		from rescene import srr
+		orig_stdout = sys.stdout
+		try:
+			sys.stdout = StringIO()
+			srr.main([self.srr, "-m", self.names[2], "-i", self.files_dir,
+			          "-o", self.tdir])
+		except SystemExit as exit:
+			self.assertFalse(exit.code)
+		finally:
+			sys.stdout = orig_stdout
+		# the index is kept for the next volumes that need rebuilding
+		cache = os.path.join(self.tdir, "store_split_folder.srr.volumes")
+		self.assertTrue(VolumeIndex.load(cache, self.srr) is not None)
+		self.assertRebuilt(self.names[2:])
+
+	def test_rebuild_volumes(self):
+		results = list(rebuild_volumes(self.srr, self.files_dir, self.tdir,
+		                               self.names[1:], processes=2))
+		self.assertEqual([(name, None) for name in self.names[1:]], results)
+		self.assertRebuilt(self.names[1:])
+		self.assertFalse(os.path.exists(os.path.join(self.tdir, self.names[0])))
+
+	def test_exact_volumes(self):
+		# only volumes with the exact name, not all that end with it
+		for index in (None, volume_index(self.srr)):
+			reconstruct(self.srr, self.files_dir, self.tdir,
+			            extract_files=False, volume_index=index,
+			            volumes=["split_folder.r00"])
+			self.assertEqual([], os.listdir(self.tdir))
+		reconstruct(self.srr, self.files_dir, self.tdir, extract_files=False,
+		            volumes=[self.names[1]])
+		self.assertEqual([self.names[1]], os.listdir(self.tdir))
+		self.assertRebuilt(self.names[1:2])
+
+	def test_repair_volumes(self):
+		reconstruct(self.srr, self.files_dir, self.tdir, extract_files=False)
+		self.assertEqual([], list(repair_volumes(self.srr, self.files_dir,
+		                                         self.tdir, processes=1)))
+		os.unlink(os.path.join(self.tdir, self.names[0]))
+		with open(os.path.join(self.tdir, self.names[2]), "r+b") as damaged:
+			damaged.seek(100)
+			damaged.write(b"damaged")
+		results = list(repair_volumes(self.srr, self.files_dir, self.tdir))
+		self.assertEqual([(self.names[0], None), (self.names[2], None)],
+		                 results)
+		self.assertRebuilt(self.names)
+
+	def test_failed_repair(self):
+		reconstruct(self.srr, self.files_dir, self.tdir, extract_files=False)
+		damaged = os.path.join(self.tdir, self.names[2])
+		with open(damaged, "r+b") as volume:
+			volume.seek(100)
+			volume.write(b"damaged")
+		with open(damaged, "rb") as volume:
+			data = volume.read()
+		# the archived files aren't found
+		((name, err),) = repair_volumes(self.srr, self.tdir, self.tdir)
+		self.assertEqual(self.names[2], name)
+		self.assertTrue(isinstance(err, FileNotFound))
+		with open(damaged, "rb") as volume:
+			self.assertEqual(data, volume.read())
+		self.assertEqual(sorted(self.names), sorted(os.listdir(self.tdir)))
+
 class TestHelper(TestInit):
 	"""Test helper functions."""
 	def test_autolocate_renamed(self):
@@ -573,6 +827,51 @@ class TestHelper(TestInit):
 		self.assertEqual(os.path.join(self.files_dir, "txt", "empty_file.txt"),
 						 result, "Empty file not found.")
 
+	def test_source_files(self):
+		srr = os.path.join(self.little, "store_little.srr")
+		block = [b for b in RarReader(srr).read_all()
+		         if b.rawtype == BlockType.RarPackedFile][0]
+		txt = os.path.join(self.files_dir, "txt")
+		sources = _SourceFiles(self.files_dir, {block.file_name: "renamed"},
+		                       True, max_open=1)
+		walks = []
+		walk = sources.tree._walk
+		sources.tree._walk = lambda: walks.append(walk())
+		sources.resolve([block, block])
+		src = sources.locate(block)
+		self.assertEqual(os.path.join(txt, "little_file.txt"), src)
+		self.assertEqual(1, len(walks))
+		self.assertEqual(1, len([e for e in self.o.events
+		                         if e.code == MsgCode.AUTO_LOCATE]))
+
+		# open files are reused from the start
+		handle = sources.open(src)
+		handle.read(3)
+		self.assertTrue(handle is sources.open(src))
+		self.assertEqual(0, handle.tell())
+		sources.release(handle)
+		self.assertFalse(handle.closed)
+		other = sources.open(os.path.join(txt, "empty_file.txt"))
+		self.assertTrue(handle.closed)
+		sources.close()
+		self.assertTrue(other.closed)
+
+	def test_read_ahead(self):
+		class Executor(object):
+			submitted = []
+			def submit(self, function, item):
+				self.submitted.append(item)
+				future = type(str("Future"), (object,),
+				              {"result": lambda _self: function(item)})
+				return future()
+		executor = Executor()
+		results = _read_ahead(executor, lambda i: i * 2, range(10), 3)
+		self.assertEqual(0, next(results))
+		# the later calls are only queued once results are consumed
+		self.assertEqual([0, 1, 2, 3], executor.submitted)
+		self.assertEqual(list(range(2, 20, 2)), list(results))
+		self.assertEqual(list(range(10)), executor.submitted)
+
 	def test_flagcheck(self):
 		block = SrrStoredFileBlock(file_name="file.name", file_size=1234)
 		block.flags = SrrStoredFileBlock.SUPPORTED_FLAG_MASK
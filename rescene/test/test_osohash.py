@@ -27,10 +27,15 @@
 import unittest
 import io
 import os
+import shutil
+import struct
 from os.path import join
 from errno import ENOENT
+from tempfile import mkdtemp
 
-from rescene.osohash import compute_hash, osohash_from
+from rescene.main import create_srr
+from rescene.osohash import compute_hash, osohash_from, osohashes_from
+from rescene.rar import RarReader, BlockType
 
 # for running nose tests
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
@@ -69,3 +74,55 @@ class TestHash(unittest.TestCase):
 						"store_split_folder_old_srrsfv_windows",
 						"winrar2.80.rar")
 		self.assertRaises(ValueError, osohash_from, rar_file)
+
+def _block(block_type, flags, body):
+	return struct.pack("<HBHH", 0, block_type, flags, 7 + len(body)) + body
+
+def write_volume(path, name, data, file_size, split_before, split_after):
+	"""Writes a RAR volume with the stored data of a single file."""
+	flags = 0x8000
+	if split_before:
+		flags |= 0x01
+	if split_after:
+		flags |= 0x02
+	name = name.encode("ascii")
+	header = struct.pack("<IIBIIBBHI", len(data), file_size, 2, 0, 0,
+	                     20, 0x30, len(name), 0x20) + name
+	with open(path, "wb") as volume:
+		volume.write(b"Rar!\x1a\x07\x00")
+		volume.write(_block(0x73, 0x0001, b"\0" * 6))
+		volume.write(_block(0x74, flags, header))
+		volume.write(data)
+		volume.write(_block(0x7b, 0, b""))
+
+class TestBatch(unittest.TestCase):
+	def setUp(self):
+		self.dir = mkdtemp(prefix="pyReScene-")
+		data = bytes(bytearray(i * 7 % 251 for i in range(200000)))
+		parts = [data[:90000], data[90000:150000], data[150000:]]
+		self.volumes = [join(self.dir, "set." + ext)
+		                for ext in ("rar", "r00", "r01")]
+		for (i, (volume, part)) in enumerate(zip(self.volumes, parts)):
+			write_volume(volume, "Sample\\video.avi", part, len(data),
+			             i > 0, i < 2)
+
+	def tearDown(self):
+		shutil.rmtree(self.dir)
+
+	def test_osohashes_from(self):
+		expected = osohash_from(self.volumes[0], "Sample/video.avi")
+		volumes = [(v, RarReader(v).read_all()) for v in self.volumes]
+		self.assertEqual({"Sample/video.avi": expected},
+		                 osohashes_from(volumes))
+		self.assertEqual({}, osohashes_from(volumes, lambda name: False))
+		# the start of the file is missing
+		self.assertEqual({}, osohashes_from(volumes[1:]))
+
+	def test_create_srr(self):
+		expected = osohash_from(self.volumes[0], "Sample/video.avi")
+		srr = join(self.dir, "set.srr")
+		create_srr(srr, self.volumes[0], oso_hash=True)
+		(block,) = [b for b in RarReader(srr).read_all()
+		            if b.rawtype == BlockType.SrrOsoHash]
+		self.assertEqual(expected, (block.oso_hash, block.file_size))
+		self.assertEqual("video.avi", block.file_name)
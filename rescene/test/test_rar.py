@@ -332,8 +332,34 @@ class TestRarBlocks(unittest.TestCase):
 		# test with (old) archive comments included?
 
 
-	def test_packed_file(self):
-		pass
+	def test_packed_file(self):  # 0x74
+		# from store_empty.rar
+		data = bytes(bytearray.fromhex("07 47 74 20 80 2E 00 00 00 00 00"
+		"00 00 00 00 03 00 00 00 00 26 7B 66 3E 14 30 0E 00 A4 81 00 00"
+		"65 6D 70 74 79 5F 66 69 6C 65 2E 74 78 74 C4 3D 7B 00 40 07 00"))
+		block = RarPackedFileBlock(data, 0, "store_empty.rar")
+		self.assertFalse(hasattr(block, "__dict__"))
+		self.assertEqual(0, block.packed_size)
+		self.assertEqual(0x30, block.compression_method)
+		self.assertEqual("empty_file.txt", block.file_name)
+		self.assertEqual(b"empty_file.txt", block.orig_filename)
+		self.assertEqual((2011, 3, 6, 15, 25, 12), block.file_datetime)
+		self.assertEqual(None, block.salt)
+		self.assertEqual(None, block.mtime)
+		# decoded fields can be replaced
+		block.file_name = "renamed.txt"
+		self.assertEqual("renamed.txt", block.file_name)
+		self.assertRaises(AttributeError, setattr, block, "unknown", 1)
+
+		# decoding the other fields of a group keeps an assigned field
+		block = RarPackedFileBlock(data, 0, "store_empty.rar")
+		block.file_name = "renamed.txt"
+		self.assertEqual(b"empty_file.txt", block.orig_filename)
+		self.assertEqual("renamed.txt", block.file_name)
+		block.mtime = (2020, 1, 1, 0, 0, 0)
+		self.assertEqual(None, block.salt)
+		self.assertEqual(None, block.ctime)
+		self.assertEqual((2020, 1, 1, 0, 0, 0), block.mtime)
 
 	def test_newsubblock(self):
 		""" RR, CMT, AV """
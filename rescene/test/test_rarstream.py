@@ -27,9 +27,11 @@
 import unittest
 import os
 import io
+import shutil
 import zlib
+from tempfile import mkdtemp
 
-from rescene.rarstream import RarStream, FakeFile
+from rescene.rarstream import RarStream, FakeFile, SrrStream, rar_set
 from rescene.rar import ArchiveNotFoundError
 
 # for running nose tests
@@ -146,11 +148,96 @@ class TestRarStream(unittest.TestCase):
 		# AttributeError: Archive without stored files.
 		self.assertRaises(AttributeError, RarStream, small_rar)
 
+class TestRarSet(unittest.TestCase):
+	"""For testing the RarSet class and its cache."""
+
+	folder = os.path.join(os.pardir, os.pardir, "test_files",
+	                      "store_split_folder_old_srrsfv_windows")
+
+	def setUp(self):
+		self.dir = mkdtemp(prefix="pyReScene-")
+		for ext in ("rar", "r00", "r01"):
+			shutil.copy(os.path.join(self.folder, "store_split_folder." + ext),
+			            self.dir)
+		self.first = os.path.join(self.dir, "store_split_folder.rar")
+
+	def tearDown(self):
+		shutil.rmtree(self.dir)
+
+	def test_set(self):
+		rarset = rar_set(self.first)
+		self.assertEqual(3, len(rarset.volumes))
+		self.assertTrue(rarset.old_naming)
+		self.assertFalse(rarset.starts_split)
+		self.assertFalse(rarset.compressed)
+		self.assertEqual(["txt\\empty_file.txt", "txt\\little_file.txt",
+		                  "txt\\users_manual4.00.txt"], rarset.first_volume_files)
+		self.assertEqual(4, len(rarset.file_names))
+		size = sum(s for (_v, _o, s) in
+		           rarset.segments["txt\\users_manual4.00.txt"])
+		rs = RarStream(self.first, "txt/users_manual4.00.txt")
+		self.assertEqual(size, rs.length())
+		rs.close()
+
+	def test_cache(self):
+		rarset = rar_set(self.first)
+		self.assertTrue(rarset is rar_set(self.first))
+
+		# a changed volume is parsed again
+		last = rarset.volumes[-1]
+		st = os.stat(last)
+		os.utime(last, (st.st_atime, st.st_mtime + 10))
+		changed = rar_set(self.first)
+		self.assertFalse(rarset is changed)
+		self.assertTrue(changed is rar_set(self.first))
+
+		# so is a set that got an extra volume
+		shutil.copy(last, os.path.join(self.dir, "store_split_folder.r02"))
+		self.assertFalse(changed is rar_set(self.first))
+
+class TestSrrStream(unittest.TestCase):
+	"""For testing the SrrStream class."""
+
+	srr = os.path.join(os.pardir, os.pardir, "test_files", "other",
+		"House.S06E12.720p.HDTV.x264-IMMERSE_rarfs_problem.srr")
+	srs = "house.s06e12.720p.hdtv.x264-immerse.sample.srs"
+
+	def test_read(self):
+		with SrrStream(self.srr, self.srs) as stream:
+			self.assertEqual(self.srs, stream.name)
+			self.assertEqual(30374, stream.length())
+			data = stream.read()
+			self.assertEqual(30374, len(data))
+			self.assertEqual(b"", stream.read(10))
+			self.assertEqual(30364, stream.seek(-10, os.SEEK_END))
+			self.assertEqual(data[-10:], stream.read(100))
+			stream.seek(5)
+			self.assertEqual(data[5:25], stream.read(20))
+			self.assertEqual(25, stream.tell())
+			buf = bytearray(10)
+			self.assertEqual(10, stream.readinto(buf))
+			self.assertEqual(data[25:35], bytes(buf))
+			self.assertRaises(IndexError, stream.seek, -1)
+		self.assertTrue(stream.closed)
+		stream.close()
+
+		# the same bytes are read without a memory map
+		with SrrStream(self.srr, self.srs) as stream:
+			stream._map.close()
+			stream._map = None
+			self.assertEqual(data, stream.read())
+
+	def test_not_stored(self):
+		self.assertRaises(ValueError, SrrStream, self.srr, "missing.srs")
+
 class TestFakeFile(unittest.TestCase):
 	"""For testing the FakeFile class."""
 
 	def test_error(self):
 		ff = FakeFile(100)
+		self.assertEqual(100, ff.seek(100))
+		self.assertEqual(b"", ff.read())
+		self.assertEqual(0, FakeFile(0).seek(0))
 		self.assertRaises(IndexError, ff.seek, 101)
 		self.assertRaises(IndexError, ff.seek, -1, os.SEEK_SET)
 
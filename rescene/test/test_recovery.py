@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+import io
+import random
+import unittest
+import zlib
+
+from rescene.recovery import RecoveryRecord, SECTOR_SIZE
+
+def naive(data, recovery_sectors):
+	"""The recovery record calculated one sector at a time."""
+	crcs = bytearray()
+	parity = [bytearray(SECTOR_SIZE) for _ in range(recovery_sectors)]
+	for (index, pos) in enumerate(range(0, len(data), SECTOR_SIZE)):
+		sector = data[pos:pos + SECTOR_SIZE]
+		sector += bytes(bytearray(SECTOR_SIZE - len(sector)))
+		crc = ~zlib.crc32(sector) & 0xffff
+		crcs.extend(bytearray((crc & 0xff, crc >> 8)))
+		for (i, byte) in enumerate(bytearray(sector)):
+			parity[index % recovery_sectors][i] ^= byte
+	return (bytes(crcs), [bytes(p) for p in parity])
+
+class TestRecoveryRecord(unittest.TestCase):
+	def setUp(self):
+		rand = random.Random(2026)
+		self.data = bytes(bytearray(
+			rand.getrandbits(8) for _ in range(20 * SECTOR_SIZE + 100)))
+
+	def result(self, rr):
+		return (rr.crcs(), rr.parity())
+
+	def test_stream(self):
+		for recovery_sectors in (1, 3, 8, 30):
+			rr = RecoveryRecord(recovery_sectors)
+			rr.read_from(io.BytesIO(self.data), len(self.data))
+			self.assertEqual(naive(self.data, recovery_sectors),
+			                 self.result(rr))
+			self.assertEqual(21, rr.sectors)
+
+	def test_chunks(self):
+		rr = RecoveryRecord(4)
+		for (start, end) in ((0, 1), (1, 6), (6, 7), (7, 21)):
+			rr.add(self.data[start * SECTOR_SIZE:end * SECTOR_SIZE])
+		self.assertEqual(naive(self.data, 4), self.result(rr))
+
+	def test_any_order(self):
+		rr = RecoveryRecord(6)
+		rr.add(self.data[5 * SECTOR_SIZE:15 * SECTOR_SIZE], 5)
+		rr.add(self.data[:5 * SECTOR_SIZE], 0)
+		rr.add(self.data[15 * SECTOR_SIZE:], 15)
+		self.assertEqual(naive(self.data, 6), self.result(rr))
+
+	def test_no_recovery_sectors(self):
+		self.assertRaises(ValueError, RecoveryRecord, 0)
+
+if __name__ == "__main__":
+	unittest.main()
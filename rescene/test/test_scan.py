@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+import os
+import unittest
+
+from rescene.main import info
+from rescene.rar import BlockType
+from rescene.scan import ParsedSrr, find_srrs, scan
+
+# for running nose tests
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+def _archived_files(parsed):
+	return sorted(parsed.info()["archived_files"])
+
+def _stored_files(parsed):
+	return [b.file_name for b in parsed.of_type(BlockType.SrrStoredFile)]
+
+class TestScan(unittest.TestCase):
+	def setUp(self):
+		self.files_dir = os.path.join(os.pardir, os.pardir, "test_files")
+		self.other = os.path.join(self.files_dir, "other")
+
+	def test_parsed_info(self):
+		srr = os.path.join(self.files_dir, "store_little", "store_little.srr")
+		parsed = ParsedSrr(srr)
+		self.assertEqual(sorted(info(srr)["archived_files"]),
+		                 _archived_files(parsed))
+		self.assertTrue(parsed.info() is parsed.info())
+
+	def test_find_srrs(self):
+		unknown = []
+		srr_files = list(find_srrs([self.other, "nothing"],
+		                           unknown=unknown.append))
+		self.assertEqual(sorted(srr_files), srr_files)
+		self.assertTrue(all(f.endswith(".srr") for f in srr_files))
+		self.assertEqual(["nothing"], unknown)
+		little = list(find_srrs([self.files_dir], recursive=True))
+		self.assertTrue(os.path.join(self.files_dir, "store_little",
+		                             "store_little.srr") in little)
+		self.assertEqual([], list(find_srrs([self.files_dir])))
+
+	def test_scan_order(self):
+		srr_files = list(find_srrs([self.other]))
+		serial = list(scan(srr_files, _stored_files, processes=1))
+		pooled = list(scan(srr_files, _stored_files, processes=2,
+		                   chunksize=1))
+		self.assertEqual(srr_files, [s[0] for s in pooled])
+		self.assertEqual(serial, pooled)
+
+	def test_scan_error(self):
+		bad = os.path.join(self.files_dir, "store_little", "missing.srr")
+		(scanned,) = scan([bad], _archived_files, processes=1)
+		self.assertEqual(bad, scanned[0])
+		self.assertTrue(isinstance(scanned[2], Exception))
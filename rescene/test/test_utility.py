@@ -34,6 +34,7 @@ import os
 import io
 import sys
 import locale
+import zlib
 import platform
 
 # compatibility with 2.x
@@ -49,7 +50,8 @@ else:
 from rescene.utility import SfvEntry, parse_sfv_file, parse_sfv_data
 from rescene.utility import filter_sfv_duplicates, same_sfv
 from rescene.utility import is_rar, next_archive, is_good_srr, first_rars, sep
-from rescene.utility import capitalized_fn
+from rescene.utility import capitalized_fn, copy_stream, pipelined_copy
+from rescene import utility
 from rescene.utility import DISK_FOLDERS, RELEASE_FOLDERS 
 
 # for running nose tests
@@ -348,6 +350,59 @@ class TestUtility(unittest.TestCase):
 			# Python 2.6 does not have the skipTest() method
 			self.skipTest(fmt.format(err))  # 2.6 crash expected
 
+	def test_copy_stream(self):
+		data = bytes(bytearray(range(256))) * 10
+		buffer_size = utility.COPY_BUFFER
+		utility.COPY_BUFFER = 100
+		try:
+			out = io.BytesIO()
+			self.assertEqual(1000, copy_stream(io.BytesIO(data), out, 1000))
+			self.assertEqual(data[:1000], out.getvalue())
+			out = io.BytesIO()
+			self.assertEqual(len(data), copy_stream(io.BytesIO(data), out))
+			self.assertEqual(data, out.getvalue())
+			# a short source
+			self.assertEqual(len(data),
+			                 copy_stream(io.BytesIO(data), out, 5000))
+		finally:
+			utility.COPY_BUFFER = buffer_size
+
+	def test_pipelined_copy(self):
+		data = bytes(bytearray(range(256))) * 10
+		buffer_size = utility.COPY_BUFFER
+		utility.COPY_BUFFER = 100
+		try:
+			for size in (150, 1000, 5000):
+				out = io.BytesIO()
+				crc = [0]
+				def update(chunk):
+					crc[0] = zlib.crc32(chunk, crc[0])
+				copied = pipelined_copy(io.BytesIO(data), out, size, update)
+				self.assertEqual(min(size, len(data)), copied)
+				self.assertEqual(data[:size], out.getvalue())
+				self.assertEqual(zlib.crc32(data[:size]), crc[0])
+
+			# errors of the writer reach the caller
+			class Full(io.BytesIO):
+				def write(self, chunk):
+					raise IOError("No space left on device")
+			self.assertRaises(IOError, pipelined_copy,
+			                  io.BytesIO(data), Full(), 1000)
+		finally:
+			utility.COPY_BUFFER = buffer_size
+
+	def test_positive_env_int(self):
+		name = "RESCENE_TEST_DEPTH"
+		try:
+			for (value, expected) in (("8", 8), ("eight", 4), ("0", 4)):
+				os.environ[name] = value
+				self.assertEqual(expected,
+				                 utility._positive_env_int(name, 4))
+			del os.environ[name]
+			self.assertEqual(4, utility._positive_env_int(name, 4))
+		finally:
+			os.environ.pop(name, None)
+
 	def test_grab_file_names_capitals_on_disk(self):
 		tdir = os.path.join(os.pardir, os.pardir, "test_files", "hash_capitals")
 		ofile = "Parlamentet.S06E02.SWEDiSH-SQC_alllower.srr"
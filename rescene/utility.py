@@ -37,11 +37,17 @@ import warnings
 import locale
 import os
 import shutil
+import threading
 import time
 import zlib
 from io import BytesIO, TextIOBase, TextIOWrapper
 from tempfile import mktemp
 
+try:
+	import queue
+except ImportError:  # Python 2
+	import Queue as queue
+
 try:
 	import win32api
 	win32api_available = True
@@ -524,6 +530,129 @@ def calculate_crc32(file_name):
 		remove_spinner()
 	return crc & 0xFFFFFFFF
 
+# amount of bytes copy_stream() keeps in memory
+COPY_BUFFER = 0x100000
+
+def copy_stream(source, destination, size=None):
+	"""Copies size bytes, or everything until EOF when size is None,
+	from source to destination in chunks of at most COPY_BUFFER bytes.
+	Returns the amount of bytes copied."""
+	copied = 0
+	while size is None or copied < size:
+		amount = COPY_BUFFER
+		if size is not None:
+			amount = min(amount, size - copied)
+		data = source.read(amount)
+		if not data:
+			break
+		destination.write(data)
+		copied += len(data)
+	return copied
+
+def _positive_env_int(name, default):
+	"""A positive integer from the environment variable name.
+	The default is used when it is not set or not valid."""
+	try:
+		value = int(os.environ.get(name, default))
+	except ValueError:
+		return default
+	return value if value > 0 else default
+
+# amount of COPY_BUFFER chunks pipelined_copy() reads ahead of the writer
+PIPELINE_DEPTH = _positive_env_int("RESCENE_PIPELINE_DEPTH", 4)
+
+_END = object()  # marks the last chunk of a pipelined copy
+
+class _PipelineStage(threading.Thread):
+	"""Calls function for every chunk in its queue until _END."""
+	def __init__(self, function, stop):
+		threading.Thread.__init__(self)
+		self.daemon = True
+		self.chunks = queue.Queue(PIPELINE_DEPTH)
+		self.function = function
+		self.stop = stop
+		self.error = None
+
+	def run(self):
+		try:
+			while True:
+				data = self.chunks.get()
+				if data is _END:
+					break
+				self.function(data)
+		except BaseException as error:
+			self.error = error
+			self.stop.set()
+			# keep emptying the queue so the reader never blocks
+			while self.chunks.get() is not _END:
+				pass
+
+	def put(self, data):
+		"""Returns False when the pipeline is stopped."""
+		while not self.stop.is_set():
+			try:
+				self.chunks.put(data, timeout=0.1)
+				return True
+			except queue.Full:
+				pass
+		return False
+
+def pipelined_copy(source, destination, size, process=None):
+	"""Copies size bytes from source to destination like copy_stream().
+	The writes and process(data) run on threads of their own while the
+	caller reads up to PIPELINE_DEPTH chunks ahead of them, so the source
+	and the destination disk work at the same time.
+	Returns the amount of bytes read, which is less than size when the
+	source ends early."""
+	if size <= 2 * COPY_BUFFER or PIPELINE_DEPTH < 1:
+		# not worth starting threads for
+		copied = 0
+		while copied < size:
+			data = source.read(min(COPY_BUFFER, size - copied))
+			if not data:
+				break
+			destination.write(data)
+			if process:
+				process(data)
+			copied += len(data)
+		return copied
+
+	stop = threading.Event()
+	stages = [_PipelineStage(destination.write, stop)]
+	if process:
+		stages.append(_PipelineStage(process, stop))
+	for stage in stages:
+		stage.start()
+	copied = 0
+	try:
+		while copied < size and not stop.is_set():
+			data = source.read(min(COPY_BUFFER, size - copied))
+			if not data:
+				break
+			copied += len(data)
+			for stage in stages:
+				stage.put(data)
+	finally:
+		for stage in stages:
+			stage.chunks.put(_END)
+		for stage in stages:
+			stage.join()
+	for stage in stages:
+		if stage.error is not None:
+			raise stage.error
+	return copied
+
+def open_sequential(file_name):
+	"""Opens file_name for reading and tells the OS it will be read from
+	start to end, so it can read ahead further and drop pages early.
+	The hint is only given where os.posix_fadvise() exists."""
+	f = open(file_name, "rb")
+	try:
+		os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+	except (AttributeError, OSError):
+		pass
+	return f
+
 def capitalized_fn(afile):
 	"""
 	Checks provided file with the file on disk and returns the imput with
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Index of the RAR volumes an SRR file describes.
+
+For every volume the index has the range of SRR blocks that describe it
+and the parts of the archived files its data comes from. With it a few
+volumes can be rebuilt without reading the blocks of all the others, e.g.
+to repair the volumes that fail the SFV check. The index can be saved
+and is discarded when the SRR file changes."""
+
+import collections
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+
+from rescene.journal import identity, file_crc32
+from rescene.rar import RarReader, BlockType, COMPR_STORING
+from rescene.rarstream import SrrStream
+from rescene.utility import parse_sfv_data
+
+try:
+	_replace = os.replace
+except AttributeError:  # Python 2
+	_replace = os.rename
+
+VERSION = 1
+
+# part of an archived file: the data of a single RarPackedFile block
+Source = collections.namedtuple("Source", "file_name offset size")
+
+# name: the SrrRarFile name; path: the OS specific version of it
+# start, end: the byte range of its blocks in the SRR file
+# sources: a Source for every RarPackedFile block of the volume
+Volume = collections.namedtuple("Volume", "name path start end sources")
+
+# blocks that don't belong to the volume before them
+_SRR_BLOCKS = (BlockType.SrrHeader, BlockType.SrrStoredFile,
+               BlockType.SrrRarFile, BlockType.SrrOsoHash)
+
+class VolumeIndex(object):
+	"""volumes: OrderedDict of volume name -> Volume
+	header_end: the size of the SRR header block
+	sfv_files: the names of the SFV files stored in the SRR file
+	compressed: the volumes contain compressed files"""
+	def __init__(self, srr_file):
+		self.srr_file = srr_file
+		self.volumes = collections.OrderedDict()
+		self.header_end = 0
+		self.sfv_files = []
+		self.compressed = False
+
+	@classmethod
+	def from_blocks(cls, srr_file, blocks):
+		"""Builds the index from the blocks RarReader(srr_file) read."""
+		index = cls(srr_file)
+		offsets = {}  # file name -> offset of its next part
+		volume = None
+		for (number, block) in enumerate(blocks):
+			if block.rawtype in _SRR_BLOCKS and volume:
+				index._add(volume, block.block_position)
+				volume = None
+			if block.rawtype == BlockType.SrrHeader:
+				index.header_end = (blocks[number + 1].block_position
+					if number + 1 < len(blocks) else os.path.getsize(srr_file))
+			elif block.rawtype == BlockType.SrrStoredFile:
+				if block.file_name.lower().endswith(".sfv"):
+					index.sfv_files.append(block.file_name)
+			elif block.rawtype == BlockType.SrrRarFile:
+				volume = (block.file_name, block.os_file_name(),
+				          block.block_position, [])
+			elif block.rawtype == BlockType.RarPackedFile and volume:
+				if block.compression_method != COMPR_STORING:
+					index.compressed = True
+				offset = 0
+				if block.flags & block.SPLIT_BEFORE:
+					offset = offsets.get(block.file_name, 0)
+				offsets[block.file_name] = offset + block.packed_size
+				volume[3].append(
+					Source(block.file_name, offset, block.packed_size))
+		if volume:
+			index._add(volume, os.path.getsize(srr_file))
+		return index
+
+	def _add(self, volume, end):
+		(name, path, start, sources) = volume
+		self.volumes[name] = Volume(name, path, start, end, sources)
+
+	def matching(self, srr_part):
+		"""The names of the volumes reconstruct(srr_part=...) rebuilds:
+		the ones ending with srr_part or, when it ends with *, starting
+		with it."""
+		if srr_part.endswith("*"):
+			return [name for name in self.volumes
+			        if name.endswith(srr_part) or
+			        name.startswith(srr_part[:-1])]
+		return [name for name in self.volumes if name.endswith(srr_part)]
+
+	def read_blocks(self, names):
+		"""The blocks of the SRR header and the volumes names.
+		Only those parts of the SRR file are read."""
+		ranges = [(0, self.header_end)] + [
+			(self.volumes[name].start, self.volumes[name].end)
+			for name in names]
+		data = []
+		with open(self.srr_file, "rb") as srr:
+			for (start, end) in ranges:
+				srr.seek(start)
+				data.append(srr.read(end - start))
+		stream = io.BytesIO(b"".join(data))
+		stream.name = self.srr_file
+		return RarReader(stream).read_all()
+
+	def save(self, file_name):
+		"""Writes the index as JSON to file_name."""
+		data = {
+			"version": VERSION,
+			"srr": identity(self.srr_file),
+			"header_end": self.header_end,
+			"sfv_files": self.sfv_files,
+			"compressed": self.compressed,
+			"volumes": [[v.name, v.path, v.start, v.end,
+			             [list(s) for s in v.sources]]
+			            for v in self.volumes.values()],
+		}
+		directory = os.path.dirname(os.path.abspath(file_name))
+		(fd, tmp_name) = tempfile.mkstemp(dir=directory, suffix=".tmp")
+		try:
+			with os.fdopen(fd, "w") as index:
+				json.dump(data, index)
+			_replace(tmp_name, file_name)
+		except:
+			os.unlink(tmp_name)
+			raise
+
+	@classmethod
+	def load(cls, file_name, srr_file):
+		"""The index saved in file_name or None when it is missing or
+		belongs to another version of srr_file."""
+		try:
+			with open(file_name) as index_file:
+				data = json.load(index_file)
+		except (EnvironmentError, ValueError):
+			return None
+		if (not isinstance(data, dict) or data.get("version") != VERSION or
+			data.get("srr") != identity(srr_file)):
+			return None
+		index = cls(srr_file)
+		index.header_end = data["header_end"]
+		index.sfv_files = data["sfv_files"]
+		index.compressed = data["compressed"]
+		for (name, path, start, end, sources) in data["volumes"]:
+			index.volumes[name] = Volume(name, path, start, end,
+				[Source(*source) for source in sources])
+		return index
+
+def volume_index(srr_file, cache_file=None):
+	"""The VolumeIndex of srr_file. When cache_file is given, the index
+	is loaded from it or saved to it after reading the SRR file."""
+	if cache_file:
+		index = VolumeIndex.load(cache_file, srr_file)
+		if index is not None:
+			return index
+	index = VolumeIndex.from_blocks(srr_file, RarReader(srr_file).read_all())
+	if cache_file:
+		index.save(cache_file)
+	return index
+
+def volume_path(volume, out_folder, extract_paths=True):
+	"""Where reconstruct() writes the volume."""
+	file_name = volume.path
+	if not extract_paths:
+		file_name = os.path.basename(file_name)
+	return os.path.join(os.path.normpath(out_folder), file_name)
+
+def damaged_volumes(index, out_folder, extract_paths=True, processes=None):
+	"""The names of the volumes in out_folder that are missing or don't
+	have the CRC of the SFV files stored in the SRR file. Volumes that
+	aren't in an SFV file are not checked.
+	processes: amount of workers that calculate the CRCs"""
+	crcs = {}
+	for sfv in index.sfv_files:
+		with SrrStream(index.srr_file, sfv) as stream:
+			(entries, _comments, _errors) = parse_sfv_data(stream.read())
+		for entry in entries:
+			name = os.path.basename(entry.file_name.replace("\\", "/"))
+			crcs[name.lower()] = int(entry.crc32, 16)
+
+	damaged = []
+	checked = []
+	for volume in index.volumes.values():
+		expected = crcs.get(os.path.basename(volume.path).lower())
+		if expected is None:
+			continue
+		path = volume_path(volume, out_folder, extract_paths)
+		if os.path.isfile(path):
+			checked.append((volume.name, path, expected))
+		else:
+			damaged.append(volume.name)
+
+	paths = [path for (_name, path, _crc) in checked]
+	if len(paths) > 1 and processes != 1:
+		pool = multiprocessing.Pool(processes)
+		try:
+			found = pool.map(file_crc32, paths)
+		finally:
+			pool.terminate()
+			pool.join()
+	else:
+		found = [file_crc32(path) for path in paths]
+	damaged.extend(name for ((name, _path, expected), crc)
+	               in zip(checked, found) if crc != expected)
+	order = list(index.volumes)
+	return sorted(damaged, key=order.index)
@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2026 pyReScene
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use,
+# copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following
+# conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+# HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY,
+# WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+
+"""Benchmarks the SRR and SRS hot paths on a synthetic release.
+
+The corpus is generated from a fixed seed: main AVI, MKV and MP4 files
+with a sample cut from each of them, a stored proof and NFO file and a
+RAR set of the MKV file written by rerar with recovery records.
+Each benchmark runs in a fresh process so the peak memory usage and the
+amount of system calls belong to that benchmark alone.
+
+Usage: benchmark.py [options] report.json
+Compare two runs: benchmark.py -c old.json new.json"""
+
+from __future__ import print_function
+import filecmp
+import json
+import multiprocessing
+import optparse
+import os
+import platform
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+	import resource
+except ImportError:  # Windows
+	resource = None
+
+# for running the script directly from command line
+curdir = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(curdir, '..'))
+
+import rescene
+from rescene.main import _write_recovery_record, _is_recovery
+from rescene.rar import RarReader
+from rescene.rarstream import RarStream
+from rescene.utility import is_rar
+import resample
+
+CORPUS_VERSION = 1
+RERAR = os.path.join(curdir, "..", "rerar", "rerar.py")
+READ_SIZE = 0x100000  # 1 MiB
+
+BENCHMARKS = ("create_srr", "reconstruct", "recovery_record", "rarstream",
+              "info", "resample_avi", "resample_mkv", "resample_mp4",
+              "resample_mkv_rar")
+
+# CORPUS ----------------------------------------------------------------------
+
+def random_bytes(rand, amount):
+	if not amount:
+		return b""
+	return rand.getrandbits(amount * 8).to_bytes(amount, "little")
+
+def frames(rand, total_size):
+	"""Interleaved (track index, data) tuples: a video frame
+	followed by an audio frame until total_size bytes are used."""
+	result = []
+	size = 0
+	while size < total_size:
+		video = random_bytes(rand, rand.randrange(4096, 24576))
+		audio = random_bytes(rand, rand.randrange(512, 2048))
+		result.append((0, video))
+		result.append((1, audio))
+		size += len(video) + len(audio)
+	return result
+
+def sample_range(amount, fraction=16):
+	"""The slice of the main file's frames or chunks used for the sample."""
+	start = amount * 2 // 5
+	return start, start + max(1, amount // fraction)
+
+def riff_chunk(fourcc, data):
+	chunk = struct.pack("<4sL", fourcc, len(data)) + data
+	if len(data) % 2:
+		chunk += b"\x00"
+	return chunk
+
+def riff_list(list_type, fourcc, data):
+	return struct.pack("<4sL4s", list_type, len(data) + 4, fourcc) + data
+
+def build_avi(frame_list):
+	hdrl = riff_list(b"LIST", b"hdrl", riff_chunk(b"avih", bytes(56)))
+	movi = b"".join(riff_chunk(b"0%d%s" % (track, b"wb" if track else b"dc"),
+	                           data) for (track, data) in frame_list)
+	return riff_list(b"RIFF", b"AVI ",
+	                 hdrl + riff_list(b"LIST", b"movi", movi))
+
+def ebml_element(eid, data):
+	# always an 8 byte size field
+	return eid + b"\x01" + struct.pack(">Q", len(data))[1:] + data
+
+def build_mkv(clusters):
+	"""clusters: lists of (track index, data) tuples"""
+	header = ebml_element(b"\x1A\x45\xDF\xA3",
+	                      ebml_element(b"\x42\x82", b"matroska"))
+	tracklist = ebml_element(b"\x16\x54\xAE\x6B", b"".join(
+		ebml_element(b"\xAE", ebml_element(b"\xD7", struct.pack("B", nb)))
+		for nb in (1, 2)))
+	content = [tracklist]
+	for cluster in clusters:
+		blocks = [ebml_element(b"\xE7", b"\x00")]
+		for (track, data) in cluster:
+			blocks.append(ebml_element(b"\xA3", struct.pack(
+				">BhB", 0x81 + track, 0, 0x80) + data))
+		content.append(ebml_element(b"\x1F\x43\xB6\x75", b"".join(blocks)))
+	return header + ebml_element(b"\x18\x53\x80\x67", b"".join(content))
+
+def mp4_atoms(atoms):
+	abuffer = bytearray()
+	for (atom_type, data) in atoms:
+		if not isinstance(data, (bytes, bytearray)):
+			data = mp4_atoms(data)
+		abuffer.extend(struct.pack(">L4s", 8 + len(data), atom_type))
+		abuffer.extend(data)
+	return abuffer
+
+def build_mp4(tracks):
+	"""tracks: for each track a list of chunks with a list of samples
+	Track data is interleaved chunk by chunk in the mdat atom."""
+	def moov(chunk_offsets):
+		traks = []
+		for track_nb, chunks in enumerate(tracks):
+			samples = [s for chunk in chunks for s in chunk]
+			stsc_entries = []
+			for i, chunk in enumerate(chunks):
+				if not stsc_entries or stsc_entries[-1][1] != len(chunk):
+					stsc_entries.append((i + 1, len(chunk), 1))
+			stsc = struct.pack(">LL", 0, len(stsc_entries))
+			stsc += b"".join(struct.pack(">LLL", *e) for e in stsc_entries)
+			stsz = struct.pack(">LLL", 0, 0, len(samples))
+			stsz += b"".join(struct.pack(">L", len(s)) for s in samples)
+			stco = struct.pack(">LL", 0, len(chunks))
+			stco += b"".join(struct.pack(">L", offset)
+			                 for offset in chunk_offsets[track_nb])
+			traks.append((b"trak", (
+				(b"tkhd", struct.pack(">LLLL", 0, 0, 0, track_nb + 1)),
+				(b"mdia", ((b"minf", ((b"stbl", (
+					(b"stsc", stsc), (b"stsz", stsz), (b"stco", stco),
+				)),)),)),
+			)))
+		return mp4_atoms(((b"moov", traks),))
+
+	ftyp = mp4_atoms(((b"ftyp", b"isom"),))
+	offset = len(ftyp) + len(moov([[0] * len(c) for c in tracks])) + 8
+	chunk_offsets = [[] for _ in tracks]
+	mdat = bytearray()
+	for i in range(max(len(chunks) for chunks in tracks)):
+		for track_nb, chunks in enumerate(tracks):
+			if i < len(chunks):
+				chunk_offsets[track_nb].append(offset + len(mdat))
+				mdat.extend(b"".join(chunks[i]))
+	return ftyp + moov(chunk_offsets) + mp4_atoms(((b"mdat", mdat),))
+
+def write_file(file_name, data):
+	with open(file_name, "wb") as f:
+		f.write(data)
+	return file_name
+
+def generate_corpus(directory, scale, seed, collection):
+	"""Writes the synthetic release to directory.
+	scale: size of each main file in MiB
+	collection: number of SRR files for the info() benchmark
+	Returns a dictionary with the paths of the corpus files."""
+	rand = random.Random(seed)
+	release = os.path.join(directory, "Bench.Release.x264-PYRS")
+	samples = os.path.join(directory, "samples")
+	for folder in (release, samples):
+		if not os.path.isdir(folder):
+			os.makedirs(folder)
+	corpus = {"version": CORPUS_VERSION, "scale": scale, "seed": seed,
+	          "collection": collection, "release": release}
+
+	# main files and their samples
+	main_frames = frames(rand, scale * 1024 * 1024)
+	(start, end) = sample_range(len(main_frames))
+	corpus["avi"] = write_file(os.path.join(release, "bench.avi"),
+	                           build_avi(main_frames))
+	corpus["avi_sample"] = write_file(os.path.join(samples, "bench.avi"),
+	                                  build_avi(main_frames[start:end]))
+
+	clusters = [main_frames[i:i + 32] for i in range(0, len(main_frames), 32)]
+	(start, end) = sample_range(len(clusters))
+	corpus["mkv"] = write_file(os.path.join(release, "bench.mkv"),
+	                           build_mkv(clusters))
+	corpus["mkv_sample"] = write_file(os.path.join(samples, "bench.mkv"),
+	                                  build_mkv(clusters[start:end]))
+
+	tracks = [[], []]
+	for track in (0, 1):
+		track_samples = [data for (t, data) in main_frames if t == track]
+		while track_samples:
+			amount = rand.randrange(1, 5)
+			tracks[track].append(track_samples[:amount])
+			track_samples = track_samples[amount:]
+	sample_tracks = []
+	for chunks in tracks:
+		(start, end) = sample_range(len(chunks))
+		sample_tracks.append(chunks[start:end])
+	corpus["mp4"] = write_file(os.path.join(release, "bench.mp4"),
+	                           build_mp4(tracks))
+	corpus["mp4_sample"] = write_file(os.path.join(samples, "bench.mp4"),
+	                                  build_mp4(sample_tracks))
+	del main_frames, clusters, tracks, sample_tracks
+
+	# large stored files
+	corpus["stored"] = [
+		write_file(os.path.join(release, "bench.jpg"),
+		           random_bytes(rand, max(1, scale // 16) * 1024 * 1024)),
+		write_file(os.path.join(release, "bench.nfo"),
+		           b"pyReScene benchmark release\r\n" * 512),
+	]
+
+	# RAR set of the MKV file with recovery records
+	rarset = os.path.join(directory, "rarset")
+	if not os.path.isdir(rarset):
+		os.makedirs(rarset)
+	volume_size = max(1, scale // 8) * 1000 * 1000
+	with open(os.devnull, "w") as devnull:
+		subprocess.check_call([sys.executable, RERAR,
+			"file", corpus["mkv"], "size", str(volume_size), "rr",
+			"time", "2026-01-01 00:00:00", "base", "bench"],
+			cwd=rarset, stdout=devnull, stderr=devnull)
+	corpus["rarset"] = rarset
+	corpus["sfv"] = os.path.join(rarset, "bench.sfv")
+	corpus["rar"] = os.path.join(rarset, "bench.rar")
+
+	# collection of SRR files to gather info() from
+	srrs = os.path.join(directory, "srrs")
+	if not os.path.isdir(srrs):
+		os.makedirs(srrs)
+	srr = os.path.join(directory, "bench.srr")
+	rescene.create_srr(srr, [corpus["sfv"]], rarset,
+	                   store_files=corpus["stored"])
+	corpus["srr"] = srr
+	corpus["srrs"] = []
+	for i in range(collection):
+		copy = os.path.join(srrs, "bench-%04d.srr" % i)
+		shutil.copyfile(srr, copy)
+		corpus["srrs"].append(copy)
+
+	with open(os.path.join(directory, "corpus.json"), "w") as f:
+		json.dump(corpus, f, indent=1)
+	return corpus
+
+def load_corpus(directory, scale, seed, collection):
+	"""Reuses a previously generated corpus with the same parameters."""
+	try:
+		with open(os.path.join(directory, "corpus.json")) as f:
+			corpus = json.load(f)
+	except (IOError, ValueError):
+		return None
+	if (corpus.get("version") == CORPUS_VERSION and
+		corpus.get("scale") == scale and corpus.get("seed") == seed and
+		corpus.get("collection") == collection):
+		return corpus
+	return None
+
+# MEASURING -------------------------------------------------------------------
+
+def io_counters():
+	"""Amount of read and write system calls of this process.
+	Only available on Linux."""
+	counters = {}
+	try:
+		with open("/proc/self/io") as f:
+			for line in f:
+				(key, value) = line.split(":")
+				counters[key] = int(value)
+	except (IOError, ValueError):
+		pass
+	return counters.get("syscr"), counters.get("syscw")
+
+def peak_rss():
+	"""Peak resident set size of this process in KiB."""
+	if resource is None:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform == "darwin":
+		peak //= 1024  # bytes instead of KiB
+	return peak
+
+class Measurement(object):
+	"""Times a single operation. amount: the bytes processed"""
+	def __init__(self, results, name, amount):
+		self.results = results
+		self.name = name
+		self.amount = amount
+
+	def __enter__(self):
+		self.io_start = io_counters()
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		if exc_type is not None:
+			return
+		seconds = time.perf_counter() - self.start
+		(reads, writes) = io_counters()
+		result = {
+			"seconds": seconds,
+			"bytes": self.amount,
+			"mb_s": self.amount / 1000000.0 / seconds if seconds else None,
+			"peak_rss_kib": peak_rss(),
+			"read_syscalls": None,
+			"write_syscalls": None,
+		}
+		if reads is not None and self.io_start[0] is not None:
+			result["read_syscalls"] = reads - self.io_start[0]
+			result["write_syscalls"] = writes - self.io_start[1]
+		self.results[self.name] = result
+
+def volumes(corpus):
+	return sorted(os.path.join(corpus["rarset"], f)
+	              for f in os.listdir(corpus["rarset"])
+	              if is_rar(f))
+
+def total_size(files):
+	return sum(os.path.getsize(f) for f in files)
+
+# BENCHMARKS ------------------------------------------------------------------
+
+def bench_create_srr(corpus, work, results):
+	srr = os.path.join(work, "bench.srr")
+	amount = total_size(volumes(corpus) + corpus["stored"])
+	with Measurement(results, "create_srr", amount):
+		rescene.create_srr(srr, [corpus["sfv"]], corpus["rarset"],
+		                   store_files=list(corpus["stored"]))
+
+def bench_reconstruct(corpus, work, results):
+	originals = volumes(corpus)
+	with Measurement(results, "reconstruct", total_size(originals)):
+		rescene.reconstruct(corpus["srr"], corpus["release"], work,
+		                    extract_files=True)
+	for original in originals:
+		rebuild = os.path.join(work, os.path.basename(original))
+		if not filecmp.cmp(original, rebuild, shallow=False):
+			raise AssertionError("Reconstructed %s differs" % rebuild)
+
+def bench_recovery_record(corpus, work, results):
+	first = volumes(corpus)[0]
+	block = None
+	for block in RarReader(first).read_all():
+		if _is_recovery(block):
+			break
+	else:
+		raise AssertionError("No recovery record in %s" % first)
+	rebuild = os.path.join(work, os.path.basename(first))
+	with open(first, "rb") as source:
+		with open(rebuild, "wb") as rarfs:
+			rarfs.write(source.read(block.block_position))
+	with open(rebuild, "r+b") as rarfs:
+		with Measurement(results, "recovery_record", block.block_position):
+			_write_recovery_record(block, rarfs)
+	with open(first, "rb") as original, open(rebuild, "rb") as rebuilt:
+		expected = original.read(os.path.getsize(rebuild))
+		if expected != rebuilt.read():
+			raise AssertionError("Recovery record differs")
+
+def bench_rarstream(corpus, work, results):
+	with Measurement(results, "rarstream", os.path.getsize(corpus["mkv"])):
+		stream = RarStream(corpus["rar"])
+		while stream.read(READ_SIZE):
+			pass
+		stream.close()
+
+def bench_info(corpus, work, results):
+	with Measurement(results, "info", total_size(corpus["srrs"])):
+		for srr in corpus["srrs"]:
+			rescene.info(srr)
+
+def bench_resample(name, sample_file, main_file, work, results):
+	"""Times the create and rebuild phases of an SRS file."""
+	main_size = os.path.getsize(main_file)
+	sample_size = os.path.getsize(sample_file)
+	main_info = resample.file_type_info(main_file)
+	sample = resample.sample_class_factory(
+		resample.file_type_info(sample_file).file_type)
+	sample.archived_file_name = main_info.archived_file
+	srs = os.path.join(work, os.path.basename(sample_file) + ".srs")
+
+	with Measurement(results, name + "_profile", sample_size):
+		sample_data = resample.FileData(file_name=sample_file)
+		tracks, _attachments = sample.profile_sample(sample_data)
+	with Measurement(results, name + "_find", main_size):
+		tracks = sample.find_sample_streams(tracks, main_file)
+	with Measurement(results, name + "_create_srs", sample_size):
+		sample.create_srs(tracks, sample_data, sample_file, srs, False)
+
+	movie = resample.sample_class_factory(main_info.file_type)
+	movie.archived_file_name = main_info.archived_file
+	movie.cut_data = sample.cut_data
+	with Measurement(results, name + "_load_srs", os.path.getsize(srs)):
+		srs_data, tracks = sample.load_srs(srs)
+	with Measurement(results, name + "_extract", main_size):
+		tracks, attachments = movie.extract_sample_streams(tracks, main_file)
+	out_file = os.path.join(work, srs_data.name)
+	with Measurement(results, name + "_rebuild", sample_size):
+		rebuilt = sample.rebuild_sample(srs_data, tracks, attachments,
+		                                srs, out_file)
+	if rebuilt.crc32 != srs_data.crc32:
+		raise AssertionError("Rebuilt sample %s differs" % out_file)
+
+def run_benchmark(name, corpus):
+	"""Runs a single benchmark in the current process.
+	Returns a dictionary with a result for each measured operation."""
+	results = {}
+	work = tempfile.mkdtemp(prefix="pyReScene-bench-")
+	rescene.utility.temporary_directory = work
+	stdout = sys.stdout
+	sys.stdout = open(os.devnull, "w")
+	try:
+		if name.startswith("resample_"):
+			sample_type = name.split("_")[1]
+			main_file = corpus["rar"] if name.endswith("_rar") \
+				else corpus[sample_type]
+			bench_resample(name, corpus[sample_type + "_sample"],
+			               main_file, work, results)
+		else:
+			globals()["bench_" + name](corpus, work, results)
+	finally:
+		sys.stdout.close()
+		sys.stdout = stdout
+		shutil.rmtree(work, ignore_errors=True)
+	return results
+
+# REPORTS ---------------------------------------------------------------------
+
+def best_of(runs):
+	"""Keeps the fastest run of every operation together with all timings."""
+	report = {}
+	for run in runs:
+		for (operation, result) in run.items():
+			best = report.get(operation)
+			if best is None or result["seconds"] < best["seconds"]:
+				timings = best["runs"] if best else []
+				report[operation] = dict(result, runs=timings)
+			report[operation]["runs"].append(result["seconds"])
+	return report
+
+def compare(old_report, new_report):
+	with open(old_report) as f:
+		old = json.load(f)["results"]
+	with open(new_report) as f:
+		new = json.load(f)["results"]
+	print("{0:<28} {1:>10} {2:>10} {3:>8}".format(
+		"Operation", "Old MB/s", "New MB/s", "Change"))
+	for operation in sorted(set(old) | set(new)):
+		old_speed = old.get(operation, {}).get("mb_s")
+		new_speed = new.get(operation, {}).get("mb_s")
+		change = ""
+		if old_speed and new_speed:
+			change = "{0:+.1f}%".format((new_speed / old_speed - 1) * 100)
+		print("{0:<28} {1:>10} {2:>10} {3:>8}".format(operation,
+			"%.2f" % old_speed if old_speed else "-",
+			"%.2f" % new_speed if new_speed else "-", change))
+
+def main(options, args):
+	if options.compare:
+		return compare(options.compare, args[0])
+
+	directory = options.directory or tempfile.mkdtemp(
+		prefix="pyReScene-corpus-")
+	try:
+		corpus = load_corpus(directory, options.scale, options.seed,
+		                     options.collection)
+		if corpus is None:
+			print("Generating corpus in %s..." % directory)
+			corpus = generate_corpus(directory, options.scale, options.seed,
+			                         options.collection)
+
+		context = multiprocessing.get_context("spawn")
+		runs = {}
+		for name in options.benchmarks or BENCHMARKS:
+			if name not in BENCHMARKS:
+				print("Unknown benchmark: %s" % name)
+				continue
+			for _ in range(options.repeat):
+				# a new process for each run: peak RSS is per benchmark
+				pool = context.Pool(1)
+				try:
+					result = pool.apply(run_benchmark, (name, corpus))
+				finally:
+					pool.close()
+					pool.join()
+				runs.setdefault(name, []).append(result)
+			for (operation, result) in sorted(best_of(runs[name]).items()):
+				print("{0:<28} {1:>9.3f}s {2:>10.2f} MB/s".format(
+					operation, result["seconds"], result["mb_s"] or 0))
+	finally:
+		if not options.directory and not options.keep:
+			shutil.rmtree(directory, ignore_errors=True)
+
+	results = {}
+	for name_runs in runs.values():
+		results.update(best_of(name_runs))
+	report = {
+		"date": time.strftime("%Y-%m-%d %H:%M:%S"),
+		"app": rescene.APPNAME,
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"scale": options.scale,
+		"seed": options.seed,
+		"collection": options.collection,
+		"repeat": options.repeat,
+		"results": results,
+	}
+	with open(args[0], "w") as f:
+		json.dump(report, f, indent=1, sort_keys=True)
+
+if __name__ == '__main__':
+	parser = optparse.OptionParser(
+		usage="Usage: %prog [options] report.json\n"
+		"Benchmarks SRR and SRS creation and reconstruction "
+		"on a generated release.\n",
+		version="%prog 0.1 (2026-10-19)")  # --help, --version
+	parser.add_option("-d", "--directory", dest="directory",
+		help="keeps the generated corpus in this directory "
+		"and reuses it on the next run")
+	parser.add_option("-k", "--keep", action="store_true", default=False,
+		help="do not remove the temporary corpus directory")
+	parser.add_option("-s", "--scale", type="int", default=64,
+		help="size of each main file in MiB (default: %default)")
+	parser.add_option("--seed", type="int", default=2026,
+		help="seed for the generated data (default: %default)")
+	parser.add_option("-n", "--collection", type="int", default=200,
+		help="SRR files for the info() benchmark (default: %default)")
+	parser.add_option("-r", "--repeat", type="int", default=1,
+		help="runs of each benchmark; the fastest is reported")
+	parser.add_option("-b", "--benchmark", action="append",
+		dest="benchmarks", metavar="NAME",
+		help="run only this benchmark, can be used more than once: " +
+		", ".join(BENCHMARKS))
+	parser.add_option("-c", "--compare", metavar="OLD_REPORT",
+		help="print the speed differences between OLD_REPORT "
+		"and report.json")
+
+	(options, args) = parser.parse_args()
+	if len(args) != 1:
+		print(parser.format_help())
+	else:
+		main(options, args)
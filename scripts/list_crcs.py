@@ -14,6 +14,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>
 
+from __future__ import print_function
+
 import optparse
 import sys
 import os
@@ -22,27 +24,24 @@ import os
 curdir = os.path.dirname(os.path.realpath(__file__))
 sys.path.append(os.path.join(curdir, '..'))
 try:
-	from rescene import info
+	from rescene.scan import find_srrs, scan
 except ImportError:
 	print("Can't import the 'rescene' module.")
 
-def list_srr(sfile):
-	for key, value in info(sfile)['archived_files'].items():
-# 		print(os.path.basename(sfile)[:-4]),
-		print("%s\t%s" % (key, value.crc32))
+def list_srr(parsed):
+	return ["%s\t%s" % (key, value.crc32)
+	        for key, value in parsed.info()['archived_files'].items()]
 
 def main(options, args):
-	for element in args:
-		element = os.path.abspath(element)
-		if os.path.isfile(element) and element.endswith(".srr"):
-			list_srr(element)
-		elif os.path.isdir(element):
-			for dirpath, _dirnames, filenames in os.walk(element):
-				for sfile in filenames:
-					if sfile.endswith(".srr"):
-						list_srr(os.path.join(dirpath, sfile))
-		else:
-			print("WTF are you supplying me?")
+	srr_files = find_srrs([os.path.abspath(element) for element in args],
+		recursive=True,
+		unknown=lambda path: print("WTF are you supplying me?"))
+	for (_srr_file, lines, err) in scan(srr_files, list_srr,
+	                                    options.processes):
+		if err:
+			raise err
+		for line in lines:
+			print(line)
 
 if __name__ == '__main__':
 	parser = optparse.OptionParser(
@@ -50,6 +49,10 @@ if __name__ == '__main__':
 		"This tool will list the CRCs of the archived files.\n",
 		version="%prog 0.1 (2012-11-01)")  # --help, --version
 
+	parser.add_option("-j", dest="processes", metavar="N", type="int",
+					  help="read the SRR files with N processes "
+					  "(default: the amount of CPUs)")
+
 	# no arguments given
 	if len(sys.argv) < 2:
 		print(parser.format_help())
@@ -18,6 +18,7 @@
 # version 1.0 2011-12-15 First version
 # version 1.1 2011-12-22 No NFO option
 
+import functools
 import optparse
 import sys
 import os
@@ -26,26 +27,30 @@ from os.path import join, dirname, realpath
 # for running the script directly from command line
 sys.path.append(join(dirname(realpath(sys.argv[0])), '..'))
 
-from rescene import info
+from rescene.scan import find_srrs, scan
 
-def main(options, args):
-	for lfile in os.listdir(args[0]):
-		if not lfile.endswith(".srr"):
-			continue
-		srr = info(lfile)
+def is_repack(nonfo, parsed):
+	srr = parsed.info()
+
+	has_nfo = False
+	for sfile in srr['stored_files']:
+		if sfile.endswith(".nfo"):
+			has_nfo = True
 
+	if not nonfo:
 		has_nfo = False
-		for sfile in srr['stored_files']:
-			if sfile.endswith(".nfo"):
-				has_nfo = True
 
-		if not options.nonfo:
-			has_nfo = False
+	# for each stored file: max 3 comment lines
+	return (len(srr['sfv_comments']) >
+	        3 * len(srr['archived_files']) and not has_nfo)
 
-		# for each stored lfile: max 3 comment lines
-		if (len(srr['sfv_comments']) >
-				3 * len(srr['archived_files']) and not has_nfo):
-			print(lfile)
+def main(options, args):
+	for (srr_file, repack, err) in scan(find_srrs(args[:1]),
+			functools.partial(is_repack, options.nonfo), options.processes):
+		if err:
+			raise err
+		if repack:
+			print(os.path.basename(srr_file))
 
 if __name__ == '__main__':
 	parser = optparse.OptionParser(
@@ -56,6 +61,9 @@ if __name__ == '__main__':
 
 	parser.add_option("-n", "--no-nfo", help="result can not contain nfo",
 					  action="store_true", dest="nonfo", default=False)
+	parser.add_option("-j", dest="processes", metavar="N", type="int",
+					  help="read the SRR files with N processes "
+					  "(default: the amount of CPUs)")
 
 	# no arguments given
 	if len(sys.argv) < 2: